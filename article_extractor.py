@@ -12,8 +12,12 @@ USAGE (from another script)
 from __future__ import annotations
 import re, textwrap
 import requests
-from readability import Document
-from bs4 import BeautifulSoup
+
+import lazy_imports
+
+# lxml-backed parsers, imported on the first article fetched
+readability = lazy_imports.module("readability")
+bs4         = lazy_imports.module("bs4")
 
 HEADERS = {
     "User-Agent": (
@@ -25,7 +29,7 @@ HEADERS = {
 
 def _clean_html(html: str) -> str:
     """Strip scripts/styles, collapse whitespace."""
-    soup = BeautifulSoup(html, "lxml")
+    soup = bs4.BeautifulSoup(html, "lxml")
 
     for tag in soup(["script", "style", "noscript", "header", "footer", "form"]):
         tag.decompose()
@@ -46,7 +50,7 @@ def extract_article_text(url: str, timeout: int = 10) -> str:
         return f"[error] fetch failed: {e}"
 
     try:
-        doc = Document(r.text)
+        doc = readability.Document(r.text)
         main_html = doc.summary(html_partial=True)
         text = _clean_html(main_html)
     except Exception:
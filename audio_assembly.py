@@ -0,0 +1,378 @@
+"""
+audio_assembly.py  ·  Stitch TTS segments into one well-formed MP3
+-------------------------------------------------------------------
+Writing raw MP3 responses back to back leaves an ID3 tag and Xing header
+per chunk, so players report the wrong duration and browsers can't seek.
+Two assemblers fix that, both fed one segment at a time (they are the
+`out` stream of tts_engine.synthesize_to_stream):
+
+  • PcmAssembler       – LINEAR16 (WAV) segments are levelled to a common
+                         RMS loudness, separated by a short silence and
+                         piped into a single ffmpeg/LAME encode, which
+                         writes one correct Xing/Info header.
+  • Mp3FrameAssembler  – no ffmpeg: MP3 segments are concatenated at frame
+                         level (tags and per-chunk Xing frames dropped,
+                         silent frames as gaps) behind one Info header.
+                         No decode, so no loudness levelling.
+
+`write_silence` produces a valid silent MP3 for failure fallbacks.
+
+Config
+  • TTS_GAP_MS       – silence between chunks (default 350)
+  • TTS_TARGET_DBFS  – RMS level each PCM chunk is levelled to (default -20)
+
+USAGE
+    with open_assembler("blog_voiceover.mp3", pcm=ffmpeg_exe() is not None) as out:
+        synthesize_to_stream(client, chunks, out, voice, audio_config)
+
+    python audio_assembly.py --bench 12000      # chars of simulated blog
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import struct
+import subprocess
+from functools import lru_cache
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+# ─── Constants ─────────────────────────────────────────────────
+GAP_MS       = int(os.getenv("TTS_GAP_MS", "350"))
+TARGET_DBFS  = float(os.getenv("TTS_TARGET_DBFS", "-20"))
+MAX_GAIN_DB  = 12.0           # never boost / cut a chunk by more than this
+PEAK_CEILING = 0.98           # of full scale, after gain
+MP3_BITRATE  = "64k"
+SAMPLE_RATE  = 24000          # Wavenet voices are natively 24 kHz
+
+_BITRATES = {                 # Layer III, kbps by bitrate index
+    "1": [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    "2": [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_SAMPLE_RATES = {"1": [44100, 48000, 32000], "2": [22050, 24000, 16000], "2.5": [11025, 12000, 8000]}
+_VERSIONS = {0b00: "2.5", 0b10: "2", 0b11: "1"}
+
+
+@lru_cache(maxsize=1)
+def ffmpeg_exe() -> Optional[str]:
+    """Path to ffmpeg (system binary, else the one bundled with imageio-ffmpeg)."""
+    exe = shutil.which("ffmpeg")
+    if exe:
+        return exe
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return None
+
+
+# ─── MP3 frames ────────────────────────────────────────────────
+class FrameHeader:
+    __slots__ = ("raw", "version", "bitrate", "sample_rate", "padding", "mono", "crc", "length", "samples")
+
+    def __init__(self, raw: int):
+        self.raw = raw
+        self.version = _VERSIONS[(raw >> 19) & 0b11]
+        table = "1" if self.version == "1" else "2"
+        self.bitrate = _BITRATES[table][(raw >> 12) & 0xF] * 1000
+        self.sample_rate = _SAMPLE_RATES[self.version][(raw >> 10) & 0b11]
+        self.padding = (raw >> 9) & 1
+        self.mono = ((raw >> 6) & 0b11) == 0b11
+        self.crc = not (raw >> 16) & 1
+        scale = 144 if self.version == "1" else 72
+        self.length = scale * self.bitrate // self.sample_rate + self.padding
+        self.samples = 1152 if self.version == "1" else 576
+
+    @property
+    def tag_offset(self) -> int:
+        """Byte offset of a Xing/Info tag inside the frame (after side info)."""
+        if self.version == "1":
+            side = 17 if self.mono else 32
+        else:
+            side = 9 if self.mono else 17
+        return 4 + side + (2 if self.crc else 0)
+
+
+def _parse_header(buf, pos: int) -> Optional[FrameHeader]:
+    if pos + 4 > len(buf) or buf[pos] != 0xFF or (buf[pos + 1] & 0xE0) != 0xE0:
+        return None
+    raw = struct.unpack_from(">I", buf, pos)[0]
+    if ((raw >> 19) & 0b11) == 0b01 or ((raw >> 17) & 0b11) != 0b01:    # reserved version / not Layer III
+        return None
+    if ((raw >> 12) & 0xF) in (0, 0xF) or ((raw >> 10) & 0b11) == 0b11:  # free-format / bad index
+        return None
+    return FrameHeader(raw)
+
+
+def _skip_id3v2(buf) -> int:
+    if len(buf) >= 10 and bytes(buf[:3]) == b"ID3":
+        size = (buf[6] << 21) | (buf[7] << 14) | (buf[8] << 7) | buf[9]
+        return 10 + size + (10 if buf[5] & 0x10 else 0)
+    return 0
+
+
+def iter_frames(data: bytes) -> Iterator[Tuple[FrameHeader, memoryview]]:
+    """Yield (header, frame bytes) for every audio frame; skips tags and a leading Xing/Info frame."""
+    buf = memoryview(data)
+    pos, first = _skip_id3v2(buf), True
+    end = len(buf) - 128 if len(buf) >= 128 and bytes(buf[-128:-125]) == b"TAG" else len(buf)
+    while pos + 4 <= end:
+        hdr = _parse_header(buf, pos)
+        if hdr is None or pos + hdr.length > end:
+            pos += 1                                  # resync on junk / truncated tail
+            continue
+        frame = buf[pos:pos + hdr.length]
+        pos += hdr.length
+        if first:
+            first = False
+            if bytes(frame[hdr.tag_offset:hdr.tag_offset + 4]) in (b"Xing", b"Info") \
+                    or bytes(frame[36:40]) == b"VBRI":
+                continue
+        yield hdr, frame
+
+
+def _blank_frame(template: FrameHeader) -> bytearray:
+    """A frame with the template's format, no padding and all-zero side info (decodes as silence)."""
+    hdr = FrameHeader(template.raw & ~(1 << 9))
+    frame = bytearray(hdr.length)
+    struct.pack_into(">I", frame, 0, hdr.raw)
+    return frame
+
+
+def _info_frame(template: FrameHeader, frames: int, nbytes: int, vbr: bool) -> bytes:
+    frame = _blank_frame(template)
+    off = FrameHeader(template.raw & ~(1 << 9)).tag_offset
+    struct.pack_into(">4sIII", frame, off, b"Xing" if vbr else b"Info", 0x3, frames, nbytes)
+    return bytes(frame)
+
+
+# ─── Assemblers ────────────────────────────────────────────────
+class Mp3FrameAssembler:
+    """Concatenate MP3 segments frame by frame behind a single Info header."""
+
+    def __init__(self, out_path: str, gap_ms: int = GAP_MS):
+        self.out_path, self.gap_ms = out_path, gap_ms
+        self._f: Optional[BinaryIO] = None
+        self._template: Optional[FrameHeader] = None
+        self._bitrates = set()
+        self.frames = self.segments = 0
+
+    def write(self, segment: bytes) -> int:
+        if self._f is None:
+            self._f = open(self.out_path, "wb")
+        written = 0
+        for i, (hdr, frame) in enumerate(iter_frames(segment)):
+            if self._template is None:
+                self._template = hdr
+                self._f.write(_info_frame(hdr, 0, 0, False))      # placeholder, patched on close
+            elif i == 0 and self.gap_ms:
+                gap = _blank_frame(self._template)
+                n = round(self.gap_ms / 1000 * self._template.sample_rate / self._template.samples)
+                self._f.write(bytes(gap) * n)
+                self.frames += n
+            if (hdr.version, hdr.sample_rate) != (self._template.version, self._template.sample_rate):
+                raise ValueError("MP3 segments have different sample formats")
+            self._f.write(frame)
+            self._bitrates.add(hdr.bitrate)
+            self.frames += 1
+            written += len(frame)
+        self.segments += 1
+        return written
+
+    def close(self) -> None:
+        if self._f is None:
+            return
+        if self._template is not None:
+            nbytes = self._f.tell()
+            self._f.seek(0)
+            self._f.write(_info_frame(self._template, self.frames, nbytes, len(self._bitrates) > 1))
+        self._f.close()
+        self._f = None
+
+    @property
+    def duration(self) -> float:
+        return self.frames * self._template.samples / self._template.sample_rate if self._template else 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _pcm_from_wav(segment: bytes) -> Tuple[int, int, memoryview]:
+    """(sample_rate, channels, 16-bit PCM) from a LINEAR16 response (WAV header optional)."""
+    buf = memoryview(segment)
+    if bytes(buf[:4]) != b"RIFF" or bytes(buf[8:12]) != b"WAVE":
+        return SAMPLE_RATE, 1, buf
+    pos, rate, channels = 12, SAMPLE_RATE, 1
+    while pos + 8 <= len(buf):
+        cid, size = bytes(buf[pos:pos + 4]), struct.unpack_from("<I", buf, pos + 4)[0]
+        if cid == b"fmt ":
+            _, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", buf, pos + 8)
+            if bits != 16:
+                raise ValueError(f"expected 16-bit PCM, got {bits}-bit")
+        elif cid == b"data":
+            return rate, channels, buf[pos + 8:min(len(buf), pos + 8 + size)]   # size may be bogus
+        pos += 8 + size + (size & 1)
+    raise ValueError("WAV segment has no data chunk")
+
+
+class PcmAssembler:
+    """Level LINEAR16 segments and stream them through one ffmpeg MP3 encode."""
+
+    def __init__(self, out_path: str, gap_ms: int = GAP_MS, target_dbfs: float = TARGET_DBFS,
+                 bitrate: str = MP3_BITRATE):
+        self.out_path, self.gap_ms, self.target_dbfs, self.bitrate = out_path, gap_ms, target_dbfs, bitrate
+        self._proc: Optional[subprocess.Popen] = None
+        self._format: Optional[Tuple[int, int]] = None
+        self.samples = self.segments = 0
+        self.gains_db: List[float] = []
+
+    def _start(self, rate: int, channels: int) -> None:
+        exe = ffmpeg_exe()
+        if not exe:
+            raise RuntimeError("ffmpeg not found – use Mp3FrameAssembler instead")
+        self._format = (rate, channels)
+        self._proc = subprocess.Popen(
+            [exe, "-hide_banner", "-loglevel", "error", "-y",
+             "-f", "s16le", "-ar", str(rate), "-ac", str(channels), "-i", "pipe:0",
+             "-c:a", "libmp3lame", "-b:a", self.bitrate, "-write_xing", "1", self.out_path],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+
+    def _level(self, pcm: memoryview):
+        import numpy as np
+        x = np.frombuffer(pcm[:len(pcm) // 2 * 2], dtype="<i2")
+        if not len(x):
+            return x
+        f = x.astype(np.float32)
+        rms = float(np.sqrt(np.mean(f * f)))
+        peak = float(np.max(np.abs(f)))
+        if rms < 1.0:                                   # digital silence – leave as is
+            self.gains_db.append(0.0)
+            return x
+        gain_db = self.target_dbfs - 20 * np.log10(rms / 32768)
+        gain_db = min(max(gain_db, -MAX_GAIN_DB), MAX_GAIN_DB,
+                      20 * np.log10(PEAK_CEILING * 32767 / max(peak, 1.0)))
+        self.gains_db.append(round(float(gain_db), 2))
+        f *= 10 ** (gain_db / 20)
+        return np.clip(f, -32768, 32767).astype("<i2")
+
+    def write(self, segment: bytes) -> int:
+        rate, channels, pcm = _pcm_from_wav(segment)
+        if self._proc is None:
+            self._start(rate, channels)
+        elif (rate, channels) != self._format:
+            raise ValueError(f"PCM segment format {rate} Hz/{channels} ch differs from {self._format}")
+        if self.segments and self.gap_ms:
+            self._proc.stdin.write(bytes(2 * channels * (rate * self.gap_ms // 1000)))
+            self.samples += rate * self.gap_ms // 1000
+        levelled = self._level(pcm)
+        self._proc.stdin.write(levelled.tobytes())
+        self.samples += len(levelled) // channels
+        self.segments += 1
+        return len(segment)
+
+    def close(self) -> None:
+        if self._proc is None:
+            return
+        self._proc.stdin.close()
+        err = self._proc.stderr.read().decode(errors="replace").strip()
+        if self._proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg encode failed: {err}")
+        self._proc = None
+
+    @property
+    def duration(self) -> float:
+        return self.samples / self._format[0] if self._format else 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self._proc is not None and exc[0] is not None:
+            self._proc.kill()
+            self._proc.wait()
+            self._proc = None
+        self.close()
+
+
+def open_assembler(out_path: str, pcm: bool, **kw):
+    return PcmAssembler(out_path, **kw) if pcm else Mp3FrameAssembler(out_path, **kw)
+
+
+def write_silence(out_path: str, seconds: float = 1.0) -> None:
+    """Write a valid silent MP3 (MPEG-1 Layer III, 44.1 kHz mono, 32 kbps) with an Info header."""
+    template = FrameHeader(0xFFFB10C4)
+    n = max(1, round(seconds * template.sample_rate / template.samples))
+    frame = bytes(_blank_frame(template))
+    with open(out_path, "wb") as f:
+        f.write(_info_frame(template, n, (n + 1) * len(frame), False))
+        f.write(frame * n)
+
+
+# ─── Benchmark ─────────────────────────────────────────────────
+def _fake_segments(chars: int, chars_per_chunk: int = 4300, chars_per_sec: float = 15.0,
+                   rate: int = SAMPLE_RATE) -> Iterator[bytes]:
+    """Speech-like WAV segments (noise bursts) with a different loudness per chunk."""
+    import numpy as np
+    rng = np.random.default_rng(0)
+    for start in range(0, chars, chars_per_chunk):
+        n = int(min(chars_per_chunk, chars - start) / chars_per_sec * rate)
+        env = np.sin(np.arange(n, dtype=np.float32) * np.float32(2 * np.pi * 3 / rate)) > -0.3
+        amp = 10 ** (rng.uniform(-32, -12) / 20) * 32768
+        pcm = (rng.standard_normal(n).astype(np.float32) * env * amp).clip(-32768, 32767).astype("<i2")
+        data = pcm.tobytes()
+        yield (b"RIFF" + struct.pack("<I", 36 + len(data)) + b"WAVE"
+               + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, rate, rate * 2, 2, 16)
+               + b"data" + struct.pack("<I", len(data)) + data)
+
+
+def _bench(chars: int) -> None:
+    import resource, tempfile, time
+    tmp = tempfile.mkdtemp()
+    print(f"Simulated blog: {chars:,} chars ≈ {chars / 15 / 60:.1f} min of speech")
+
+    exe = ffmpeg_exe()
+    if exe:
+        out = os.path.join(tmp, "pcm.mp3")
+        t0 = time.perf_counter()
+        with PcmAssembler(out) as asm:
+            for seg in _fake_segments(chars):
+                asm.write(seg)
+        dt = time.perf_counter() - t0
+        print(f"PcmAssembler : {asm.segments} chunks, {asm.duration:.0f}s audio in {dt:.2f}s "
+              f"({asm.duration / dt:.0f}× realtime), {os.path.getsize(out) / 1e6:.2f} MB")
+        print(f"               chunk gains (dB): {asm.gains_db}")
+        print(f"               peak RSS so far: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+        # Re-encode each chunk as a standalone MP3 (untimed) to feed the frame path
+        mp3_segments = []
+        for i, seg in enumerate(_fake_segments(chars)):
+            p = os.path.join(tmp, f"seg{i}.mp3")
+            subprocess.run([exe, "-loglevel", "error", "-y", "-f", "wav", "-i", "pipe:0", "-b:a", "32k", p],
+                           input=seg, check=True)
+            mp3_segments.append(open(p, "rb").read())
+    else:
+        print("PcmAssembler : skipped (ffmpeg not found)")
+        frame = bytes(_blank_frame(FrameHeader(0xFFF344C4)))           # MPEG-2, 24 kHz, 32 kbps mono
+        mp3_segments = [frame * int(min(4300, chars - s) / 15 * 24000 / 576) for s in range(0, chars, 4300)]
+
+    out = os.path.join(tmp, "frames.mp3")
+    t0 = time.perf_counter()
+    with Mp3FrameAssembler(out) as asm:
+        for seg in mp3_segments:
+            asm.write(seg)
+    dt = time.perf_counter() - t0
+    check = sum(1 for _ in iter_frames(open(out, "rb").read()))
+    print(f"Mp3Frame     : {asm.segments} chunks, {asm.frames:,} frames ({asm.duration:.0f}s) in "
+          f"{dt * 1000:.0f} ms; re-parsed {check:,} frames behind one Info header")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) >= 2 and sys.argv[1] == "--bench":
+        _bench(int(sys.argv[2]) if len(sys.argv) > 2 else 12000)
+    else:
+        sys.exit("Usage: python audio_assembly.py --bench [chars]")
@@ -1,18 +1,9 @@
 import os
 from google.cloud import texttospeech
 
-def split_text_into_chunks(text, max_length=4700):
-    parts = []
-    while text:
-        if len(text) <= max_length:
-            parts.append(text)
-            break
-        split_point = text[:max_length].rfind(". ")
-        if split_point == -1:
-            split_point = max_length
-        parts.append(text[:split_point + 1].strip())
-        text = text[split_point + 1:].strip()
-    return parts
+from text_chunker import MAX_BYTES, iter_ssml_chunks
+from audio_assembly import SAMPLE_RATE, ffmpeg_exe, write_silence
+from tts_engine import ChunkCache, synthesize_to_file
 
 def generate_audio():
     try:
@@ -34,9 +25,9 @@ def generate_audio():
                 blog_text = f.read()
             print(f"✅ Loaded text from file.txt ({len(blog_text)} characters)")
 
-        # Step 3: Split if too long
-        chunks = split_text_into_chunks(blog_text)
-        print(f"🧩 Splitting into {len(chunks)} chunk(s)")
+        # Step 3: Lazily split on paragraph/sentence boundaries within the TTS byte limit
+        chunks = iter_ssml_chunks(blog_text)
+        print(f"🧩 Splitting into SSML chunks of ≤ {MAX_BYTES} bytes")
 
         # Step 4: Set up client and Wavenet voice config
         print("Initializing Text-to-Speech client...")
@@ -47,33 +38,29 @@ def generate_audio():
             language_code="en-US",
             name="en-US-Wavenet-D"
         )
+        # LINEAR16 lets the chunks be levelled and encoded once; without ffmpeg
+        # fall back to MP3 chunks joined frame by frame
+        pcm = ffmpeg_exe() is not None
         audio_config = texttospeech.AudioConfig(
-            audio_encoding=texttospeech.AudioEncoding.MP3
+            audio_encoding=texttospeech.AudioEncoding.LINEAR16 if pcm else texttospeech.AudioEncoding.MP3,
+            sample_rate_hertz=SAMPLE_RATE
         )
 
-        # Step 5: Generate and combine audio
-        audio_segments = []
-        for i, chunk in enumerate(chunks):
-            print(f"[{i+1}/{len(chunks)}] Synthesizing {len(chunk)} characters...")
-            input_text = texttospeech.SynthesisInput(text=chunk)
-            response = client.synthesize_speech(
-                input=input_text,
-                voice=voice,
-                audio_config=audio_config
-            )
-            audio_segments.append(response.audio_content)
-
-        with open(output_path, "wb") as out:
-            for segment in audio_segments:
-                out.write(segment)
+        # Step 5: Synthesize cache misses in parallel, streaming them to disk in order
+        cache = ChunkCache()
+        cache.prune()
+        synthesize_to_file(
+            client, chunks, output_path, voice, audio_config,
+            make_input=lambda ssml: texttospeech.SynthesisInput(ssml=ssml),
+            cache=cache,
+            pcm=pcm
+        )
         print(f"✅ Voiceover saved as {output_path}")
 
     except Exception as e:
         print(f"❌ Error generating audio: {e}")
         try:
-            with open(output_path, "wb") as f:
-                silent_mp3 = b'\xFF\xE3\x18\xC4\x00\x00\x00\x03H\x00\x00\x00\x00LAME3.100\x00' + b'\x00' * 50
-                f.write(silent_mp3)
+            write_silence(output_path)
             print("⚠️ Created fallback silent audio file")
         except Exception as sub_e:
             print(f"❌ Also failed to write fallback audio: {sub_e}")
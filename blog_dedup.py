@@ -0,0 +1,217 @@
+"""
+blog_dedup.py  ·  Near-duplicate detection over the blog history
+----------------------------------------------------------------
+MinHash signatures of every paragraph ever logged as a blog entry in
+history_store, bucketed with LSH so a freshly generated section can be
+scored against the whole archive in milliseconds.
+
+The index remembers the last history row it has consumed, so each append
+(final.log_blog_to_history / log_blog.log_blog) only hashes the new entry.
+
+Output
+  • blog_history_minhash.npz  (signatures + paragraph ids + last row id)
+
+Config
+  • BLOG_DUP_THRESHOLD  – estimated Jaccard at which a section counts as a
+                          repeat and is regenerated (default 0.5)
+"""
+from __future__ import annotations
+
+import os
+import re
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+import history_store
+
+# ─── Constants ─────────────────────────────────────────────────
+INDEX_FILE   = Path("blog_history_minhash.npz")
+
+SHINGLE_SIZE  = 5      # words per shingle
+MIN_TOKENS    = 40     # shorter paragraphs (banner lines, one-liners) are ignored
+NUM_PERM      = 128
+BANDS         = 32     # 32 bands × 4 rows → LSH knee near Jaccard ≈ 0.42
+ROWS          = NUM_PERM // BANDS
+MAX_REGEN     = 1
+
+DUP_THRESHOLD = float(os.getenv("BLOG_DUP_THRESHOLD", "0.5"))
+
+_PRIME = np.uint64((1 << 31) - 1)
+_rng   = np.random.default_rng(20250101)
+_A     = _rng.integers(1, int(_PRIME), NUM_PERM, dtype=np.uint64)
+_B     = _rng.integers(0, int(_PRIME), NUM_PERM, dtype=np.uint64)
+
+_TOKEN_RE = re.compile(r"[a-z]+|\d[\d.,]*")
+_PARA_RE  = re.compile(r"\n\s*\n")
+
+
+# ─── MinHash ───────────────────────────────────────────────────
+def _shingles(text: str) -> np.ndarray:
+    # Digits are collapsed so "S&P rose 0.4%" and "S&P rose 1.2%" share shingles –
+    # templated commentary mostly differs only in the numbers.
+    toks = ["0" if t[0].isdigit() else t for t in _TOKEN_RE.findall(text.lower())]
+    if len(toks) < MIN_TOKENS:
+        return np.empty(0, dtype=np.uint64)
+    grams = {" ".join(toks[i:i + SHINGLE_SIZE]) for i in range(len(toks) - SHINGLE_SIZE + 1)}
+    return np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def minhash(text: str) -> np.ndarray | None:
+    """Return the NUM_PERM-long signature of *text*, or None if it is too short."""
+    sh = _shingles(text)
+    if not len(sh):
+        return None
+    sh %= _PRIME
+    return ((sh[:, None] * _A[None, :] + _B[None, :]) % _PRIME).min(axis=0).astype(np.uint32)
+
+
+def _paragraphs(text: str) -> List[str]:
+    return [p.strip() for p in _PARA_RE.split(text) if p.strip()]
+
+
+# ─── Index ─────────────────────────────────────────────────────
+class BlogDedupIndex:
+    """Persistent MinHash/LSH index over blog-history paragraphs."""
+
+    def __init__(self, index_path: Path | str = INDEX_FILE):
+        self.index_path = Path(index_path)
+        self._reset()
+        self._load()
+        self.refresh()
+
+    def _reset(self) -> None:
+        self.sigs = np.zeros((0, NUM_PERM), dtype=np.uint32)
+        self.labels: List[str] = []      # "<entry timestamp> ¶<n>"
+        self.last_id = 0
+        self.buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(BANDS)]
+
+    def _bucket(self, rows: range) -> None:
+        for r in rows:
+            for b in range(BANDS):
+                self.buckets[b][self.sigs[r, b * ROWS:(b + 1) * ROWS].tobytes()].append(r)
+
+    # -- persistence ------------------------------------------------
+    def _load(self) -> None:
+        if not self.index_path.exists():
+            return
+        try:
+            with np.load(self.index_path) as data:
+                sigs, labels, last_id = data["sigs"], data["labels"].tolist(), int(data["last_id"])
+        except (OSError, KeyError, ValueError) as exc:
+            print(f"[!] Dedup index unreadable, rebuilding – {exc}")
+            return
+        if sigs.shape[1:] != (NUM_PERM,) or len(sigs) != len(labels):
+            print("[!] Dedup index layout changed, rebuilding")
+            return
+        self.sigs, self.labels, self.last_id = sigs, labels, last_id
+        self._bucket(range(len(self.sigs)))
+
+    def save(self) -> None:
+        np.savez(
+            self.index_path,
+            sigs=self.sigs,
+            labels=np.array(self.labels, dtype=str),
+            last_id=np.int64(self.last_id),
+        )
+
+    def refresh(self) -> int:
+        """Index blog entries stored since the last call."""
+        rows = history_store.since_id(history_store.BLOG, self.last_id)
+        if not rows:
+            return 0
+        new_sigs: List[np.ndarray] = []
+        for row in rows:
+            for n, para in enumerate(_paragraphs(row["content"])):
+                sig = minhash(para)
+                if sig is not None:
+                    new_sigs.append(sig)
+                    self.labels.append(f"{row['ts']} ¶{n + 1}")
+
+        start = len(self.sigs)
+        if new_sigs:
+            self.sigs = np.vstack([self.sigs, np.stack(new_sigs)])
+            self._bucket(range(start, len(self.sigs)))
+        self.last_id = rows[-1]["id"]
+        self.save()
+        return len(new_sigs)
+
+    # -- scoring ----------------------------------------------------
+    def _score_sig(self, sig: np.ndarray) -> Tuple[float, int]:
+        cands = {r for b in range(BANDS)
+                 for r in self.buckets[b].get(sig[b * ROWS:(b + 1) * ROWS].tobytes(), ())}
+        if not cands:
+            return 0.0, -1
+        rows = np.fromiter(cands, dtype=np.int64, count=len(cands))
+        sims = (self.sigs[rows] == sig).mean(axis=1)
+        i = int(np.argmax(sims))
+        return float(sims[i]), int(rows[i])
+
+    def score(self, text: str) -> Tuple[float, str | None]:
+        """Highest estimated Jaccard of any paragraph in *text* vs. the archive."""
+        best, best_row = 0.0, -1
+        for para in _paragraphs(text):
+            sig = minhash(para)
+            if sig is None:
+                continue
+            sim, row = self._score_sig(sig)
+            if sim > best:
+                best, best_row = sim, row
+        return best, (self.labels[best_row] if best_row >= 0 else None)
+
+
+_index: BlogDedupIndex | None = None
+
+def get_index() -> BlogDedupIndex:
+    global _index
+    if _index is None:
+        _index = BlogDedupIndex()
+    else:
+        _index.refresh()
+    return _index
+
+
+# ─── Pipeline hook ─────────────────────────────────────────────
+def regenerate_if_repeat(
+    title: str,
+    text: str,
+    regenerate: Callable[[str], str],
+    threshold: float = DUP_THRESHOLD,
+) -> str:
+    """
+    Score *text* against the archive; while it scores above *threshold*,
+    call *regenerate(feedback)* for a fresh draft (at most MAX_REGEN times).
+    """
+    try:
+        index = get_index()
+    except Exception as exc:
+        print(f"Dedup check skipped – {exc}")
+        return text
+    for _ in range(MAX_REGEN):
+        sim, match = index.score(text)
+        if sim < threshold:
+            break
+        print(f"[⚠] Section {title} repeats {match} (jaccard≈{sim:.2f}); regenerating …")
+        try:
+            text = regenerate(
+                f"A previous draft closely repeated an earlier post (similarity {sim:.2f}). "
+                "Use a fresh angle, new structure and different wording; do not reuse stock phrases."
+            )
+        except Exception as exc:
+            print(f"[!] Regeneration of {title} failed: {exc}")
+            break
+    return text
+
+
+if __name__ == "__main__":
+    import sys, time
+    t0 = time.perf_counter()
+    idx = get_index()
+    print(f"Indexed {len(idx.sigs)} paragraphs in {time.perf_counter() - t0:.2f}s")
+    if len(sys.argv) == 2:
+        t0 = time.perf_counter()
+        sim, match = idx.score(Path(sys.argv[1]).read_text(encoding="utf-8"))
+        print(f"Score {sim:.2f} vs {match} in {(time.perf_counter() - t0) * 1000:.1f} ms")
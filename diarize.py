@@ -1,119 +1,268 @@
-from pydub import AudioSegment
+from concurrent.futures import ProcessPoolExecutor
 from pyannote.audio import Pipeline
+from rttm import Rttm, read_rttm
 from tqdm import tqdm
+import multiprocessing
+import numpy as np
 import os
-import math
+import resource
+import struct
+import sys
+import time
 
 audio_file = "mix16k.wav"
 merged_rttm = "full_dialogue.rttm"
-speaker_a = "SPEAKER_00"
-speaker_b = "SPEAKER_01"
+num_speakers = int(os.getenv("NUM_SPEAKERS", "2"))
 
-# Step 1: Run diarization on full audio and save RTTM
-def diarize_full(audio_path, rttm_path):
-    pipeline = Pipeline.from_pretrained("pyannote/speaker-diarization-3.1")
-    diarization = pipeline(audio_path, num_speakers=2)
-    with open(rttm_path, "w") as f:
-        diarization.write_rttm(f)
-    print(f"RTTM saved to: {rttm_path}")
+# Windowed mode: recordings longer than 1.5 windows are split into overlapping
+# windows diarized in parallel, then stitched by speaker-embedding similarity
+window_s = float(os.getenv("DIARIZE_WINDOW_S", "600"))
+overlap_s = float(os.getenv("DIARIZE_OVERLAP_S", "30"))
+workers = int(os.getenv("DIARIZE_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+stitch_threshold = 0.5      # min cosine similarity to reuse a known speaker
 
-# Step 2: Parse RTTM and extract per-speaker segments
-def extract_speakers_audio(audio_path, rttm_path):
-    with open(rttm_path) as f:
-        lines = [line.strip() for line in f if line.strip()]
-
-    # Determine unique speaker labels
-    speakers = sorted({line.split()[7] for line in lines})
-    if len(speakers) != 2:
-        raise ValueError(f"Expected 2 speakers in RTTM, found {len(speakers)}: {speakers}")
-    mapping = {speakers[0]: speaker_a, speakers[1]: speaker_b}
-
-    full_audio = AudioSegment.from_wav(audio_path)
-    duration_ms = len(full_audio)
-    audio_tracks = {
-        speaker_a: AudioSegment.silent(duration=duration_ms),
-        speaker_b: AudioSegment.silent(duration=duration_ms)
-    }
-
-    for line in tqdm(lines, desc="Extracting speaker audio"):
-        parts = line.split()
-        start_ms = int(float(parts[3]) * 1000)
-        length_ms = int(float(parts[4]) * 1000)
-        original_label = parts[7]
-        mapped_label = mapping[original_label]
-        segment = full_audio[start_ms:start_ms + length_ms]
-        audio_tracks[mapped_label] = audio_tracks[mapped_label].overlay(segment, position=start_ms)
-
-    # Export separate speaker files
-    audio_tracks[speaker_a].export("speaker_a.wav", format="wav")
-    audio_tracks[speaker_b].export("speaker_b.wav", format="wav")
-    print("Exported speaker_a.wav and speaker_b.wav")
+# ─── WAV memory mapping ────────────────────────────────────────
+def wav_layout(path):
+    """Return (sample_rate, channels, sample dtype, data offset, frame count) of a PCM WAV."""
+    with open(path, "rb") as f:
+        riff = f.read(12)
+        if riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+            raise ValueError(f"{path} is not a WAV file")
+        fmt = None
+        while True:
+            head = f.read(8)
+            if len(head) < 8:
+                raise ValueError(f"{path} has no data chunk")
+            cid, size = head[:4], struct.unpack("<I", head[4:])[0]
+            if cid == b"fmt ":
+                body = f.read(size + (size & 1))
+                tag, channels, rate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+                if tag not in (1, 0xFFFE) or bits != 16:
+                    raise ValueError(f"{path}: only 16-bit PCM is supported (format {tag}, {bits}-bit)")
+                fmt = (rate, channels)
+            elif cid == b"data":
+                if fmt is None:
+                    raise ValueError(f"{path}: data chunk before fmt chunk")
+                offset = f.tell()
+                available = os.path.getsize(path) - offset
+                size = available if size in (0, 0xFFFFFFFF) else min(size, available)
+                return fmt[0], fmt[1], np.dtype("<i2"), offset, size // (2 * fmt[1])
+            else:
+                f.seek(size + (size & 1), 1)
 
-# Full pipeline
-def run_full_pipeline():
-    print("Running full diarization pipeline...")
-    diarize_full(audio_file, merged_rttm)
-    extract_speakers_audio(audio_file, merged_rttm)
-    print("Done.")
 
-if __name__ == "__main__":
-    run_full_pipeline()from pydub import AudioSegment
-from pyannote.audio import Pipeline
-from tqdm import tqdm
-import os
-import math
+def open_wav(path):
+    """Memory-map a 16-bit PCM WAV as a read-only (frames, channels) int16 array."""
+    rate, channels, dtype, offset, frames = wav_layout(path)
+    return rate, np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(frames, channels))
+
+
+def create_wav(path, rate, channels, frames):
+    """Create a silent 16-bit WAV of *frames* frames and return it as a writable memmap."""
+    data_bytes = frames * channels * 2
+    with open(path, "wb") as f:
+        f.write(b"RIFF" + struct.pack("<I", 36 + data_bytes) + b"WAVE")
+        f.write(b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, rate, rate * channels * 2, channels * 2, 16))
+        f.write(b"data" + struct.pack("<I", data_bytes))
+        f.truncate(44 + data_bytes)          # sparse zeros = silence, nothing written up front
+    return np.memmap(path, dtype="<i2", mode="r+", offset=44, shape=(frames, channels))
+
+
+def speaker_filename(index):
+    """speaker_a.wav, speaker_b.wav, …, speaker_z.wav, speaker_27.wav, …"""
+    return f"speaker_{chr(ord('a') + index)}.wav" if index < 26 else f"speaker_{index + 1}.wav"
+
+def load_pipeline():
+    return Pipeline.from_pretrained("pyannote/speaker-diarization-3.1")
 
-audio_file = "mix16k.wav"
-merged_rttm = "full_dialogue.rttm"
-speaker_a = "SPEAKER_00"
-speaker_b = "SPEAKER_01"
 
 # Step 1: Run diarization on full audio and save RTTM
-def diarize_full(audio_path, rttm_path):
-    pipeline = Pipeline.from_pretrained("pyannote/speaker-diarization-3.1")
-    diarization = pipeline(audio_path, num_speakers=2)
+def diarize_full(audio_path, rttm_path, speakers=num_speakers):
+    pipeline = load_pipeline()
+    diarization = pipeline(audio_path, num_speakers=speakers)
     with open(rttm_path, "w") as f:
         diarization.write_rttm(f)
     print(f"RTTM saved to: {rttm_path}")
 
-# Step 2: Parse RTTM and extract per-speaker segments
-def extract_speakers_audio(audio_path, rttm_path):
-    with open(rttm_path) as f:
-        lines = [line.strip() for line in f if line.strip()]
-
-    # Determine unique speaker labels
-    speakers = sorted({line.split()[7] for line in lines})
-    if len(speakers) != 2:
-        raise ValueError(f"Expected 2 speakers in RTTM, found {len(speakers)}: {speakers}")
-    mapping = {speakers[0]: speaker_a, speakers[1]: speaker_b}
-
-    full_audio = AudioSegment.from_wav(audio_path)
-    duration_ms = len(full_audio)
-    audio_tracks = {
-        speaker_a: AudioSegment.silent(duration=duration_ms),
-        speaker_b: AudioSegment.silent(duration=duration_ms)
-    }
-
-    for line in tqdm(lines, desc="Extracting speaker audio"):
-        parts = line.split()
-        start_ms = int(float(parts[3]) * 1000)
-        length_ms = int(float(parts[4]) * 1000)
-        original_label = parts[7]
-        mapped_label = mapping[original_label]
-        segment = full_audio[start_ms:start_ms + length_ms]
-        audio_tracks[mapped_label] = audio_tracks[mapped_label].overlay(segment, position=start_ms)
-
-    # Export separate speaker files
-    audio_tracks[speaker_a].export("speaker_a.wav", format="wav")
-    audio_tracks[speaker_b].export("speaker_b.wav", format="wav")
-    print("Exported speaker_a.wav and speaker_b.wav")
+# Step 1 (long recordings): overlapping windows in a process pool
+_pipeline = None
+
+def _init_worker(threads):
+    global _pipeline
+    import torch
+    torch.set_num_threads(threads)
+    _pipeline = load_pipeline()
+
+
+def _diarize_window(audio_path, start, end, speakers):
+    """Diarize frames [start, end); returns (segments in seconds, labels, centroids)."""
+    import torch
+    rate, source = open_wav(audio_path)
+    chunk = np.asarray(source[start:end], dtype=np.float32).T / 32768.0
+    diarization, centroids = _pipeline(
+        {"waveform": torch.from_numpy(chunk), "sample_rate": rate},
+        num_speakers=speakers, return_embeddings=True,
+    )
+    offset = start / rate
+    segments = [(turn.start + offset, turn.end + offset, label)
+                for turn, _, label in diarization.itertracks(yield_label=True)]
+    return segments, list(diarization.labels()), np.asarray(centroids, dtype=np.float32)
+
+
+def plan_windows(frames, rate, window=window_s, overlap=overlap_s):
+    """[(start, end, own_start, own_end)] in frames; each window owns the middle of its overlaps."""
+    size, step = int(window * rate), int((window - overlap) * rate)
+    starts = list(range(0, max(frames - int(overlap * rate), 1), step))
+    plan = []
+    for i, start in enumerate(starts):
+        end = min(start + size, frames)
+        own_start = 0 if i == 0 else start + int(overlap * rate) // 2
+        own_end = frames if i == len(starts) - 1 else starts[i + 1] + int(overlap * rate) // 2
+        plan.append((start, end, own_start, own_end))
+    return plan
+
+
+def _unit(v):
+    return v / (np.linalg.norm(v, axis=-1, keepdims=True) + 1e-9)
+
+
+def _assign_labels(centroids, known, max_speakers):
+    """
+    Map window-local speakers to global ids by greedy one-to-one cosine
+    matching against *known* (running sums of unit centroids, updated in place).
+    Unmatched speakers open a new id while the budget allows, otherwise
+    they join the most similar free id.
+    """
+    local = _unit(np.nan_to_num(centroids))          # speakers with too little speech have NaN centroids
+    sims = local @ _unit(np.stack(known)).T if known else np.zeros((len(local), 0))
+    mapping = {}
+    for flat in np.argsort(-sims, axis=None):
+        li, gi = divmod(int(flat), sims.shape[1])
+        if sims[li, gi] < stitch_threshold:
+            break
+        if li not in mapping and gi not in mapping.values():
+            mapping[li] = gi
+    for li in np.argsort(-np.linalg.norm(np.nan_to_num(centroids), axis=1)):
+        li = int(li)
+        if li in mapping:
+            continue
+        free = [g for g in range(len(known)) if g not in mapping.values()]
+        if len(known) < max_speakers and (not free or np.any(local[li])):
+            known.append(np.zeros_like(local[li]))
+            mapping[li] = len(known) - 1
+        else:
+            mapping[li] = max(free or range(len(known)), key=lambda g: sims[li, g] if g < sims.shape[1] else -1)
+    for li, gi in mapping.items():
+        known[gi] += local[li]
+    return mapping
+
+
+def diarize_windowed(audio_path, rttm_path, speakers=num_speakers, window=window_s,
+                     overlap=overlap_s, max_workers=workers):
+    rate, source = open_wav(audio_path)
+    frames = len(source)
+    del source
+    plan = plan_windows(frames, rate, window, overlap)
+    max_workers = max(1, min(max_workers, len(plan)))
+    threads = max(1, (os.cpu_count() or 1) // max_workers)
+    print(f"Diarizing {frames / rate / 60:.1f} min in {len(plan)} windows on {max_workers} worker(s)")
+
+    with ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(threads,)) as pool:
+        futures = [pool.submit(_diarize_window, audio_path, start, end, speakers)
+                   for start, end, _, _ in plan]
+        known, stitched = [], []
+        for (start, end, own_start, own_end), fut in zip(plan, tqdm(futures, desc="Windows")):
+            segments, labels, centroids = fut.result()
+            mapping = _assign_labels(centroids, known, speakers)
+            lo, hi = own_start / rate, own_end / rate
+            for seg_start, seg_end, label in segments:
+                seg_start, seg_end = max(seg_start, lo), min(seg_end, hi)
+                if seg_end > seg_start:
+                    stitched.append((seg_start, seg_end, f"SPEAKER_{mapping[labels.index(label)]:02d}"))
+
+    uri = os.path.splitext(os.path.basename(audio_path))[0]
+    Rttm.from_turns(stitched, uri).merged(gap=0.05).write(rttm_path)
+    print(f"RTTM saved to: {rttm_path} ({len(known)} speaker(s) across {len(plan)} windows)")
+
+
+def diarize(audio_path, rttm_path, speakers=num_speakers):
+    """Single pass for short recordings, windowed + parallel for long ones."""
+    rate, *_, frames = wav_layout(audio_path)
+    if frames / rate > 1.5 * window_s:
+        diarize_windowed(audio_path, rttm_path, speakers)
+    else:
+        diarize_full(audio_path, rttm_path, speakers)
+
+# Step 2: Parse RTTM and copy each speaker's segments into its own track
+def extract_speakers_audio(audio_path, rttm_path, out_dir="."):
+    """
+    Write one full-length WAV per speaker holding only that speaker's
+    segments (silence elsewhere). Source and outputs are memory-mapped, so
+    each segment is a single slice copy: linear in the audio length and
+    bounded in memory regardless of recording length or speaker count.
+    """
+    turns = read_rttm(rttm_path).merged()          # overlapping turns → one copy each
+    speakers = turns.speakers
+    if not speakers:
+        raise ValueError(f"No speaker segments found in {rttm_path}")
+    print(f"Found {len(speakers)} speaker(s): {', '.join(speakers)}")
+
+    rate, source = open_wav(audio_path)
+    frames, channels = source.shape
+    paths = [os.path.join(out_dir, speaker_filename(i)) for i in range(len(speakers))]
+    tracks = [create_wav(path, rate, channels, frames) for path in paths]
+
+    starts = np.clip(np.rint(turns.start * rate).astype(np.int64), 0, frames)
+    ends = np.clip(np.rint(turns.end * rate).astype(np.int64), 0, frames)
+    for start, end, sid in tqdm(zip(starts.tolist(), ends.tolist(), turns.speaker.tolist()),
+                                total=len(turns), desc="Extracting speaker audio"):
+        tracks[sid][start:end] = source[start:end]
+
+    for track in tracks:
+        track.flush()
+    del tracks
+    for label, path in zip(speakers, paths):
+        print(f"Exported {path} ({label})")
+    return dict(zip(speakers, paths))
 
 # Full pipeline
 def run_full_pipeline():
     print("Running full diarization pipeline...")
-    diarize_full(audio_file, merged_rttm)
+    diarize(audio_file, merged_rttm)
     extract_speakers_audio(audio_file, merged_rttm)
     print("Done.")
 
+# Benchmark: each mode in a fresh interpreter so peak RSS is measured separately
+def _peak_rss_mb():
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    child = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return own, child
+
+
+def benchmark(audio_path):
+    import subprocess
+    rate, *_, frames = wav_layout(audio_path)
+    duration = frames / rate
+    print(f"Benchmarking on {audio_path} ({duration / 60:.1f} min)")
+    for mode in ("single", "windowed"):
+        t0 = time.perf_counter()
+        out = subprocess.run([sys.executable, __file__, "--mode", mode, audio_path],
+                             capture_output=True, text=True, check=True).stdout
+        elapsed = time.perf_counter() - t0
+        rss = out.strip().splitlines()[-1]
+        print(f"{mode:>8}: {elapsed:7.1f}s  RTF {elapsed / duration:.3f}  {rss}")
+
+
 if __name__ == "__main__":
-    run_full_pipeline()
+    if len(sys.argv) >= 2 and sys.argv[1] == "--bench":
+        benchmark(sys.argv[2] if len(sys.argv) > 2 else audio_file)
+    elif len(sys.argv) >= 2 and sys.argv[1] == "--mode":
+        if len(sys.argv) < 4 or sys.argv[2] not in ("single", "windowed"):
+            sys.exit("Usage: python diarize.py --mode single|windowed AUDIO.wav")
+        rttm = f"bench_{sys.argv[2]}.rttm"
+        (diarize_full if sys.argv[2] == "single" else diarize_windowed)(sys.argv[3], rttm)
+        own, child = _peak_rss_mb()
+        print(f"peak RSS {own:.0f} MB main, {child:.0f} MB largest worker")
+    else:
+        run_full_pipeline()
@@ -1,32 +1,179 @@
 # create_overlay_cutaway_video.py
 
+import hashlib
 import os
-from moviepy.editor import VideoFileClip
+import re
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
+import run_manifest
+from audio_assembly import ffmpeg_exe
+
 # -------------------------
 # Configuration constants
 # (kept unchanged for workflow compatibility)
 # -------------------------
 AVATAR_VIDEO = 'avatar_video.mp4'
-IMAGES_FOLDER = 'ai_images/'         # no longer used, left for compatibility
+IMAGES_FOLDER = 'ai_images/'         # scene_N.png from generate_ai_images.py
 FINAL_VIDEO  = 'video_output.mp4'
 
 FRAME_RATE   = 24
-SHOW_IMAGE_EVERY = 6                 # unused
-IMAGE_DURATION   = 3                 # unused
-IMAGE_FADE       = 0.5               # unused
+SHOW_IMAGE_EVERY = 6                 # seconds between cutaway starts
+IMAGE_DURATION   = 3                 # seconds each cutaway stays on screen
+IMAGE_FADE       = 0.5               # fade in / out, seconds
 SHORTS_WIDTH  = 1080
 SHORTS_HEIGHT = 1920
 MAX_DURATION  = 60                   # Shorts must be ≤ 60 s
 
+# Engine: "ffmpeg" (one filter graph, one subprocess) or "moviepy" (frame-by-frame fallback)
+VIDEO_ENGINE  = os.getenv("VIDEO_ENGINE", "ffmpeg")
+X264_PRESET   = os.getenv("X264_PRESET", "veryfast")
+X264_CRF      = os.getenv("X264_CRF", "23")
+CUTAWAYS      = os.getenv("CUTAWAYS", "1") == "1"
+CUTAWAY_CACHE = os.path.join(".cache", "cutaways")
+
 # -------------------------
-# Main function — converts avatar video to portrait
+# Cutaways — scene images pre-scaled once, placed on a declarative timeline
 # -------------------------
-def create_overlay_cutaway_video():
+@dataclass
+class Cutaway:
+    image: str          # pre-scaled 1080 × 1920 frame
+    start: float
+    duration: float = IMAGE_DURATION
+    fade: float = IMAGE_FADE
+
+
+def _scene_number(name):
+    m = re.search(r"(\d+)", name)
+    return int(m.group(1)) if m else 0
+
+
+def prescale_image(path, cache_dir=CUTAWAY_CACHE):
+    """
+    Fit *path* into a 1080 × 1920 frame over a blurred, cover-scaled copy of
+    itself and cache the result under a hash of the source bytes, so each
+    image is resized exactly once no matter how often it is rendered.
+    """
+    from PIL import Image, ImageFilter
+
+    with open(path, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:16]
+    out = os.path.join(cache_dir, f"{digest}_{SHORTS_WIDTH}x{SHORTS_HEIGHT}.jpg")
+    if os.path.exists(out):
+        return out
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with Image.open(path) as img:
+        img = img.convert("RGB")
+        cover = max(SHORTS_WIDTH / img.width, SHORTS_HEIGHT / img.height)
+        bg = img.resize((round(img.width * cover), round(img.height * cover)), Image.BILINEAR)
+        left, top = (bg.width - SHORTS_WIDTH) // 2, (bg.height - SHORTS_HEIGHT) // 2
+        bg = bg.crop((left, top, left + SHORTS_WIDTH, top + SHORTS_HEIGHT)).filter(ImageFilter.GaussianBlur(40))
+        fit = min(SHORTS_WIDTH / img.width, SHORTS_HEIGHT / img.height)
+        fg = img.resize((round(img.width * fit), round(img.height * fit)), Image.LANCZOS)
+        bg.paste(fg, ((SHORTS_WIDTH - fg.width) // 2, (SHORTS_HEIGHT - fg.height) // 2))
+        bg.save(out, "JPEG", quality=92)
+    return out
+
+
+def folder_images(folder=IMAGES_FOLDER):
+    """Every scene image in *folder*, in scene order (benchmark input)."""
+    if not os.path.isdir(folder):
+        return []
+    names = sorted((f for f in os.listdir(folder) if f.lower().endswith((".png", ".jpg", ".jpeg", ".webp"))),
+                   key=_scene_number)
+    return [os.path.join(folder, f) for f in names]
+
+
+def run_scene_images():
+    """
+    Scene images generate_ai_images.py wrote in THIS run (run_manifest.json).
+    ai_images/ is committed by main.yml, so its contents may belong to an
+    earlier, unrelated post – workflows that generate no images get none.
+    """
+    return [p for p in run_manifest.read().get("scene_images", []) if os.path.exists(p)]
+
+
+def plan_cutaways(duration, images=None):
+    """One cutaway every SHOW_IMAGE_EVERY seconds, scene images in order, each used once."""
+    images = run_scene_images() if images is None else images
+    plan, start = [], float(SHOW_IMAGE_EVERY)
+    for path in images:
+        if start + IMAGE_DURATION > duration:
+            break
+        try:
+            plan.append(Cutaway(prescale_image(path), start))
+        except Exception as e:
+            print(f"⚠️ Skipping cutaway {path}: {e}")
+            continue
+        start += SHOW_IMAGE_EVERY
+    return plan
+
+# -------------------------
+# ffmpeg engine — scale + crop + trim in a single filter graph
+# -------------------------
+def _probe_audio_codec(path):
+    """Codec name of the first audio stream (None if silent), parsed from `ffmpeg -i`."""
+    info = subprocess.run([ffmpeg_exe(), "-hide_banner", "-i", path],
+                          capture_output=True, text=True).stderr
+    m = re.search(r"Stream #\S+.*?: Audio: (\w+)", info)
+    return m.group(1) if m else None
+
+
+def probe_duration(path):
+    info = subprocess.run([ffmpeg_exe(), "-hide_banner", "-i", path],
+                          capture_output=True, text=True).stderr
+    m = re.search(r"Duration: (\d+):(\d+):([\d.]+)", info)
+    return int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3)) if m else 0.0
+
+
+def build_filter_graph(cutaways):
+    """Portrait base from input 0, then one faded overlay per cutaway (inputs 1..N)."""
+    chains = [f"[0:v]scale={SHORTS_WIDTH}:{SHORTS_HEIGHT}:force_original_aspect_ratio=increase,"
+              f"crop={SHORTS_WIDTH}:{SHORTS_HEIGHT},setsar=1,fps={FRAME_RATE}[v0]"]
+    for i, c in enumerate(cutaways, start=1):
+        end = c.start + c.duration
+        chains.append(
+            f"[{i}:v]format=yuva420p,"
+            f"fade=t=in:st=0:d={c.fade}:alpha=1,fade=t=out:st={c.duration - c.fade}:d={c.fade}:alpha=1,"
+            f"setpts=PTS-STARTPTS+{c.start}/TB[c{i}]"
+        )
+        chains.append(f"[v{i - 1}][c{i}]overlay=0:0:eof_action=pass:enable='between(t,{c.start},{end})'[v{i}]")
+    return ";".join(chains), f"[v{len(cutaways)}]"
+
+
+def transcode_ffmpeg(src=AVATAR_VIDEO, dst=FINAL_VIDEO, cutaways=()):
+    exe = ffmpeg_exe()
+    if not exe:
+        raise RuntimeError("ffmpeg not found")
+    image_inputs = []
+    for c in cutaways:
+        image_inputs += ["-loop", "1", "-framerate", str(FRAME_RATE), "-t", str(c.duration), "-i", c.image]
+    graph, video_out = build_filter_graph(cutaways)
+    audio = _probe_audio_codec(src)
+    # AAC (HeyGen's default) is stream-copied; anything else is re-encoded once
+    audio_args = ["-c:a", "copy"] if audio == "aac" else ["-c:a", "aac", "-b:a", "128k"] if audio else ["-an"]
+    cmd = [exe, "-hide_banner", "-loglevel", "error", "-y",
+           "-i", src, *image_inputs, "-t", str(MAX_DURATION),
+           "-filter_complex", graph, "-map", video_out, "-map", "0:a:0?",
+           "-c:v", "libx264", "-preset", X264_PRESET, "-crf", X264_CRF, "-pix_fmt", "yuv420p",
+           *audio_args, "-movflags", "+faststart", dst]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.strip()[-500:]}")
+
+# -------------------------
+# MoviePy engine — fallback when ffmpeg is unavailable or fails
+# -------------------------
+def transcode_moviepy(src=AVATAR_VIDEO, dst=FINAL_VIDEO):
+    from moviepy.editor import VideoFileClip
+
     # Load avatar video
-    avatar_clip = VideoFileClip(AVATAR_VIDEO)
+    avatar_clip = VideoFileClip(src)
 
     # Trim to Shorts-legal length
     avatar_duration = min(avatar_clip.duration, MAX_DURATION)
@@ -47,17 +194,69 @@ def create_overlay_cutaway_video():
 
     # Export
     final_clip.write_videofile(
-        FINAL_VIDEO,
+        dst,
         fps=FRAME_RATE,
         codec="libx264",
         audio_codec="aac",
         preset="ultrafast",
         threads=4
     )
+
+# -------------------------
+# Main function — converts avatar video to portrait, with image cutaways
+# -------------------------
+def create_overlay_cutaway_video():
+    if VIDEO_ENGINE == "ffmpeg":
+        try:
+            cutaways = plan_cutaways(min(probe_duration(AVATAR_VIDEO), MAX_DURATION)) if CUTAWAYS else []
+            transcode_ffmpeg(AVATAR_VIDEO, FINAL_VIDEO, cutaways)
+            print(f"Shorts-ready video created: {FINAL_VIDEO} (ffmpeg, {len(cutaways)} cutaways)")
+            return
+        except Exception as e:
+            print(f"⚠️ ffmpeg engine failed ({e}); falling back to MoviePy (no cutaways)")
+    transcode_moviepy(AVATAR_VIDEO, FINAL_VIDEO)
     print(f"Shorts-ready video created: {FINAL_VIDEO}")
 
+# -------------------------
+# Benchmark — encode time and output size of both engines
+# -------------------------
+def benchmark(sample=None, seconds=30):
+    import tempfile
+    tmp = tempfile.mkdtemp()
+    if not sample:
+        # Synthetic 1280×720 talking-head stand-in with AAC audio
+        sample = os.path.join(tmp, "sample.mp4")
+        subprocess.run([ffmpeg_exe(), "-loglevel", "error", "-y",
+                        "-f", "lavfi", "-i", f"testsrc2=size=1280x720:rate=30:duration={seconds}",
+                        "-f", "lavfi", "-i", f"sine=frequency=220:duration={seconds}",
+                        "-c:v", "libx264", "-preset", "veryfast", "-c:a", "aac", "-shortest", sample],
+                       check=True)
+    print(f"Sample: {sample} ({os.path.getsize(sample) / 1e6:.1f} MB)")
+    t0 = time.perf_counter()
+    cutaways = plan_cutaways(min(probe_duration(sample), MAX_DURATION), folder_images())
+    print(f"Pre-scaled {len(cutaways)} cutaway image(s) in {time.perf_counter() - t0:.1f}s")
+    engines = (("ffmpeg", transcode_ffmpeg),
+               ("ffmpeg+cutaways", lambda s, d: transcode_ffmpeg(s, d, cutaways)),
+               ("moviepy", transcode_moviepy))
+    for name, engine in engines:
+        out = os.path.join(tmp, f"{name.replace('+', '_')}.mp4")
+        t0 = time.perf_counter()
+        try:
+            engine(sample, out)
+        except ImportError as e:
+            print(f"{name:>15}: skipped ({e})")
+            continue
+        except Exception as e:          # e.g. MoviePy 1.x on Pillow 10 (Image.ANTIALIAS removed)
+            print(f"{name:>15}: FAILED ({type(e).__name__}: {e})")
+            continue
+        elapsed = time.perf_counter() - t0
+        print(f"{name:>15}: {elapsed:6.1f}s  {os.path.getsize(out) / 1e6:6.2f} MB")
+
 # -------------------------
 # Entry point
 # -------------------------
 if __name__ == "__main__":
-    create_overlay_cutaway_video()
+    if len(sys.argv) >= 2 and sys.argv[1] == "--bench":
+        benchmark(sys.argv[2] if len(sys.argv) > 2 else None)
+    else:
+        create_overlay_cutaway_video()
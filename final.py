@@ -1,15 +1,16 @@
 import os
 import json
-import openai
 import requests
 import pytz
 import re
 from datetime import datetime
 from dotenv import load_dotenv
-from openai import OpenAIError
 
 # Custom utilities
-import image_utils
+import lazy_imports
+import blog_dedup
+import history_store
+import run_manifest
 from market_snapshot_fetcher import get_market_snapshot, append_snapshot_to_log, summarize_market_snapshot
 
 # Load credentials
@@ -18,8 +19,13 @@ OPENAI_API_KEY   = os.getenv("OPENAI_API_KEY")
 WP_USERNAME     = os.getenv("WP_USERNAME")
 WP_APP_PASSWORD = os.getenv("WP_APP_PASSWORD")
 WP_SITE_URL     = os.getenv("WP_SITE_URL")
+# "now": create the post here; "deferred": leave a draft for publish.py (one post write, parallel uploads)
+PUBLISH_MODE    = os.getenv("PUBLISH_MODE", "now")
 
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
+# Deferred to first use so `from final import post_to_wordpress` stays cheap
+openai      = lazy_imports.module("openai")
+image_utils = lazy_imports.module("image_utils")
+client      = lazy_imports.Lazy(lambda: openai.OpenAI(api_key=OPENAI_API_KEY))
 
 def ordinal(n: int) -> str:
     if 11 <= (n % 100) <= 13:
@@ -29,14 +35,14 @@ def ordinal(n: int) -> str:
     return f"{n}{suffix}"
 
 def log_blog_to_history(blog_content: str):
-    LOG_FILE = "blog_history.txt"
     ts = datetime.now(pytz.utc).astimezone(pytz.timezone('America/New_York')) \
-             .strftime("%Y-%m-%d %H:%M:%S %Z")
-    divider = "=" * 80
-    entry = f"\n\n{divider}\nBLOG ENTRY - {ts}\n{divider}\n\n{blog_content}\n"
-    with open(LOG_FILE, "a") as f:
-        f.write(entry)
-    print("Logged to", LOG_FILE)
+             .strftime("%Y-%m-%d %H:%M:%S")
+    history_store.append(history_store.BLOG, blog_content, ts=ts)
+    print("Logged to", history_store.DB_FILE)
+    try:
+        blog_dedup.get_index()  # hashes only the entry just stored
+    except Exception as e:
+        print(f"Dedup index update skipped: {e}")
 
 def generate_blog(market_summary: dict, section_count: int = 1):
     est = pytz.timezone("America/New_York")
@@ -58,6 +64,7 @@ def generate_blog(market_summary: dict, section_count: int = 1):
 
     for idx, key in enumerate(section_keys[:section_count]):
         title = key.replace("_", " ").title()
+        opening = f"Begin the first section with this exact sentence:\n{today_line}" if idx == 0 else ""
         clean_text = re.sub(r'\(\^[A-Z0-9\.\-]+\)', '', market_summary.get(key, ""))
         system_msg = {
             "role": "system",
@@ -65,21 +72,27 @@ def generate_blog(market_summary: dict, section_count: int = 1):
                 f"You are a senior financial journalist. Write the section titled '{title}'.\n\n"
                 "Each section should be around 250–350 words, professional, analytical, and based only on the provided content.\n"
                 "Avoid repetition. Do not use headings or ticker symbols in the output.\n"
-                f"{'Begin the first section with this exact sentence:\n' + today_line if idx == 0 else ''}"
+                f"{opening}"
             )
         }
         messages = [system_msg, {"role": "user", "content": clean_text}]
-        try:
+
+        def write_section(feedback: str = "") -> str:
+            msgs = messages + ([{"role": "system", "content": feedback}] if feedback else [])
             resp = client.chat.completions.create(
                 model="gpt-4o",
-                messages=messages,
+                messages=msgs,
                 temperature=0.7
             )
-            section_text = resp.choices[0].message.content.strip()
+            return resp.choices[0].message.content.strip()
+
+        try:
+            section_text = blog_dedup.regenerate_if_repeat(title, write_section(), write_section)
             blog_sections.append(section_text)
-        except OpenAIError as e:
+        except openai.OpenAIError as e:
             print(f"[!] Section {title} failed: {e}")
             blog_sections.append("Content temporarily unavailable.")
+            run_manifest.note_fallback(f"section {title} unavailable")
 
     full_blog = "\n\n".join(blog_sections)
 
@@ -153,7 +166,14 @@ def generate_video_prompt(summary_text):
         print(f"Failed to generate video narration prompt: {e}")
         return ""
 
-def post_to_wordpress(title: str, content: str, featured_media: int):
+def post_to_wordpress(title: str, content: str, featured_media: int, poster: dict | None = None):
+    """Publish the post; returns its ID (also recorded in the run manifest) or None."""
+    if PUBLISH_MODE == "deferred":
+        # publish.py uploads the poster plan with audio/video and creates the post once
+        run_manifest.start(draft={"title": title, "content": content,
+                                  "poster": poster or {"id": featured_media, "source_url": ""}})
+        print("Draft saved to", run_manifest.MANIFEST_FILE, "for publish.py")
+        return None
     try:
         payload = {
             "title": title,
@@ -164,14 +184,24 @@ def post_to_wordpress(title: str, content: str, featured_media: int):
         resp = requests.post(
             f"{WP_SITE_URL}/wp-json/wp/v2/posts",
             auth=(WP_USERNAME, WP_APP_PASSWORD),
+            params={"_fields": "id,link"},
             json=payload
         )
         resp.raise_for_status()
-        print("Published post (status", resp.status_code, ")")
+        post = resp.json()
+        print("Published post", post["id"], "(status", resp.status_code, ")")
+        run_manifest.start(post_id=post["id"], link=post.get("link", ""), title=title,
+                           featured_media=featured_media)
+        return post["id"]
     except requests.RequestException as e:
         print(f"Failed to post to WordPress: {e}")
+        return None
 
 if __name__ == "__main__":
+    import argparse
+    argparse.ArgumentParser(description="Generate the Finance Final blog from the market "
+                            "snapshot and publish it").parse_args()
+
     try:
         print("Fetching market snapshot...")
         snapshot        = get_market_snapshot()
@@ -185,7 +215,20 @@ if __name__ == "__main__":
         blog_text, summary_text, base_title = generate_blog(market_summary, section_count=section_count)
 
         print("Fetching and uploading blog poster via Unsplash...")
-        media_obj  = image_utils.fetch_and_upload_blog_poster(blog_text)
+        if image_utils.POSTER_STAGE == "separate":
+            poster     = None              # made by its own pipeline stage
+            media_obj  = {}
+        elif PUBLISH_MODE == "deferred":
+            # Uploaded later by publish.py, alongside the audio and video
+            try:
+                poster = image_utils.prepare_blog_poster(blog_text)
+            except Exception as e:
+                print(f"Error in poster generation: {e}")
+                poster = {}
+            media_obj  = poster if "id" in poster else {}
+        else:
+            poster     = None
+            media_obj  = image_utils.fetch_and_upload_blog_poster(blog_text)
         media_id   = media_obj.get("id", 0)
         media_src  = media_obj.get("source_url", "")
 
@@ -210,7 +253,7 @@ if __name__ == "__main__":
         post_body = f'<div>{blog_text}</div>'
 
         print("Publishing to WordPress...")
-        post_to_wordpress(final_title, post_body, featured_media=media_id)
+        post_to_wordpress(final_title, post_body, featured_media=media_id, poster=poster)
 
         print("Done")
 
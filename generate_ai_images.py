@@ -1,11 +1,18 @@
 import openai
 import os
+import time
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from time import sleep
+from requests.adapters import HTTPAdapter
+
+import image_library
+import run_manifest
 
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
+client = openai.OpenAI(api_key=OPENAI_API_KEY)   # honours OPENAI_BASE_URL, e.g. a local stub server
 
 PROMPT_FOLDER = "visual_prompts"
 OUTPUT_FOLDER = "ai_images"
@@ -13,27 +20,105 @@ os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
 MAX_IMAGES = 7  #  LIMIT TO FIRST N IMAGES TO REDUCE VIDEO LENGTH
 
+IMAGE_WORKERS     = int(os.getenv("IMAGE_WORKERS", "4"))       # concurrent generations
+IMAGES_PER_MINUTE = int(os.getenv("IMAGES_PER_MINUTE", "0"))   # 0 → no client-side pacing
+RETRIES           = 3
+BACKOFF           = 2.0          # seconds, doubled after every failed attempt
+DOWNLOAD_CHUNK    = 1 << 16
+TIMEOUT           = (10, 120)    # connect, read
+
+# One pooled session for all downloads
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=IMAGE_WORKERS, pool_maxsize=IMAGE_WORKERS))
+session.mount("http://", HTTPAdapter(pool_connections=IMAGE_WORKERS, pool_maxsize=IMAGE_WORKERS))
+
+
+class RateLimiter:
+    """Space request starts at least 60 / per_minute seconds apart (shared by all workers)."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        time.sleep(max(0.0, slot - now))
+
+
+limiter = RateLimiter(IMAGES_PER_MINUTE)
+
+
 def read_prompt(file_path):
     with open(file_path, "r", encoding="utf-8") as f:
         return f.read().strip()
 
-def generate_image(prompt, output_path):
+def _retryable(exc):
+    if isinstance(exc, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError,
+                        requests.RequestException)):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code >= 500
+
+def _retry_after(exc, default):
+    response = getattr(exc, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
     try:
-        response = client.images.generate(
-            model="dall-e-3",
-            prompt=prompt,
-            n=1,
-            size="1024x1024"
-        )
-        image_url = response.data[0].url
-
-        import requests
-        img_data = requests.get(image_url).content
-        with open(output_path, 'wb') as f:
-            f.write(img_data)
-        print(f" Saved image to {output_path}")
-    except Exception as e:
-        print(f" Failed to generate image: {e}")
+        return max(default, float(value))
+    except (TypeError, ValueError):
+        return default
+
+def download(url, output_path):
+    """Stream *url* to *output_path* in chunks (atomic rename when complete)."""
+    tmp = output_path + ".part"
+    with session.get(url, stream=True, timeout=TIMEOUT) as r:
+        r.raise_for_status()
+        with open(tmp, "wb") as f:
+            for chunk in r.iter_content(DOWNLOAD_CHUNK):
+                f.write(chunk)
+    os.replace(tmp, output_path)
+
+def generate_image(prompt, output_path):
+    """Generate and download one scene, retrying transient failures; returns True on success."""
+    library = image_library.get_library()
+    hit = library.lookup(prompt, image_library.SCENE)
+    if hit:
+        library.export(hit, output_path)
+        print(f" Reused library image for {output_path}")
+        return True
+    for attempt in range(1, RETRIES + 1):
+        try:
+            limiter.wait()
+            response = client.images.generate(
+                model="dall-e-3",
+                prompt=prompt,
+                n=1,
+                size="1024x1024"
+            )
+            download(response.data[0].url, output_path)
+            print(f" Saved image to {output_path}")
+            try:
+                library.add(prompt, image_library.SCENE, output_path)
+            except Exception as e:
+                print(f" ⚠️ Could not file {output_path} in image library: {e}")
+            return True
+        except Exception as e:
+            if attempt == RETRIES or not _retryable(e):
+                print(f" Failed to generate image {output_path}: {e}")
+                return False
+            delay = _retry_after(e, BACKOFF * 2 ** (attempt - 1))
+            print(f" ⚠️ {output_path}: {e}; retry {attempt}/{RETRIES - 1} in {delay:.0f}s")
+            time.sleep(delay)
+
+def generate_all(jobs, workers=IMAGE_WORKERS):
+    """jobs: [(prompt, output_path)] → {output_path: success}, all scenes in parallel."""
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = pool.map(lambda job: generate_image(*job), jobs)
+        return {path: ok for (_, path), ok in zip(jobs, results)}
 
 if __name__ == "__main__":
     prompt_files = sorted([
@@ -41,11 +126,19 @@ if __name__ == "__main__":
         if f.endswith(".txt")
     ])[:MAX_IMAGES]  #  LIMIT NUMBER OF VISUAL PROMPTS
 
+    # Drop the previous run's scenes so a failed generation can't leave an old image in its slot
+    for name in os.listdir(OUTPUT_FOLDER):
+        if name.startswith("scene_") and name.endswith((".png", ".png.part")):
+            os.remove(os.path.join(OUTPUT_FOLDER, name))
+
+    jobs = []
     for i, filename in enumerate(prompt_files, start=1):
-        prompt_path = os.path.join(PROMPT_FOLDER, filename)
-        prompt_text = read_prompt(prompt_path)
-        print(f" Generating image for scene {i}...")
+        prompt_text = read_prompt(os.path.join(PROMPT_FOLDER, filename))
+        jobs.append((prompt_text, os.path.join(OUTPUT_FOLDER, f"scene_{i}.png")))
 
-        output_file = os.path.join(OUTPUT_FOLDER, f"scene_{i}.png")
-        generate_image(prompt_text, output_file)
-        sleep(1)
+    print(f" Generating {len(jobs)} scene images with {IMAGE_WORKERS} workers...")
+    t0 = time.perf_counter()
+    results = generate_all(jobs)
+    print(f" ✅ {sum(results.values())}/{len(jobs)} images in {time.perf_counter() - t0:.1f}s")
+    # edit_and_merge_video.py only overlays images listed here
+    run_manifest.update(scene_images=[path for _, path in jobs if results[path]])
@@ -1,13 +1,35 @@
+import json
 import os
+import sys
+import threading
 import time
 import requests
 from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import run_manifest
 
 # ------------------ CONFIG -------------------
 HEYGEN_API_KEY = os.environ.get('HEYGEN_API_KEY')  # <-- from GitHub Secret
+HEYGEN_API_BASE = os.environ.get('HEYGEN_API_BASE', 'https://api.heygen.com').rstrip('/')  # mock server in tests
 SCRIPT_FILE = 'video_prompt.txt'
 AVATAR_OUTPUT = 'avatar_video.mp4'
 
+# Render polling: exponential backoff under an overall deadline
+RENDER_DEADLINE = float(os.environ.get('HEYGEN_DEADLINE', '1800'))   # seconds
+POLL_INITIAL    = 5.0
+POLL_MAX        = 60.0
+POLL_FACTOR     = 1.5
+REQUEST_TIMEOUT = (10, 60)
+DOWNLOAD_CHUNK  = 1 << 20
+
+# Optional webhook receiver: HeyGen posts avatar_video.success / .fail to
+# HEYGEN_CALLBACK_URL, which must forward to this port; polling stays as the fallback
+CALLBACK_PORT = int(os.environ.get('HEYGEN_CALLBACK_PORT', '0'))     # 0 → no receiver
+CALLBACK_URL  = os.environ.get('HEYGEN_CALLBACK_URL')
+
+session = requests.Session()
+
 VIDEO_WIDTH = 1280
 VIDEO_HEIGHT = 720
 SPEAK_SPEED = 1.0
@@ -59,14 +81,21 @@ def get_today_avatar_and_voice():
     print(f"🗣️ Today's voice ID: {avatar_voice['voice_id']}")
     return avatar_voice["avatar_id"], avatar_voice["voice_id"]
 
-# ------------------ STEP 3: Generate Avatar Video -------------------
-def generate_avatar_video(script_text, avatar_id, voice_id):
-    url = "https://api.heygen.com/v2/video/generate"
-    headers = {
-        "X-Api-Key": HEYGEN_API_KEY,
-        "Content-Type": "application/json"
-    }
+# ------------------ STEP 3: Submit Render Job -------------------
+class RenderFailed(Exception):
+    pass
+
+
+class RenderTimeout(Exception):
+    pass
 
+
+def _headers():
+    return {"X-Api-Key": HEYGEN_API_KEY or ""}
+
+
+def submit_render(script_text, avatar_id, voice_id):
+    """Start a HeyGen render; returns the video_id without waiting for it."""
     payload = {
         "video_inputs": [
             {
@@ -88,44 +117,173 @@ def generate_avatar_video(script_text, avatar_id, voice_id):
             "height": VIDEO_HEIGHT
         }
     }
+    if CALLBACK_URL:
+        payload["callback_url"] = CALLBACK_URL
 
-    response = requests.post(url, headers=headers, json=payload)
+    response = session.post(f"{HEYGEN_API_BASE}/v2/video/generate", headers=_headers(),
+                            json=payload, timeout=REQUEST_TIMEOUT)
     response.raise_for_status()
-
     video_id = response.json()["data"]["video_id"]
-    return wait_for_video_ready(video_id)
+    print(f"🎬 HeyGen render submitted: {video_id}")
+    return video_id
+
+# ------------------ Webhook receiver (optional) -------------------
+class CallbackReceiver:
+    """Tiny HTTP server that records HeyGen webhook events by video_id."""
+
+    def __init__(self, port=CALLBACK_PORT):
+        self.events = {}                    # video_id → (status, url)
+        self.changed = threading.Condition()
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                    data = body.get("event_data", {})
+                    status = "completed" if body.get("event_type", "").endswith("success") else "failed"
+                    receiver._record(data.get("video_id"), status, data.get("url"))
+                    self.send_response(200)
+                except ValueError:
+                    self.send_response(400)
+                self.end_headers()
 
-def wait_for_video_ready(video_id):
-    headers = { "X-Api-Key": HEYGEN_API_KEY }
-    status_url = f"https://api.heygen.com/v1/video_status.get?video_id={video_id}"
+        self.server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+        self.port = self.server.server_port
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"📡 Listening for HeyGen callbacks on :{self.port}")
 
-    while True:
-        response = requests.get(status_url, headers=headers)
+    def _record(self, video_id, status, url):
+        with self.changed:
+            self.events[video_id] = (status, url)
+            self.changed.notify_all()
+
+    def wait(self, video_id, timeout):
+        """Sleep up to *timeout* seconds, waking early if *video_id* reports in."""
+        with self.changed:
+            self.changed.wait_for(lambda: video_id in self.events, timeout)
+            event = self.events.get(video_id)
+            if event and event[0] == "completed" and not event[1]:
+                del self.events[video_id]       # no URL: a one-off "poll now", not a ready state
+            return event
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+# ------------------ STEP 4: Wait + Download (render job) -------------------
+class RenderJob:
+    """
+    Polls one render with exponential backoff until RENDER_DEADLINE, then
+    streams the result to disk. The workflows overlap the render with other
+    work by splitting submit and wait into separate steps (--submit / --wait).
+    """
+
+    def __init__(self, video_id, output_path=AVATAR_OUTPUT, deadline=RENDER_DEADLINE, receiver=None):
+        self.video_id = video_id
+        self.output_path = output_path
+        self.deadline = deadline
+        self.receiver = receiver
+
+    def poll_once(self):
+        response = session.get(f"{HEYGEN_API_BASE}/v1/video_status.get", params={"video_id": self.video_id},
+                               headers=_headers(), timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         data = response.json()["data"]
+        return data["status"], data.get("video_url"), data.get("error")
+
+    def wait_until_ready(self):
+        """Video URL once the render completes; RenderFailed / RenderTimeout otherwise."""
+        t0 = time.monotonic()
+        delay = POLL_INITIAL
+        while True:
+            try:
+                status, url, error = self.poll_once()
+            except requests.RequestException as e:
+                code = e.response.status_code if e.response is not None else None
+                if code is not None and code < 500 and code != 429:
+                    raise       # bad key / unknown video_id – polling won't fix it
+                status, url, error = "unknown", None, None
+                print(f"⚠️ Status check failed ({e}); retrying")
+            if status == "completed":
+                print(f" Video is ready! ({time.monotonic() - t0:.0f}s)")
+                return url
+            if status == "failed":
+                raise RenderFailed(f" Video generation failed: {error or 'no reason given'}")
+
+            remaining = self.deadline - (time.monotonic() - t0)
+            if remaining <= 0:
+                raise RenderTimeout(f"Render {self.video_id} not ready after {self.deadline:.0f}s")
+            pause = min(delay, remaining)
+            print(f"⏳ Render {status}; next check in {pause:.0f}s")
+            if self.receiver:
+                event = self.receiver.wait(self.video_id, pause)
+                if event and event[0] == "completed" and event[1]:
+                    print(" Video is ready! (callback)")
+                    return event[1]
+                if event and event[0] == "failed":
+                    raise RenderFailed(" Video generation failed (callback).")
+            else:
+                time.sleep(pause)
+            delay = min(delay * POLL_FACTOR, POLL_MAX)
+
+    def run(self):
+        url = self.wait_until_ready()
+        return download_video(url, self.output_path)
 
-        if data["status"] == "completed":
-            print(" Video is ready!")
-            return data["video_url"]
-        elif data["status"] == "failed":
-            raise Exception(" Video generation failed.")
-        
-        print("⏳ Waiting for video to finish rendering...")
-        time.sleep(10)
 
-# ------------------ STEP 4: Download Video -------------------
 def download_video(video_url, output_path=AVATAR_OUTPUT):
-    r = requests.get(video_url)
-    with open(output_path, 'wb') as f:
-        f.write(r.content)
-    print(f"📥 Avatar video saved as {output_path}")
+    """Stream the render to disk in chunks (atomic rename when complete)."""
+    tmp = output_path + ".part"
+    with session.get(video_url, stream=True, timeout=REQUEST_TIMEOUT) as r:
+        r.raise_for_status()
+        with open(tmp, 'wb') as f:
+            for chunk in r.iter_content(DOWNLOAD_CHUNK):
+                f.write(chunk)
+    os.replace(tmp, output_path)
+    print(f"📥 Avatar video saved as {output_path} ({os.path.getsize(output_path) / 1e6:.1f} MB)")
+    return output_path
+
+
+def generate_avatar_video(script_text, avatar_id, voice_id):
+    """Submit and wait (blocking); returns the rendered video URL."""
+    return RenderJob(submit_render(script_text, avatar_id, voice_id)).wait_until_ready()
+
+
+def wait_and_download(video_id, output_path=AVATAR_OUTPUT):
+    receiver = CallbackReceiver() if CALLBACK_PORT else None
+    try:
+        return RenderJob(video_id, output_path, receiver=receiver).run()
+    finally:
+        if receiver:
+            receiver.close()
 
 # ------------------ MAIN -------------------
+# Default: submit, wait, download in one go.
+# Split mode lets the workflow overlap the render with other steps:
+#   --submit   start the render, record its video_id in run_manifest.json, exit
+#   --wait     wait for the recorded render and download it
 if __name__ == "__main__":
     if not HEYGEN_API_KEY:
         raise ValueError(" Missing HEYGEN_API_KEY environment variable")
-    
+
+    mode = sys.argv[1] if len(sys.argv) > 1 else ""
+    pending = run_manifest.read().get("heygen_video_id")
+    if mode == "--wait":
+        if not pending:
+            # Never start (and pay for) a render here – the --submit step must have failed
+            sys.exit(f"[!] No heygen_video_id in {run_manifest.MANIFEST_FILE}; run with --submit first")
+        wait_and_download(pending)
+        run_manifest.update(heygen_video_id=None)
+        sys.exit(0)
+
     script_text = read_script(SCRIPT_FILE)
     today_avatar, today_voice = get_today_avatar_and_voice()
-    avatar_video_url = generate_avatar_video(script_text, today_avatar, today_voice)
-    download_video(avatar_video_url)
+    video_id = submit_render(script_text, today_avatar, today_voice)
+    if mode == "--submit":
+        run_manifest.update(heygen_video_id=video_id)
+    else:
+        wait_and_download(video_id)
@@ -1,8 +1,9 @@
 import openai
 import os
-from datetime import datetime
 from dotenv import load_dotenv
 
+import history_store
+
 # ——— Load credentials —————————————————————————————
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -50,14 +51,8 @@ def generate_voiceover_script(summary: str) -> str:
 
     voiceover_script = response.choices[0].message.content.strip()
 
-    # — Save to history file —
-    history_path = "video_prompt_history.txt"
-    ensure_file(history_path)
-    with open(history_path, "a", encoding="utf-8") as hist:
-        hist.write("================================================================================\n")
-        hist.write(f"VOICEOVER SCRIPT — {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        hist.write("================================================================================\n")
-        hist.write(voiceover_script + "\n\n")
+    # — Save to history store —
+    history_store.append(history_store.VOICEOVER, voiceover_script)
 
     # — Save to latest prompt file —
     latest_path = "video_prompt.txt"
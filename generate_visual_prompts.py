@@ -2,9 +2,11 @@
 
 import openai
 import os
-from datetime import datetime
 from dotenv import load_dotenv
 
+import history_store
+import run_manifest
+
 # -------------------------
 # Load API key from environment
 # -------------------------
@@ -65,6 +67,7 @@ def generate_visual_prompt(sentence):
         print(f"Error generating visual prompt: {e}")
         fallback_prompt = "A simple visual of a financial logo with an up or down arrow."
         print("Using fallback prompt instead.")
+        run_manifest.note_fallback(f"generic visual prompt: {e}")
         return fallback_prompt
 
 # -------------------------
@@ -79,16 +82,15 @@ def save_individual_prompts(prompts):
     print(f"Saved {len(prompts)} visual prompts in /visual_prompts")
 
 # -------------------------
-# Append visual prompts to a history log
+# Append visual prompts to the history store
 # -------------------------
 def save_to_history_file(prompts):
-    with open("visual_prompt_history.txt", "a", encoding="utf-8") as f:
-        f.write("================================================================================\n")
-        f.write(f"VISUAL PROMPTS — {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write("================================================================================\n")
-        for i, prompt in enumerate(prompts, 1):
-            f.write(f"[Scene {i}] {prompt}\n\n")
-    print("Appended all prompts to visual_prompt_history.txt")
+    history_store.append_many(
+        history_store.VISUAL_PROMPT,
+        prompts,
+        meta=[{"scene": i} for i in range(1, len(prompts) + 1)]
+    )
+    print(f"Appended all prompts to {history_store.DB_FILE}")
 
 # -------------------------
 # Main execution block
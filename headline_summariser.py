@@ -0,0 +1,45 @@
+"""
+headline_summariser.py  ·  Shared DistilBART headline summariser
+----------------------------------------------------------------
+pulse.py, movers.py and watchlist.py each built the same ≈480 MB
+summarisation pipeline at import time. It is now created once, on the
+first summarise call (or resolve() in main()), through lazy_imports.
+
+USAGE
+    from headline_summariser import summariser
+    summariser(text, max_length=60, min_length=15, do_sample=False)[0]["summary_text"]
+"""
+import lazy_imports
+
+MODEL_NAME = "sshleifer/distilbart-cnn-12-6"
+
+
+def require_backend() -> None:
+    if not any(lazy_imports.available(x) for x in ("torch", "tensorflow", "jax")):
+        raise RuntimeError(
+            "No deep-learning backend detected.\n"
+            "Install CPU PyTorch:\n"
+            "    pip install torch --index-url https://download.pytorch.org/whl/cpu"
+        )
+
+
+def load():
+    require_backend()
+    from transformers import logging as tf_logging, pipeline
+    tf_logging.set_verbosity_error()
+    return pipeline(
+        "summarization",
+        model=MODEL_NAME,
+        tokenizer=MODEL_NAME,
+        framework="pt",
+        truncation=True,
+        token=None          # anonymous download, avoids 401 on HF Hub
+    )
+
+
+summariser = lazy_imports.Lazy(load)
+
+
+def resolve():
+    """Load the model now – call at the top of main() to fail before any scraping."""
+    return lazy_imports.resolve(summariser)
@@ -0,0 +1,238 @@
+"""
+history_store.py  ·  SQLite history of everything the pipeline writes
+---------------------------------------------------------------------
+One indexed store for blog posts, voiceover scripts, video prompts and
+visual prompts, replacing the divider-delimited *_history.txt files.
+
+  • entries      – (kind, ts) indexed rows; ts is "YYYY-MM-DD HH:MM:SS"
+                   in US Eastern time (as the legacy files use), whatever
+                   the runner's local zone
+  • entries_fts  – FTS5 full-text index kept in sync by triggers
+
+The legacy text files are imported once, automatically, the first time
+the database is created (or on demand: `python history_store.py --import`).
+Re-importing is harmless: rows are unique on (kind, ts, digest).
+
+USAGE
+    import history_store
+    history_store.append(history_store.BLOG, blog_text)
+    history_store.latest(history_store.VOICEOVER)
+    history_store.search("treasury yields", kind=history_store.BLOG)
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+DB_FILE = Path("history.db")
+EASTERN = ZoneInfo("America/New_York")    # zone of every stored ts
+TS_FMT  = "%Y-%m-%d %H:%M:%S"
+
+# Entry kinds
+BLOG          = "blog"
+VOICEOVER     = "voiceover_script"
+VIDEO_PROMPT  = "video_prompt"
+VISUAL_PROMPT = "visual_prompt"
+
+LEGACY_FILES = {
+    "blog_history.txt":         r"(?P<label>BLOG ENTRY) - (?P<ts>[^\n]*)",
+    "video_prompt_history.txt": r"(?P<label>VIDEO PROMPT|VOICEOVER SCRIPT) — (?P<ts>[^\n]*)",
+    "visual_prompt_history.txt": r"(?P<label>VISUAL PROMPTS) — (?P<ts>[^\n]*)",
+}
+LABEL_KINDS = {
+    "BLOG ENTRY":       BLOG,
+    "VOICEOVER SCRIPT": VOICEOVER,
+    "VIDEO PROMPT":     VIDEO_PROMPT,
+    "VISUAL PROMPTS":   VISUAL_PROMPT,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id      INTEGER PRIMARY KEY,
+    kind    TEXT NOT NULL,
+    ts      TEXT NOT NULL,
+    content TEXT NOT NULL,
+    meta    TEXT NOT NULL DEFAULT '{}',
+    digest  TEXT NOT NULL,
+    UNIQUE (kind, ts, digest)
+);
+CREATE INDEX IF NOT EXISTS entries_kind_ts ON entries (kind, ts);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    content, content='entries', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts (rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts (entries_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+"""
+
+_TS_RE = re.compile(
+    r"(?P<ts>\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2})(?:\.\d+)?\s*"
+    r"(?P<zone>Z|UTC|GMT|E[SD]T|[+-]\d{2}:?\d{2})?"
+)
+_ZONE_HOURS = {"Z": 0, "UTC": 0, "GMT": 0, "EST": -5, "EDT": -4}
+_conn: Optional[sqlite3.Connection] = None
+
+
+# ─── Connection ────────────────────────────────────────────────
+def connect(path: Path | str = DB_FILE) -> sqlite3.Connection:
+    """Open (and on first use create + back-fill) the history database."""
+    global _conn
+    if _conn is not None and path == DB_FILE:
+        return _conn
+    fresh = not Path(path).exists()
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    if fresh:
+        n = import_legacy(conn)
+        print(f"✔ Created {path} and imported {n} legacy history entries")
+    if path == DB_FILE:
+        _conn = conn
+    return conn
+
+
+def _now() -> str:
+    return datetime.now(EASTERN).strftime(TS_FMT)
+
+
+def _norm_ts(raw: str) -> str:
+    """Any timestamp → Eastern "YYYY-MM-DD HH:MM:SS".
+
+    '2025-04-16 22:52:59 EDT' → '2025-04-16 22:52:59'
+    '2025-04-17T02:52:59Z'    → '2025-04-16 22:52:59'
+    Without a zone the time is taken as Eastern (legacy files, final.py).
+    """
+    m = _TS_RE.search(raw)
+    if not m:
+        return raw.strip()
+    when, zone = datetime.strptime(m["ts"].replace("T", " "), TS_FMT), m["zone"]
+    if zone is None:
+        return when.strftime(TS_FMT)
+    if zone in _ZONE_HOURS:
+        tz = timezone(timedelta(hours=_ZONE_HOURS[zone]))
+    else:
+        sign = -1 if zone[0] == "-" else 1
+        tz = timezone(sign * timedelta(hours=int(zone[1:3]), minutes=int(zone[-2:])))
+    return when.replace(tzinfo=tz).astimezone(EASTERN).strftime(TS_FMT)
+
+
+# ─── Writes ────────────────────────────────────────────────────
+def _insert(conn: sqlite3.Connection, kind: str, content: str, ts: str, meta: Dict) -> Optional[int]:
+    digest = hashlib.sha1(content.encode("utf-8")).hexdigest()
+    cur = conn.execute(
+        "INSERT OR IGNORE INTO entries (kind, ts, content, meta, digest) VALUES (?, ?, ?, ?, ?)",
+        (kind, ts, content, json.dumps(meta), digest),
+    )
+    return cur.lastrowid if cur.rowcount else None
+
+
+def append(kind: str, content: str, ts: str | None = None, meta: Dict | None = None,
+           conn: sqlite3.Connection | None = None) -> Optional[int]:
+    """Store one entry; returns its row id (None if it was already present).
+
+    *ts* defaults to now; it is normalised to Eastern time (see _norm_ts).
+    """
+    conn = conn or connect()
+    with conn:
+        return _insert(conn, kind, content.strip(), _norm_ts(ts) if ts else _now(), meta or {})
+
+
+def append_many(kind: str, contents: List[str], meta: List[Dict] | None = None,
+                conn: sqlite3.Connection | None = None) -> None:
+    """Store several entries of one run under a shared timestamp."""
+    conn, ts = conn or connect(), _now()
+    with conn:
+        for content, m in zip(contents, meta or [{} for _ in contents]):
+            _insert(conn, kind, content.strip(), ts, m)
+
+
+# ─── Reads ─────────────────────────────────────────────────────
+def latest(kind: str, n: int = 1, conn: sqlite3.Connection | None = None) -> List[sqlite3.Row]:
+    conn = conn or connect()
+    return conn.execute(
+        "SELECT * FROM entries WHERE kind = ? ORDER BY ts DESC, id DESC LIMIT ?", (kind, n)
+    ).fetchall()
+
+
+def between(kind: str, start: str, end: str, conn: sqlite3.Connection | None = None) -> List[sqlite3.Row]:
+    """Entries of *kind* with start <= ts < end (ISO date or datetime strings)."""
+    conn = conn or connect()
+    return conn.execute(
+        "SELECT * FROM entries WHERE kind = ? AND ts >= ? AND ts < ? ORDER BY ts, id",
+        (kind, start, end),
+    ).fetchall()
+
+
+def since_id(kind: str, last_id: int, conn: sqlite3.Connection | None = None) -> List[sqlite3.Row]:
+    """Entries of *kind* added after row *last_id* (for incremental consumers)."""
+    conn = conn or connect()
+    return conn.execute(
+        "SELECT * FROM entries WHERE kind = ? AND id > ? ORDER BY id", (kind, last_id)
+    ).fetchall()
+
+
+def search(query: str, kind: str | None = None, limit: int = 20,
+           conn: sqlite3.Connection | None = None) -> List[sqlite3.Row]:
+    """FTS5 search (bm25-ranked); *query* uses FTS5 syntax, e.g. 'fed AND yields'."""
+    conn = conn or connect()
+    sql = (
+        "SELECT e.*, snippet(entries_fts, 0, '[', ']', '…', 12) AS snippet "
+        "FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid "
+        "WHERE entries_fts MATCH ?"
+    )
+    args: Tuple = (query,)
+    if kind:
+        sql += " AND e.kind = ?"
+        args += (kind,)
+    return conn.execute(sql + " ORDER BY bm25(entries_fts) LIMIT ?", args + (limit,)).fetchall()
+
+
+# ─── Legacy importer ───────────────────────────────────────────
+def _legacy_entries(path: Path, header: str) -> Iterator[Tuple[str, str, str]]:
+    """Yield (label, timestamp, body) for each divider-delimited block of *path*."""
+    text = path.read_text(encoding="utf-8", errors="replace")
+    pattern = re.compile(rf"^=+\n{header}\n=+\n", re.M)
+    heads = list(pattern.finditer(text))
+    for i, m in enumerate(heads):
+        body = text[m.end(): heads[i + 1].start() if i + 1 < len(heads) else len(text)]
+        yield m["label"], m["ts"], body.strip()
+
+
+def import_legacy(conn: sqlite3.Connection | None = None, root: Path | str = ".") -> int:
+    """Import blog/video/visual *_history.txt files; returns rows added."""
+    conn, added = conn or connect(), 0
+    with conn:
+        for name, header in LEGACY_FILES.items():
+            path = Path(root) / name
+            if not path.exists():
+                continue
+            for label, ts, body in _legacy_entries(path, header):
+                kind, ts = LABEL_KINDS[label], _norm_ts(ts)
+                if kind == VISUAL_PROMPT:
+                    scenes = re.findall(r"^\[Scene (\d+)\] (.+?)(?=\n\s*\n|\n\[Scene|\Z)", body, re.M | re.S)
+                    for scene, prompt in scenes:
+                        added += _insert(conn, kind, prompt.strip(), ts, {"scene": int(scene)}) is not None
+                elif body:
+                    added += _insert(conn, kind, body, ts, {"source": name}) is not None
+    return added
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "--import":
+        print(f"Imported {import_legacy()} new entries into {DB_FILE}")
+    elif len(sys.argv) >= 3 and sys.argv[1] == "--search":
+        for row in search(" ".join(sys.argv[2:])):
+            print(f"{row['ts']}  {row['kind']:<16} {row['snippet']}")
+    else:
+        sys.exit("Usage: python history_store.py --import | --search <fts query>")
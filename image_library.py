@@ -0,0 +1,300 @@
+"""
+image_library.py  ·  Reuse generated images for recurring prompts
+------------------------------------------------------------------
+DALL·E calls are the slowest and most expensive step, and many scene
+prompts recur almost verbatim ("a digital display board showing the
+Dollar Index …"). Every generated image is filed here under its prompt,
+so a later near-identical prompt is served locally – or, for posters,
+straight from the WordPress media item uploaded last time – without
+calling the image API.
+
+  • lookup     – exact match on the normalized prompt, else cosine
+                 similarity of prompt embeddings (topic_index.embed);
+                 an embedding hit also needs the same market direction
+                 (rising vs falling …) and the same numbers, which the
+                 hashed n-gram backend barely separates
+  • dHash      – 64-bit perceptual hash per image; visual_duplicate()
+                 stops a fresh image that looks like an already-uploaded
+                 one from being uploaded again
+
+Output
+  • image_library/index.json       (entries: prompt, kind, file, dhash, media)
+  • image_library/embeddings.npy   (prompt vectors, rows aligned with index)
+  • image_library/<id>.webp        (high-quality copy of each image)
+
+USAGE
+    import image_library
+    lib = image_library.get_library()
+    hit = lib.lookup(prompt, image_library.SCENE)
+    if hit: lib.export(hit, "ai_images/scene_1.png")
+
+    python image_library.py --check     # regression pairs for lookup()
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+from topic_index import HASH_MODEL_NAME, embed
+
+# ─── Constants ─────────────────────────────────────────────────
+LIBRARY_DIR = Path(os.getenv("IMAGE_LIBRARY_DIR", "image_library"))
+
+POSTER = "poster"
+SCENE  = "scene"
+
+MODEL_THRESHOLD = 0.93     # cosine for "same prompt, different wording"
+HASH_THRESHOLD  = 0.85
+DHASH_DISTANCE  = 6        # bits out of 64 for "visually the same image"
+STORE_QUALITY   = 90       # WebP quality of library copies
+
+_PUNCT_RE = re.compile(r"[^a-z0-9%$.]+")
+_NUMBER_RE = re.compile(r"\$?\d+(?:\.\d+)?%?")
+
+# Words that fix the direction of a market move – an image for a rally must not serve a selloff
+UP_WORDS = {
+    "rise", "rises", "rising", "rose", "rally", "rallies", "rallying", "gain", "gains", "gaining",
+    "surge", "surges", "surging", "soar", "soars", "soaring", "climb", "climbs", "climbing",
+    "jump", "jumps", "jumping", "up", "higher", "high", "highs", "bull", "bullish", "advance",
+    "advances", "advancing", "rebound", "rebounds", "rebounding", "boom", "green", "optimism",
+    "optimistic", "record",
+}
+DOWN_WORDS = {
+    "fall", "falls", "falling", "fell", "drop", "drops", "dropping", "decline", "declines",
+    "declining", "slide", "slides", "sliding", "slump", "slumps", "plunge", "plunges", "plunging",
+    "tumble", "tumbles", "tumbling", "sink", "sinks", "sinking", "selloff", "sell", "crash",
+    "crashes", "down", "lower", "low", "lows", "bear", "bearish", "loss", "losses", "losing",
+    "red", "retreat", "retreats", "slip", "slips", "slipping", "pessimism", "fear", "panic",
+}
+
+
+def normalize_prompt(prompt: str) -> str:
+    text = re.sub(r"^\s*\[scene \d+\]\s*", "", prompt.lower())
+    return _PUNCT_RE.sub(" ", text).strip(" .")
+
+
+def prompt_signature(prompt: str) -> tuple:
+    """(directions, numbers) a reusable image must agree on, e.g. ({'up'}, {'500', '2.1%'})."""
+    words = set(normalize_prompt(prompt).split())
+    directions = frozenset(d for d, vocab in (("up", UP_WORDS), ("down", DOWN_WORDS)) if words & vocab)
+    numbers = frozenset(n.lstrip("$") for n in _NUMBER_RE.findall(prompt.lower()))
+    return directions, numbers
+
+
+def dhash(path: str | Path) -> str:
+    """64-bit difference hash (hex): grayscale 9×8, compare horizontal neighbours."""
+    with Image.open(path) as img:
+        px = np.asarray(img.convert("L").resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    bits = (px[:, 1:] > px[:, :-1]).flatten()
+    return f"{int(''.join('1' if b else '0' for b in bits), 2):016x}"
+
+
+def hamming(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+@dataclass
+class Entry:
+    id: str
+    kind: str
+    prompt: str
+    file: str                      # relative to the library dir
+    dhash: str
+    created: str
+    media_id: int = 0
+    source_url: str = ""
+    uses: int = 0
+
+
+# ─── Library ───────────────────────────────────────────────────
+class ImageLibrary:
+    def __init__(self, root: Path | str = LIBRARY_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / "index.json"
+        self.vec_path = self.root / "embeddings.npy"
+        self.entries: List[Entry] = []
+        self.model_id = ""
+        self.vecs = np.zeros((0, 0), dtype=np.float32)
+        self._lock = threading.RLock()      # scene images are generated from a thread pool
+        self._load()
+
+    # -- persistence ------------------------------------------------
+    def _load(self) -> None:
+        if not self.index_path.exists():
+            return
+        try:
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+            self.entries = [Entry(**e) for e in data.get("entries", [])]
+            self.model_id = data.get("model", "")
+            if self.vec_path.exists():
+                self.vecs = np.load(self.vec_path)
+        except (OSError, ValueError, TypeError) as exc:
+            print(f"[!] Image library index unreadable, starting empty – {exc}")
+            self.entries, self.vecs = [], np.zeros((0, 0), dtype=np.float32)
+
+    def save(self) -> None:
+        with self._lock:
+            payload = {"model": self.model_id, "entries": [asdict(e) for e in self.entries]}
+            self.index_path.write_text(json.dumps(payload, indent=1), encoding="utf-8")
+            np.save(self.vec_path, self.vecs)
+
+    def _ensure_vectors(self, model_id: str) -> None:
+        """(Re-)embed all prompts if rows are missing or were made by another backend."""
+        if self.entries and (len(self.vecs) != len(self.entries) or self.model_id != model_id):
+            self.vecs, self.model_id = embed([e.prompt for e in self.entries])
+
+    @property
+    def threshold(self) -> float:
+        return HASH_THRESHOLD if self.model_id == HASH_MODEL_NAME else MODEL_THRESHOLD
+
+    # -- queries ----------------------------------------------------
+    def lookup(self, prompt: str, kind: str) -> Optional[Entry]:
+        """Best stored image for a near-identical *prompt* of the same *kind*."""
+        with self._lock:
+            norm = normalize_prompt(prompt)
+            usable = [i for i, e in enumerate(self.entries)
+                      if e.kind == kind and (e.media_id or (self.root / e.file).exists())]
+            if not usable:
+                return None
+            for i in usable:
+                if normalize_prompt(self.entries[i].prompt) == norm:
+                    return self._hit(i, 1.0)
+            q, model_id = embed([prompt])
+            self._ensure_vectors(model_id)
+            sims = self.vecs[usable] @ q[0]
+            signature = prompt_signature(prompt)
+            for rank in np.argsort(-sims):
+                if sims[rank] < self.threshold:
+                    break
+                entry = self.entries[usable[rank]]
+                if prompt_signature(entry.prompt) == signature:
+                    return self._hit(usable[rank], float(sims[rank]))
+                print(f"[⚠] Library candidate differs in direction/numbers, not reused: {entry.prompt[:60]}…")
+            return None
+
+    def _hit(self, i: int, sim: float) -> Entry:
+        e = self.entries[i]
+        e.uses += 1
+        self.save()
+        print(f"♻️ Image library hit ({e.kind}, similarity {sim:.2f}): {e.prompt[:70]}…")
+        return e
+
+    def visual_duplicate(self, image_path: str | Path, kind: str) -> Optional[Entry]:
+        """An already-uploaded entry that looks the same as *image_path*, if any."""
+        h = dhash(image_path)
+        with self._lock:
+            best = min((e for e in self.entries if e.kind == kind and e.media_id),
+                       key=lambda e: hamming(e.dhash, h), default=None)
+        return best if best is not None and hamming(best.dhash, h) <= DHASH_DISTANCE else None
+
+    # -- writes -----------------------------------------------------
+    def add(self, prompt: str, kind: str, image_path: str | Path,
+            media_id: int = 0, source_url: str = "") -> Entry:
+        """File a freshly generated image (WebP copy + dHash + prompt vector)."""
+        entry_id = hashlib.sha1(f"{kind}\0{normalize_prompt(prompt)}".encode()).hexdigest()[:16]
+        name = f"{entry_id}.webp"
+        with Image.open(image_path) as img:
+            img.convert("RGB").save(self.root / name, "WEBP", quality=STORE_QUALITY, method=4)
+        entry = Entry(entry_id, kind, prompt, name, dhash(image_path),
+                      datetime.now().strftime("%Y-%m-%d %H:%M:%S"), media_id, source_url)
+        vec, model_id = embed([prompt])
+        with self._lock:
+            self._ensure_vectors(model_id)
+            existing = next((i for i, e in enumerate(self.entries) if e.id == entry_id), None)
+            if existing is not None:
+                self.entries[existing] = entry
+                self.vecs[existing] = vec[0]
+            else:
+                self.entries.append(entry)
+                self.vecs = vec if not len(self.vecs) else np.vstack([self.vecs, vec])
+            self.model_id = model_id
+            self.save()
+        return entry
+
+    def set_media(self, entry: Entry, media_id: int, source_url: str) -> None:
+        with self._lock:
+            entry.media_id, entry.source_url = media_id, source_url
+            self.save()
+
+    def export(self, entry: Entry, output_path: str | Path) -> str:
+        """Write the stored image to *output_path* (format from its extension)."""
+        src = self.root / entry.file
+        if Path(output_path).suffix.lower() == ".webp":
+            shutil.copyfile(src, output_path)
+        else:
+            with Image.open(src) as img:
+                img.save(output_path)
+        return str(output_path)
+
+
+_library: ImageLibrary | None = None
+_library_lock = threading.Lock()
+
+def get_library() -> ImageLibrary:
+    global _library
+    with _library_lock:
+        if _library is None:
+            _library = ImageLibrary()
+        return _library
+
+
+# ─── Regression check ──────────────────────────────────────────
+CHECK_PAIRS = [
+    # (stored prompt, new prompt, must reuse?)
+    ("S&P 500 rising", "S&P 500 falling", False),
+    ("S&P 500 index rising today", "S&P 500 index falling today", False),
+    ("Traders cheer as the Nasdaq rallies 2% on chip earnings",
+     "Traders worry as the Nasdaq slides 2% on chip earnings", False),
+    ("Gold surges to a record high amid rate-cut bets", "Gold plunges from a record high amid rate-cut bets", False),
+    ("Oil climbs 3% as supply tightens", "Oil climbs 5% as supply tightens", False),
+    # above the hashed threshold on similarity alone – only the direction check rejects it
+    ("A digital display board in a busy newsroom showing the Dollar Index and Treasury yields rising "
+     "while traders watch glowing monitors and analysts take notes",
+     "A digital display board in a busy newsroom showing the Dollar Index and Treasury yields falling "
+     "while traders watch glowing monitors and analysts take notes", False),
+    ("A digital display board showing the Dollar Index rising",
+     "A digital display board showing the Dollar Index, rising", True),
+    ("A digital display board showing the Dollar Index rising in a busy newsroom",
+     "A digital display board showing the Dollar Index rising in a busy trading newsroom", True),
+]
+
+
+def _check() -> int:
+    import tempfile
+    failures = 0
+    for stored, new, expect in CHECK_PAIRS:
+        with tempfile.TemporaryDirectory() as tmp:
+            lib = ImageLibrary(tmp)
+            img = Path(tmp) / "img.png"
+            Image.new("RGB", (16, 16)).save(img)
+            lib.add(stored, SCENE, img)
+            hit = lib.lookup(new, SCENE) is not None
+        sim = float(embed([stored, new])[0].prod(axis=0).sum())
+        ok = hit == expect
+        failures += not ok
+        print(f"{'✅' if ok else '[!]'} reuse={hit!s:<5} cos={sim:.3f}  {stored!r} → {new!r}")
+    return failures
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) >= 2 and sys.argv[1] == "--check":
+        sys.exit(1 if _check() else 0)
+    lib = get_library()
+    by_kind: Dict[str, int] = {}
+    for e in lib.entries:
+        by_kind[e.kind] = by_kind.get(e.kind, 0) + 1
+    print(f"{len(lib.entries)} images in {lib.root} ({by_kind}); "
+          f"{sum(e.uses for e in lib.entries)} reuses, {sum(1 for e in lib.entries if e.media_id)} with media IDs")
@@ -0,0 +1,121 @@
+"""
+image_optimizer.py  ·  Shrink posters and scene images before upload
+---------------------------------------------------------------------
+DALL·E returns multi-megabyte PNGs. This stage re-encodes them with
+Pillow into a web format, strips all metadata (EXIF, ICC, PNG text
+chunks) and caps the width, so the upload and the page weight drop by
+roughly an order of magnitude.
+
+  • format   – IMAGE_FORMAT: webp (default) | avif | jpeg (progressive)
+               avif falls back to webp when this Pillow build lacks it
+  • quality  – IMAGE_QUALITY (default 80)
+  • width    – IMAGE_MAX_WIDTH (default 1600), never upscaled
+
+Only the one file that is uploaded is written: the poster is the post's
+featured image, and WordPress derives its own sizes (and srcset) from
+every upload, so local width variants would never be used.
+
+Output
+  • <name>-<width>w.<ext> next to the source (or in out_dir)
+
+USAGE
+    from image_optimizer import optimize
+    result = optimize("blog_poster.png")
+    result.path                          # → blog_poster-1600w.webp
+
+    python image_optimizer.py blog_poster.png ai_images/*.png
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from PIL import Image, features
+
+# ─── Constants ─────────────────────────────────────────────────
+IMAGE_FORMAT      = os.getenv("IMAGE_FORMAT", "webp").lower()
+IMAGE_QUALITY     = int(os.getenv("IMAGE_QUALITY", "80"))
+MAX_WIDTH         = int(os.getenv("IMAGE_MAX_WIDTH", "1600"))
+
+EXTENSIONS = {"webp": ".webp", "avif": ".avif", "jpeg": ".jpg"}
+MIME_TYPES = {"webp": "image/webp", "avif": "image/avif", "jpeg": "image/jpeg"}
+
+
+@dataclass
+class OptimizedImage:
+    source: str
+    source_bytes: int
+    format: str
+    path: str
+    width: int
+    bytes: int
+
+    @property
+    def mime_type(self) -> str:
+        return MIME_TYPES[self.format]
+
+    @property
+    def ratio(self) -> float:
+        return self.source_bytes / max(1, self.bytes)
+
+    def report(self) -> str:
+        return (f"{os.path.basename(self.source)}: {self.source_bytes / 1024:.0f} KB → "
+                f"{self.bytes / 1024:.0f} KB {self.format} {self.width}w ({self.ratio:.1f}× smaller)")
+
+
+def resolve_format(fmt: str = IMAGE_FORMAT) -> str:
+    if fmt == "avif" and ".avif" not in Image.registered_extensions():
+        try:
+            import pillow_avif  # noqa: F401  (registers the plugin)
+        except ImportError:
+            print("[!] AVIF not supported by this Pillow build – using WebP")
+            fmt = "webp"
+    if fmt == "webp" and not features.check("webp"):
+        print("[!] WebP not supported by this Pillow build – using progressive JPEG")
+        fmt = "jpeg"
+    if fmt not in EXTENSIONS:
+        raise ValueError(f"Unsupported IMAGE_FORMAT {fmt!r}; choose webp, avif or jpeg")
+    return fmt
+
+
+def _save(img: Image.Image, path: str, fmt: str, quality: int) -> None:
+    # Nothing from the source's info dict is passed through, so no EXIF / ICC / text chunks
+    if fmt == "jpeg":
+        img.save(path, "JPEG", quality=quality, optimize=True, progressive=True)
+    elif fmt == "webp":
+        img.save(path, "WEBP", quality=quality, method=6)
+    else:
+        img.save(path, "AVIF", quality=quality)
+
+
+def optimize(path: str, out_dir: Optional[str] = None, fmt: str = IMAGE_FORMAT,
+             quality: int = IMAGE_QUALITY, max_width: int = MAX_WIDTH) -> OptimizedImage:
+    """Encode *path* as *fmt*, scaled down to *max_width* if it is wider."""
+    fmt = resolve_format(fmt)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    out_dir = out_dir or os.path.dirname(path) or "."
+    os.makedirs(out_dir, exist_ok=True)
+
+    with Image.open(path) as src:
+        has_alpha = src.mode in ("RGBA", "LA") or "transparency" in src.info
+        img = src.convert("RGBA" if has_alpha and fmt != "jpeg" else "RGB")
+    if img.width > max_width:
+        img = img.resize((max_width, round(img.height * max_width / img.width)), Image.LANCZOS)
+    out = os.path.join(out_dir, f"{stem}-{img.width}w{EXTENSIONS[fmt]}")
+    _save(img, out, fmt, quality)
+    return OptimizedImage(path, os.path.getsize(path), fmt, out, img.width, os.path.getsize(out))
+
+
+if __name__ == "__main__":
+    import sys, time
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python image_optimizer.py image.png [more.png …]")
+    t0 = time.perf_counter()
+    before = after = 0
+    for p in sys.argv[1:]:
+        r = optimize(p, out_dir=os.path.join(".cache", "optimized"))
+        print(f"🗜️ {r.report()}")
+        before, after = before + r.source_bytes, after + r.bytes
+    print(f"🗜️ Total: {before / 1e6:.1f} MB → {after / 1e6:.2f} MB ({before / max(1, after):.1f}× smaller)")
+    print(f"Done in {time.perf_counter() - t0:.1f}s")
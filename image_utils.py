@@ -1,21 +1,26 @@
 # fetch_and_upload_blog_poster.py
 
-import openai
 import requests
 import os
-import base64
 from dotenv import load_dotenv
 
+import image_library
+import lazy_imports
+import image_optimizer
+import wp_media
+
 # -------------------------
-# Load API keys and site credentials from environment
+# Load API keys from environment (WordPress credentials are read by wp_media)
 # -------------------------
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-WP_USERNAME = os.getenv("WP_USERNAME")
-WP_APP_PASSWORD = os.getenv("WP_APP_PASSWORD")
-WP_SITE_URL = os.getenv("WP_SITE_URL")
 
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
+# openai takes ~0.5 s to import – the client is built on the first GPT / DALL·E call
+openai = lazy_imports.module("openai")
+client = lazy_imports.Lazy(lambda: openai.OpenAI(api_key=OPENAI_API_KEY))
+
+# "separate": blog scripts leave the poster to its own pipeline stage (python image_utils.py)
+POSTER_STAGE = os.getenv("POSTER_STAGE", "inline")
 
 # -------------------------
 # Generate DALL·E-style image prompt from blog text using GPT
@@ -80,48 +85,88 @@ def generate_dalle_image(prompt, output_path="blog_poster.png"):
 def upload_image_to_wp(image_path):
     if not os.path.exists(image_path):
         raise FileNotFoundError(f"Image not found: {image_path}")
+    # Pooled session, retries and content-hash dedup live in wp_media
+    return wp_media.get_client().upload(image_path)
 
-    media_endpoint = f"{WP_SITE_URL}/wp-json/wp/v2/media"
-
-    env_token = os.environ.get("WP_AUTH_HEADER")
-    if env_token:
-        auth_header = "Basic " + env_token
+# -------------------------
+# Poster, step 1: prompt → image (or a library hit), optimized, not yet uploaded
+# -------------------------
+def prepare_blog_poster(blog_text, output_path="blog_poster.png"):
+    """
+    Returns a JSON-serializable plan: {"id", "source_url"} when an existing
+    upload can be reused, else {"path", "image_path", "prompt"} for upload_blog_poster.
+    """
+    print("Generating DALL·E prompt...")
+    prompt = generate_prompt_from_blog(blog_text)
+    print(f"Prompt: {prompt}")
+
+    # Near-identical prompt seen before → reuse its upload (or at least its image)
+    library = image_library.get_library()
+    hit = library.lookup(prompt, image_library.POSTER)
+    if hit and hit.media_id:
+        print(f"Reusing poster media {hit.media_id}: {hit.source_url}")
+        return {"id": hit.media_id, "source_url": hit.source_url}
+    if hit:
+        image_path = library.export(hit, output_path)
     else:
-        token = base64.b64encode(f"{WP_USERNAME}:{WP_APP_PASSWORD}".encode()).decode()
-        auth_header = f"Basic {token}"
+        print("Generating poster image...")
+        image_path = generate_dalle_image(prompt, output_path)
+    print(f"Poster saved: {image_path}")
 
-    headers = {
-        "Authorization": auth_header,
-        "Content-Disposition": f'attachment; filename="{os.path.basename(image_path)}"',
-        "Content-Type": "image/png"
-    }
+    duplicate = library.visual_duplicate(image_path, image_library.POSTER)
+    if duplicate:
+        print(f"Poster looks like media {duplicate.media_id}; skipping upload")
+        return {"id": duplicate.media_id, "source_url": duplicate.source_url}
 
-    with open(image_path, "rb") as img:
-        response = requests.post(media_endpoint, headers=headers, data=img)
+    # Upload a compressed, metadata-free copy instead of the raw PNG
+    try:
+        optimized = image_optimizer.optimize(image_path)
+        print(f"Optimized: {optimized.report()}")
+        upload_path = optimized.path
+    except Exception as e:
+        print(f"⚠️ Image optimization skipped: {e}")
+        upload_path = image_path
+    return {"path": upload_path, "image_path": image_path, "prompt": prompt}
 
-    if response.status_code == 201:
-        return response.json()
-    else:
-        raise Exception(f"Upload failed: {response.status_code} - {response.text}")
+# -------------------------
+# Poster, step 2: upload the plan from prepare_blog_poster and file it in the library
+# -------------------------
+def upload_blog_poster(plan):
+    if not plan or "id" in plan:
+        return plan or {}
+    print("Uploading to WordPress...")
+    media_info = upload_image_to_wp(plan["path"])
+    print("Uploaded:", media_info.get("source_url"))
+    try:
+        image_library.get_library().add(plan["prompt"], image_library.POSTER, plan["image_path"],
+                                        media_info.get("id", 0), media_info.get("source_url", ""))
+    except Exception as e:
+        print(f"⚠️ Could not file poster in image library: {e}")
+    return media_info
 
 # -------------------------
 # Full pipeline: generate image and upload it to WordPress
 # -------------------------
 def fetch_and_upload_blog_poster(blog_text, output_path="blog_poster.png"):
     try:
-        print("Generating DALL·E prompt...")
-        prompt = generate_prompt_from_blog(blog_text)
-        print(f"Prompt: {prompt}")
-
-        print("Generating poster image...")
-        image_path = generate_dalle_image(prompt, output_path)
-        print(f"Poster saved: {image_path}")
-
-        print("Uploading to WordPress...")
-        media_info = upload_image_to_wp(image_path)
-        print("Uploaded:", media_info.get("source_url"))
-        return media_info
-
+        return upload_blog_poster(prepare_blog_poster(blog_text, output_path))
     except Exception as e:
         print(f"Error in poster generation/upload: {e}")
         return {}
+
+# -------------------------
+# Pipeline stage: blog text → poster plan (JSON) for publish.py --poster-plan
+# -------------------------
+if __name__ == "__main__":
+    import argparse
+    import json
+    ap = argparse.ArgumentParser(description="Prepare the blog poster plan for publish.py")
+    ap.add_argument("blog_file", nargs="?", default="blog_post.txt")
+    ap.add_argument("plan_file", nargs="?", default="poster_plan.json")
+    args = ap.parse_args()
+    blog_file, plan_file = args.blog_file, args.plan_file
+    with open(blog_file, "r", encoding="utf-8") as f:
+        plan = prepare_blog_poster(f.read())
+    with open(plan_file, "w", encoding="utf-8") as f:
+        json.dump(plan, f, indent=1)
+    print(f"Poster plan saved to {plan_file}")
@@ -0,0 +1,181 @@
+"""
+lazy_imports.py  ·  Import heavy dependencies and build clients on first use
+---------------------------------------------------------------------------
+pandas, yfinance, feedparser, transformers (plus DistilBART), openai and
+sentence-transformers take seconds to import or load. Scripts that only
+borrow a helper (`from final import post_to_wordpress`), tests and CLI
+`--help` should not pay that cost, so modules declare them through this
+layer instead:
+
+  • module("pandas")        – stand-in module; the real import happens on
+                              the first attribute access (pd.read_html …)
+  • Lazy(factory)           – stand-in object; factory() runs once, on the
+                              first attribute access or call (clients,
+                              models), thread-safe
+  • resolve(obj)            – force a Lazy now (e.g. fail fast in main())
+  • available("torch")      – is the package installed, without importing it
+
+Because `except openai.OpenAIError` is only evaluated when an exception is
+raised, module stand-ins also work in except clauses.
+
+USAGE
+    import lazy_imports
+    pd     = lazy_imports.module("pandas")
+    client = lazy_imports.Lazy(lambda: openai.OpenAI(api_key=OPENAI_API_KEY))
+
+    python lazy_imports.py --bench                  # `python -X importtime` and `--help` per module
+    python lazy_imports.py --bench final pulse
+"""
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import sys
+import threading
+import types
+from typing import Any, Callable
+
+_UNSET = object()
+
+
+# ─── Lazy modules ──────────────────────────────────────────────
+class LazyModule(types.ModuleType):
+    """Module stand-in that imports the real module on first attribute access."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_target"] = None
+
+    def _load(self) -> types.ModuleType:
+        target = self.__dict__["_lazy_target"]
+        if target is None:
+            target = importlib.import_module(self.__name__)
+            self.__dict__["_lazy_target"] = target
+        return target
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value: Any) -> None:
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_lazy_target"] is not None else "not loaded"
+        return f"<lazy module {self.__name__!r} ({state})>"
+
+
+def module(name: str) -> types.ModuleType:
+    """The module itself if it is already imported, else a LazyModule for it."""
+    return sys.modules.get(name) or LazyModule(name)
+
+
+def available(name: str) -> bool:
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+# ─── Lazy objects ──────────────────────────────────────────────
+class Lazy:
+    """Object built by *factory* on first use; attribute access and calls go to it."""
+
+    __slots__ = ("_factory", "_obj", "_lock")
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_obj", _UNSET)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _resolve(self) -> Any:
+        if self._obj is _UNSET:
+            with self._lock:
+                if self._obj is _UNSET:
+                    object.__setattr__(self, "_obj", self._factory())
+        return self._obj
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._resolve(), attr)
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self._resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<lazy {self._factory!r}>" if self._obj is _UNSET else repr(self._obj)
+
+
+def resolve(obj: Any) -> Any:
+    return obj._resolve() if isinstance(obj, Lazy) else obj
+
+
+# ─── Import-time benchmark ─────────────────────────────────────
+BENCH_MODULES = ("final", "modular_blog", "science", "pulse", "movers", "watchlist",
+                 "image_utils", "market_snapshot_fetcher", "publish", "pipeline")
+
+
+def import_time(name: str) -> dict:
+    """Import *name* in a fresh interpreter under `-X importtime`; returns timings in ms."""
+    import os, subprocess, time
+    env = {**os.environ, "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "bench"}
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {name}"],
+                          capture_output=True, text=True, env=env)
+    wall = (time.perf_counter() - t0) * 1000
+    heaviest: dict = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, package = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue                              # header line
+        root = package.strip().split(".")[0]
+        if root != name:
+            heaviest[root] = max(heaviest.get(root, 0), int(cumulative) / 1000)
+    if proc.returncode != 0:
+        errors = [l for l in proc.stderr.splitlines() if not l.startswith("import time:")]
+        return {"module": name, "wall": wall, "error": errors[-1] if errors else f"exit {proc.returncode}"}
+    top = sorted(heaviest.items(), key=lambda kv: kv[1], reverse=True)[:4]
+    return {"module": name, "wall": wall, "heaviest": top}
+
+
+def help_time(name: str, timeout: float = 60) -> str:
+    """Wall time of `python <name>.py --help`; it must print usage and exit 0, not run the job."""
+    import os, subprocess, time
+    script = f"{name}.py"
+    if not os.path.exists(script):
+        return "-"
+    env = {**os.environ, "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "bench"}
+    t0 = time.perf_counter()
+    try:
+        proc = subprocess.run([sys.executable, script, "--help"], capture_output=True,
+                              text=True, env=env, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return "TIMEOUT"
+    wall = (time.perf_counter() - t0) * 1000
+    if proc.returncode != 0 or "usage:" not in proc.stdout:
+        return "NO USAGE"
+    return f"{wall:.0f}"
+
+
+def _bench(names) -> None:
+    print(f" {'Module':<24} {'Import (ms)':>11} {'--help (ms)':>11}   Heaviest dependencies (cumulative ms)")
+    for name in names:
+        r = import_time(name)
+        cli = help_time(name)
+        if "error" in r:
+            print(f" {name:<24} {'FAILED':>11} {cli:>11}   {r['error'][:70]}")
+            continue
+        deps = ", ".join(f"{pkg} {ms:.0f}" for pkg, ms in r["heaviest"])
+        print(f" {name:<24} {r['wall']:11.0f} {cli:>11}   {deps}")
+    print(" (wall time of `python -X importtime -c 'import …'` and of `python <module>.py --help`,\n"
+          "  interpreter start-up included; NO USAGE = --help ran the script instead of printing usage)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "--bench":
+        _bench(sys.argv[2:] or BENCH_MODULES)
+    else:
+        sys.exit("Usage: python lazy_imports.py --bench [module …]")
@@ -1,27 +1,20 @@
-import os
-import datetime
-
-LOG_FILE = "blog_history.txt"
+import history_store
 
 def log_blog(blog_content):
     """
-    Append blog content to a text file with date and time
+    Store blog content in the history database with date and time
     
     Args:
         blog_content (str): The blog content to log
     """
-    # Get current date and time
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    # Format the entry with timestamp and separator
-    entry = f"\n\n{'=' * 80}\n"
-    entry += f"BLOG ENTRY - {timestamp}\n"
-    entry += f"{'=' * 80}\n\n"
-    entry += blog_content
-    entry += "\n\n"
+    # Timestamped by the store, in Eastern time like every other entry
+    history_store.append(history_store.BLOG, blog_content)
     
-    # Append to log file
-    with open(LOG_FILE, 'a') as f:
-        f.write(entry)
-    
-    print(f"✅ Blog content logged to {LOG_FILE}")
+    print(f"✅ Blog content logged to {history_store.DB_FILE}")
+
+    # Keep the near-duplicate index in step with the history store
+    try:
+        import blog_dedup
+        blog_dedup.get_index()
+    except Exception as e:
+        print(f"⚠️ Dedup index update skipped: {e}")
@@ -0,0 +1,161 @@
+"""
+market_features.py  ·  Ranked, history-aware snapshot features
+----------------------------------------------------------------
+Turns a market snapshot (see market_snapshot_fetcher.get_market_snapshot)
+into compact per-category narratives so the LLM receives leaders,
+laggards and outliers instead of a long unsorted ticker list.
+
+All arithmetic is done once per snapshot in NumPy:
+  • per-category ranking by % change (top / bottom movers, breadth)
+  • z-scores of today's move against the trailing history in
+    market_snapshot_log.jsonl (one snapshot per day, last LOOKBACK days)
+  • cross-asset correlations of daily moves for a few macro anchors
+"""
+from __future__ import annotations
+
+import json
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# ─── Constants ─────────────────────────────────────────────────
+LOG_FILE    = Path("market_snapshot_log.jsonl")
+LOOKBACK    = 60      # trading days of history used for z-scores / correlations
+MIN_HISTORY = 10      # fewer observations → no z-score
+TOP_K       = 3       # leaders / laggards shown per category
+Z_UNUSUAL   = 2.0
+
+CATEGORIES = ["indices", "bonds", "currencies", "commodities", "etfs", "stocks", "tech_focus"]
+
+# Macro anchors for the correlation table: (category, symbol, label)
+ANCHORS = [
+    ("indices",     "^GSPC",    "S&P 500"),
+    ("indices",     "^VIX",     "VIX"),
+    ("bonds",       "^TNX",     "10Y yield"),
+    ("currencies",  "DX-Y.NYB", "Dollar index"),
+    ("commodities", "GC=F",     "Gold"),
+    ("commodities", "CL=F",     "WTI crude"),
+]
+
+
+@dataclass
+class CategoryFeatures:
+    symbols: List[str]
+    price:   np.ndarray      # (S,)
+    pct:     np.ndarray      # (S,) today's % change, NaN if missing
+    z:       np.ndarray      # (S,) z-score vs trailing daily moves, NaN if unknown
+    order:   np.ndarray      # indices sorting pct descending (NaNs last)
+
+
+# ─── History ───────────────────────────────────────────────────
+def load_history(path: Path = LOG_FILE, lookback: int = LOOKBACK, exclude_ts: str | None = None) -> List[Dict]:
+    """Last *lookback* snapshots from the log, one per calendar day (latest wins)."""
+    if not path.exists():
+        return []
+    with path.open("r", encoding="utf-8") as f:
+        tail = deque(f, maxlen=lookback * 3)   # intraday reruns → keep a margin
+    by_day: Dict[str, Dict] = {}
+    for line in tail:
+        try:
+            snap = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        ts = snap.get("timestamp", "")
+        if ts and ts != exclude_ts:
+            by_day[ts[:10]] = snap
+    return [by_day[d] for d in sorted(by_day)][-lookback:]
+
+
+def _pct(entry) -> float:
+    if isinstance(entry, dict) and isinstance(entry.get("percent_change"), (int, float)):
+        return float(entry["percent_change"])
+    return np.nan
+
+
+def _matrix(history: List[Dict], category: str, symbols: List[str]) -> np.ndarray:
+    """(T, S) matrix of daily % changes for *symbols*; NaN where missing."""
+    return np.array(
+        [[_pct(snap.get(category, {}).get(s)) for s in symbols] for snap in history],
+        dtype=float,
+    ).reshape(len(history), len(symbols))
+
+
+# ─── Features ──────────────────────────────────────────────────
+def category_features(snapshot: Dict, category: str, history: List[Dict]) -> CategoryFeatures:
+    data = snapshot.get(category, {})
+    symbols = [s for s, v in data.items() if isinstance(v, dict)]
+    price = np.array([data[s].get("price") if isinstance(data[s].get("price"), (int, float)) else np.nan
+                      for s in symbols], dtype=float)
+    pct = np.array([_pct(data[s]) for s in symbols], dtype=float)
+
+    z = np.full(len(symbols), np.nan)
+    if history and symbols:
+        hist = _matrix(history, category, symbols)
+        n = np.sum(~np.isnan(hist), axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mu, sd = np.nanmean(hist, axis=0), np.nanstd(hist, axis=0)
+            z = np.where((n >= MIN_HISTORY) & (sd > 0), (pct - mu) / sd, np.nan)
+
+    order = np.argsort(np.where(np.isnan(pct), -np.inf, -pct), kind="stable")
+    return CategoryFeatures(symbols, price, pct, z, order)
+
+
+def correlations(snapshot: Dict, history: List[Dict]) -> List[Tuple[str, str, float]]:
+    """Pairwise correlations of daily % moves between ANCHORS, strongest first."""
+    snaps = history + [snapshot]
+    cols = np.column_stack([_matrix(snaps, cat, [sym])[:, 0] for cat, sym, _ in ANCHORS])
+    cols = cols[~np.isnan(cols).any(axis=1)]
+    if len(cols) < MIN_HISTORY:
+        return []
+    corr = np.corrcoef(cols, rowvar=False)
+    iu = np.triu_indices(len(ANCHORS), k=1)
+    pairs = [(ANCHORS[i][2], ANCHORS[j][2], float(corr[i, j])) for i, j in zip(*iu)
+             if not np.isnan(corr[i, j])]
+    return sorted(pairs, key=lambda p: -abs(p[2]))
+
+
+# ─── Text rendering ────────────────────────────────────────────
+def _fmt(f: CategoryFeatures, i: int) -> str:
+    z = f"; z={f.z[i]:+.1f}" if not np.isnan(f.z[i]) else ""
+    price = f"{f.price[i]:,.2f} " if not np.isnan(f.price[i]) else ""
+    return f"{f.symbols[i]} {price}({f.pct[i]:+.2f}%{z})"
+
+
+def describe_category(f: CategoryFeatures, label: str, top_k: int = TOP_K) -> str:
+    valid = f.order[~np.isnan(f.pct[f.order])]
+    if not len(valid):
+        return f"{label}: No data available."
+    up, down = int(np.sum(f.pct[valid] > 0)), int(np.sum(f.pct[valid] < 0))
+    lines = [f"{label} ({len(valid)} tracked, {up} up / {down} down, "
+             f"median {np.median(f.pct[valid]):+.2f}%):"]
+    if len(valid) <= 2 * top_k:
+        lines.append("Ranked: " + "; ".join(_fmt(f, i) for i in valid))
+    else:
+        lines.append("Leaders: " + "; ".join(_fmt(f, i) for i in valid[:top_k]))
+        lines.append("Laggards: " + "; ".join(_fmt(f, i) for i in valid[::-1][:top_k]))
+    unusual = [i for i in valid if not np.isnan(f.z[i]) and abs(f.z[i]) >= Z_UNUSUAL]
+    if unusual:
+        lines.append(f"Unusual vs {LOOKBACK}-day history: " + "; ".join(_fmt(f, i) for i in unusual))
+    return "\n".join(lines)
+
+
+def describe_correlations(pairs: List[Tuple[str, str, float]], n: int = 4) -> str:
+    if not pairs:
+        return ""
+    return (f"Cross-asset correlations of daily moves (last {LOOKBACK} sessions): "
+            + "; ".join(f"{a} vs {b} {c:+.2f}" for a, b, c in pairs[:n]) + ".")
+
+
+def build_summaries(snapshot: Dict, labels: Dict[str, str], history: List[Dict] | None = None) -> Dict[str, str]:
+    """Compact ranked text per category plus a 'cross_asset' line."""
+    if history is None:
+        history = load_history(exclude_ts=snapshot.get("timestamp"))
+    out = {
+        cat: describe_category(category_features(snapshot, cat, history), labels.get(cat, cat))
+        for cat in CATEGORIES
+    }
+    out["cross_asset"] = describe_correlations(correlations(snapshot, history))
+    return out
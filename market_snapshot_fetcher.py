@@ -1,7 +1,11 @@
-import yfinance as yf
 import datetime
 import json
 
+import lazy_imports
+import market_features
+
+yf = lazy_imports.module("yfinance")   # ≈0.5 s to import; only needed once fetching starts
+
 def get_market_snapshot():
     snapshot = {
         "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
@@ -89,18 +93,30 @@ def summarize_market_snapshot(snapshot):
             "Major indices reflected optimism, while commodities and currencies moved in response to broader geopolitical cues."
         )
 
-        summary_dict["indices"] = format_category(snapshot.get("indices", {}), "Major Indices")
-        summary_dict["bonds"] = format_category(snapshot.get("bonds", {}), "Bond Yields")
-        summary_dict["currencies"] = format_category(snapshot.get("currencies", {}), "Currency Exchange Rates")
-        summary_dict["commodities"] = format_category(snapshot.get("commodities", {}), "Commodities")
-        summary_dict["etfs"] = format_category(snapshot.get("etfs", {}), "Sector ETFs")
-        summary_dict["stocks"] = format_category(snapshot.get("stocks", {}), "Top Movers")
-        summary_dict["tech_focus"] = format_category(snapshot.get("tech_focus", {}), "Tech & AI Stocks")
+        labels = {
+            "indices": "Major Indices",
+            "bonds": "Bond Yields",
+            "currencies": "Currency Exchange Rates",
+            "commodities": "Commodities",
+            "etfs": "Sector ETFs",
+            "stocks": "Top Movers",
+            "tech_focus": "Tech & AI Stocks",
+        }
+        # Ranked leaders/laggards + z-scores vs. the snapshot log; raw listing as fallback
+        try:
+            features = market_features.build_summaries(snapshot, labels)
+        except Exception as e:
+            print(f"Feature stage failed, using raw listing: {e}")
+            features = {cat: format_category(snapshot.get(cat, {}), label) for cat, label in labels.items()}
+        for cat in labels:
+            summary_dict[cat] = features[cat]
 
         summary_dict["global_insights"] = (
             "Asian markets closed mixed while European indices struggled to gain ground. The global macro landscape, "
             "influenced by central bank policy, oil supply shifts, and geopolitical tension, continues to affect sentiment."
         )
+        if features.get("cross_asset"):
+            summary_dict["global_insights"] += "\n" + features["cross_asset"]
 
         summary_dict["analyst_angle"] = (
             "Financial analysts are split on short-term direction. While some highlight strong consumer data and robust tech earnings, "
@@ -123,6 +139,9 @@ def summarize_market_snapshot(snapshot):
         return {"error": f"Summary generation failed: {e}"}
 
 if __name__ == "__main__":
+    import argparse
+    argparse.ArgumentParser(description="Fetch the market snapshot and append it to "
+                            "market_snapshot_log.jsonl").parse_args()
     snapshot = get_market_snapshot()
     append_snapshot_to_log(snapshot)
     summary = summarize_market_snapshot(snapshot)
@@ -14,21 +14,25 @@ log.  With no argument, uses the *last* line of every log (most-recent run).
 Writes blog_post.txt, blog_summary.txt, video_prompt.txt, and publishes to
 WordPress via helpers in final.py.
 """
-import json, os, sys
+import json, os
 from pathlib import Path
 from datetime import datetime, timezone
 from typing import Dict
 
-import pytz, openai
+import pytz
 from dotenv import load_dotenv
-from openai import OpenAIError
+
+import lazy_imports
 
 # ─── environment ──────────────────────────────────────────────────────
 load_dotenv()
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+openai = lazy_imports.module("openai")
+client = lazy_imports.Lazy(lambda: openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY")))
 
 # Import WordPress helpers without executing final.py’s main()
-from final import generate_video_prompt, post_to_wordpress   # noqa: E402
+from final import generate_video_prompt, post_to_wordpress, log_blog_to_history   # noqa: E402
+import blog_dedup   # noqa: E402
+import run_manifest   # noqa: E402
 
 EST        = pytz.timezone("America/New_York")
 TODAY_EST  = datetime.now(timezone.utc).astimezone(EST).date()
@@ -120,21 +124,26 @@ def main(date_iso: str | None = None) -> None:
         if idx == 0:
             sys_prompt += f"\nBegin the output with this exact sentence:\n{banner()}"
 
-        try:
+        def write_section(feedback: str = "") -> str:
             resp = client.chat.completions.create(
                 model="gpt-4o",
                 temperature=0.7,
                 messages=[
-                    {"role": "system", "content": sys_prompt},
+                    {"role": "system", "content": sys_prompt + (f"\n{feedback}" if feedback else "")},
                     {"role": "user",   "content": raw_json}
                 ]
             )
-            sections_out.append(resp.choices[0].message.content.strip())
-        except OpenAIError as e:
+            return resp.choices[0].message.content.strip()
+
+        try:
+            sections_out.append(blog_dedup.regenerate_if_repeat(title, write_section(), write_section))
+        except openai.OpenAIError as e:
             print(f"[!] Section {title} failed:", e)
             sections_out.append("Content temporarily unavailable.")
+            run_manifest.note_fallback(f"section {title} unavailable")
 
     full_blog = "\n\n".join(sections_out)
+    log_blog_to_history(full_blog)
 
     # 3. Summary + headline
     try:
@@ -174,7 +183,8 @@ def main(date_iso: str | None = None) -> None:
     media_id = 0
     try:
         import image_utils
-        media_id = image_utils.fetch_and_upload_blog_poster(full_blog).get("id", 0)
+        if image_utils.POSTER_STAGE != "separate":      # else made by its own pipeline stage
+            media_id = image_utils.fetch_and_upload_blog_poster(full_blog).get("id", 0)
     except ModuleNotFoundError:
         pass
 
@@ -185,4 +195,9 @@ def main(date_iso: str | None = None) -> None:
     print("✅ Blog generation & publish complete\nTitle →", final_title)
 
 if __name__ == "__main__":
-    main(sys.argv[1] if len(sys.argv) == 2 else None)
+    import argparse
+    ap = argparse.ArgumentParser(description="Build the four-section market blog from the "
+                                             "section logs and publish it")
+    ap.add_argument("date", nargs="?", metavar="YYYY-MM-DD",
+                    help="use that day's snapshot from each log (default: the latest line)")
+    main(ap.parse_args().date)
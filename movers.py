@@ -6,18 +6,22 @@ Scrapes Yahoo Finance mover lists (most-active, gainers, losers,
 and writes the result to JSON Lines for easy CI use.
 """
 import datetime as dt
-import importlib.util
 import json
 import pathlib
 import time
 from typing import Dict, List
 
-import feedparser
-import pandas as pd
 import pytz
 import requests
-from transformers import pipeline, Pipeline
+
+import headline_summariser
+import lazy_imports
 from article_extractor import extract_article_text
+from headline_summariser import summariser   # DistilBART, loaded on first use
+
+# Heavy imports deferred to first use (see lazy_imports.py)
+feedparser = lazy_imports.module("feedparser")
+pd         = lazy_imports.module("pandas")
 
 # ─── Timing ─────────────────────────────────────────────────────
 T0 = time.time()
@@ -48,25 +52,6 @@ HEADERS = {
     )
 }
 
-# ─── Summariser pipeline (≈480 MB DistilBART) ──────────────────
-if not any(importlib.util.find_spec(x) for x in ("torch", "tensorflow", "jax")):
-    raise RuntimeError(
-        "No deep-learning backend detected. "
-        "Install CPU PyTorch:\n"
-        "    pip install torch --index-url https://download.pytorch.org/whl/cpu torch"
-    )
-
-MODEL_NAME = "sshleifer/distilbart-cnn-12-6"
-
-summariser: Pipeline = pipeline(
-    "summarization",
-    model=MODEL_NAME,
-    tokenizer=MODEL_NAME,
-    framework="pt",
-    truncation=True,
-    token=None          # anonymous download, avoids 401 on HF Hub
-)
-
 # ─── Helpers ───────────────────────────────────────────────────
 def top5_symbols(category: str, pause: float = 1.5) -> List[str]:
     if category not in URLS:
@@ -157,6 +142,7 @@ def append_to_log(blob: Dict) -> None:
 
 # ─── Main entrypoint ───────────────────────────────────────────
 def main() -> None:
+    headline_summariser.resolve()     # fail fast without a DL backend
     blob = build_movers_blob()
 
     append_to_log(blob)
@@ -171,4 +157,7 @@ def main() -> None:
 
 
 if __name__ == "__main__":
+    import argparse
+    argparse.ArgumentParser(description="Build the market movers section (Section 3) "
+                            "and append it to movers_log.jsonl").parse_args()
     main()
@@ -0,0 +1,472 @@
+"""
+pipeline.py  ·  Run the content pipeline as a dependency DAG
+------------------------------------------------------------
+Each stage is one of the existing scripts, run as a subprocess, with
+its inputs, outputs and upstream stages declared explicitly. Stages
+start as soon as their dependencies finish, so independent branches
+overlap. Voice-over and poster wait only on the blog; the avatar render
+waits on the anchor script written from the blog summary.
+
+  • memo   – a stage's fingerprint hashes its script and every local
+             module it imports (found by parsing the imports, so a
+             helper can't be left off a list),
+             args, env, the config variables it reads, the contents of
+             its inputs and the run-manifest fields it reads (draft,
+             YouTube embed URL …). A successful run stores the outputs (plus the
+             run-manifest fields it records) in .cache/<stage>/<hash>/;
+             a later run with the same fingerprint restores them instead
+             of running. Stages that read live market data or print the
+             date are also keyed on the edition (New York date), so a
+             rerun the same day reuses the data, the blog text and every
+             media stage whose inputs did not change. Publish carries
+             the edition's post_id over, so a rerun updates that post
+             rather than creating a second one
+  • fail   – a failed stage blocks its dependents, unless it is marked
+             optional (e.g. YouTube); other branches keep running. A
+             stage that exits 0 with a stand-in result (silent audio,
+             placeholder sections – run_manifest.note_fallback) feeds
+             its dependents but is not memoized
+  • timing – per-stage wall time printed as a table and appended to
+             .cache/pipeline/runs.jsonl
+
+Config
+  • PIPELINE_WORKERS     parallel stages (default 4)
+  • PIPELINE_EDITION     edition key (default: today in New York)
+  • PIPELINE_CACHE_KEEP  memoized results kept per stage (default 3)
+
+Output
+  • .cache/<stage>/<hash>/       files/… + meta.json (written last)
+  • .cache/pipeline/runs.jsonl   (one line per run: status + seconds per stage)
+
+USAGE
+    python pipeline.py finance              # the Finance Final workflow
+    python pipeline.py daily --dry-run      # show what would run / be reused
+    python pipeline.py finance --force avatar video
+"""
+from __future__ import annotations
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+import run_manifest
+
+# ─── Constants ─────────────────────────────────────────────────
+CACHE_DIR  = Path(".cache")
+STATE_DIR  = CACHE_DIR / "pipeline"
+RUNS_FILE  = STATE_DIR / "runs.jsonl"
+WORKERS    = int(os.getenv("PIPELINE_WORKERS", "4"))
+CACHE_KEEP = int(os.getenv("PIPELINE_CACHE_KEEP", "3"))
+EDITION    = os.getenv("PIPELINE_EDITION") or datetime.now(ZoneInfo("America/New_York")).strftime("%Y-%m-%d")
+
+RAN, REUSED, FAILED, BLOCKED = "ran", "reused", "FAILED", "blocked"
+
+_print_lock    = threading.Lock()
+_manifest_lock = threading.Lock()
+
+
+@dataclass
+class Stage:
+    name: str
+    script: str
+    args: Tuple[str, ...] = ()
+    inputs: Tuple[str, ...] = ()         # data files / directories read (helper modules: local_modules)
+    outputs: Tuple[str, ...] = ()        # files / directories written – memoized
+    after: Tuple[str, ...] = ()          # upstream stage names
+    env: Dict[str, str] = field(default_factory=dict)
+    config: Tuple[str, ...] = ()         # environment variables that change the result
+    manifest: Tuple[str, ...] = ()       # run_manifest.json fields the stage records – memoized
+    reads: Tuple[str, ...] = ()          # run_manifest.json fields the stage consumes – fingerprinted
+    carry: Tuple[str, ...] = ()          # fields restored from this edition's last result before running
+    edition: bool = False                # result is only valid for today's edition (live data / dated text)
+    optional: bool = False               # failure does not block dependents
+
+
+# ─── Pipelines ─────────────────────────────────────────────────
+_DEFERRED = {"PUBLISH_MODE": "deferred", "POSTER_STAGE": "separate"}
+
+_MEDIA_STAGES = (
+    Stage("poster", "image_utils.py", ("blog_post.txt", "poster_plan.json"),
+          inputs=("blog_post.txt",), outputs=("poster_plan.json",),
+          config=("IMAGE_FORMAT", "IMAGE_QUALITY", "IMAGE_MAX_WIDTH"), after=("blog",), optional=True),
+    Stage("audio", "generate_audio_from_blog.py",
+          inputs=("blog_post.txt",), outputs=("blog_voiceover.mp3",),
+          config=("TTS_GAP_MS", "TTS_TARGET_DBFS"), after=("blog",), optional=True),
+    # The 60–70-word branded anchor script (replaces the blog's 2-sentence prompt) → VOICEOVER history
+    Stage("video_prompt", "generate_video_prompt.py",
+          inputs=("blog_summary.txt",), outputs=("video_prompt.txt",), after=("blog",)),
+    Stage("avatar", "generate_video_heygen.py",
+          inputs=("video_prompt.txt",), outputs=("avatar_video.mp4",), after=("video_prompt",)),
+)
+_VIDEO_CONFIG = ("VIDEO_ENGINE", "X264_PRESET", "X264_CRF", "CUTAWAYS")
+_PUBLISH_INPUTS = ("blog_post.txt", "poster_plan.json", "blog_voiceover.mp3", "video_output.mp4")
+_PUBLISHED = ("post_id", "link", "title", "media")
+# A rerun of the same edition updates the post it already published (publish.py) instead of adding one
+_PUBLISH = dict(inputs=_PUBLISH_INPUTS, manifest=_PUBLISHED, reads=("draft", "youtube_embed_url"),
+                carry=("post_id",), edition=True)
+_YOUTUBE = ("youtube_id", "youtube_embed_url")
+
+PIPELINES: Dict[str, Tuple[Stage, ...]] = {
+    # .github/workflows/finance.yaml
+    "finance": (
+        # Fetchers also append to their *_log.jsonl (committed), which is not cached
+        Stage("pulse", "pulse.py", outputs=("pulse_latest.json",), edition=True),
+        Stage("movers", "movers.py", outputs=("movers_latest.json",), edition=True),
+        Stage("watchlist", "watchlist.py", outputs=("watchlist_latest.json",), edition=True),
+        Stage("snapshot", "market_snapshot_fetcher.py", edition=True),
+        Stage("blog", "modular_blog.py", env=_DEFERRED, edition=True,
+              inputs=("pulse_latest.json", "movers_latest.json", "watchlist_latest.json",
+                      "breadth_log.jsonl"),
+              outputs=("blog_post.txt", "blog_summary.txt"), manifest=("draft",),
+              after=("pulse", "movers", "watchlist", "snapshot")),
+        *_MEDIA_STAGES,
+        Stage("video", "edit_and_merge_video.py",
+              inputs=("avatar_video.mp4", "ai_images"), outputs=("video_output.mp4",),
+              config=_VIDEO_CONFIG, reads=("scene_images",), after=("avatar",)),
+        Stage("youtube", "upload_to_youtube.py",
+              inputs=("video_output.mp4",), manifest=_YOUTUBE, after=("video",), optional=True),
+        Stage("publish", "publish.py", ("--poster-plan", "poster_plan.json"), **_PUBLISH,
+              after=("poster", "audio", "video", "youtube")),
+    ),
+    # .github/workflows/main.yml (adds AI scene-image cutaways)
+    "daily": (
+        Stage("snapshot", "market_snapshot_fetcher.py", edition=True),
+        Stage("blog", "final.py", env=_DEFERRED, edition=True,
+              outputs=("blog_post.txt", "blog_summary.txt"), manifest=("draft",),
+              after=("snapshot",)),
+        *_MEDIA_STAGES,
+        Stage("visual_prompts", "generate_visual_prompts.py",
+              inputs=("video_prompt.txt",), outputs=("visual_prompts",), after=("video_prompt",)),
+        Stage("images", "generate_ai_images.py",
+              inputs=("visual_prompts",), outputs=("ai_images",), manifest=("scene_images",),
+              after=("visual_prompts",), optional=True),
+        Stage("video", "edit_and_merge_video.py",
+              inputs=("avatar_video.mp4", "ai_images"), outputs=("video_output.mp4",),
+              config=_VIDEO_CONFIG, reads=("scene_images",), after=("avatar", "images")),
+        Stage("youtube", "upload_to_youtube.py",
+              inputs=("video_output.mp4",), manifest=_YOUTUBE, after=("video",), optional=True),
+        # After youtube, as in "finance": both write run_manifest.json, and publish embeds the URL
+        Stage("publish", "publish.py", ("--poster-plan", "poster_plan.json"), **_PUBLISH,
+              after=("poster", "audio", "video", "youtube")),
+    ),
+}
+
+
+# ─── Fingerprints ──────────────────────────────────────────────
+def _hash_path(h, path: Path) -> None:
+    if path.is_dir():
+        for child in sorted(p for p in path.rglob("*") if p.is_file()):
+            h.update(str(child.relative_to(path)).encode())
+            _hash_path(h, child)
+    elif path.is_file():
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    else:
+        h.update(b"<missing>")
+
+
+@lru_cache(maxsize=None)
+def _imports(script: str) -> Tuple[str, ...]:
+    """Top-level names *script* imports – statements anywhere in the file, plus lazy_imports.module("x")."""
+    try:
+        tree = ast.parse(Path(script).read_text(encoding="utf-8"), script)
+    except (OSError, SyntaxError, ValueError):
+        return ()
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(a.name.split(".")[0] for a in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split(".")[0])
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+              and node.func.attr == "module" and node.args and isinstance(node.args[0], ast.Constant)
+              and isinstance(node.args[0].value, str)):
+            names.add(node.args[0].value.split(".")[0])
+    return tuple(sorted(names))
+
+
+def local_modules(script: str) -> List[str]:
+    """Repository modules *script* depends on, directly or through other local modules."""
+    root = Path(script).parent
+    seen: Dict[str, None] = {}
+    todo = [script]
+    while todo:
+        for name in _imports(todo.pop()):
+            path = str(root / f"{name}.py")
+            if path not in seen and path != script and os.path.isfile(path):
+                seen[path] = None
+                todo.append(path)
+    return sorted(seen)
+
+
+def fingerprint(stage: Stage) -> str:
+    h = hashlib.sha256()
+    config = {k: os.getenv(k) for k in stage.config}
+    with _manifest_lock:
+        manifest = run_manifest.read() if stage.reads else {}
+    reads = {k: manifest.get(k) for k in stage.reads}
+    h.update(json.dumps([stage.script, stage.args, sorted(stage.env.items()), sorted(config.items()),
+                         EDITION if stage.edition else None, reads], sort_keys=True, default=str).encode())
+    for path in (stage.script, *local_modules(stage.script), *stage.inputs):
+        h.update(path.encode() + b"\0")
+        _hash_path(h, Path(path))
+    return h.hexdigest()
+
+
+def _mtime(path: Path) -> float:
+    """Newest modification time of *path* (or anything inside it)."""
+    if path.is_dir():
+        return max([path.stat().st_mtime, *(p.stat().st_mtime for p in path.rglob("*"))])
+    return path.stat().st_mtime if path.exists() else 0.0
+
+
+# ─── Memo cache ────────────────────────────────────────────────
+def _memo_dir(stage: Stage, fp: str) -> Path:
+    return CACHE_DIR / stage.name / fp[:16]
+
+
+def _copy(src: Path, dst: Path) -> None:
+    if dst.is_dir():
+        shutil.rmtree(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if src.is_dir():
+        shutil.copytree(src, dst)
+    else:
+        shutil.copy2(src, dst)
+
+
+def memo_lookup(stage: Stage, fp: str) -> Optional[Dict]:
+    """meta.json of a stored result for *fp*, or None (meta.json is written last)."""
+    meta = _memo_dir(stage, fp) / "meta.json"
+    try:
+        return json.loads(meta.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def memo_edition_latest(stage: Stage) -> Optional[Dict]:
+    """Newest stored result of *stage* for today's edition (any fingerprint)."""
+    metas = []
+    for meta_file in (CACHE_DIR / stage.name).glob("*/meta.json"):
+        try:
+            meta = json.loads(meta_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if meta.get("edition") == EDITION:
+            metas.append((meta.get("stored", ""), meta))
+    return max(metas, key=lambda m: m[0])[1] if metas else None
+
+
+def carry_over(stage: Stage) -> None:
+    """Re-apply *stage.carry* fields from this edition's last result (e.g. the post already published)."""
+    meta = memo_edition_latest(stage) if stage.carry else None
+    fields = {k: meta["manifest"][k] for k in stage.carry if meta and k in meta.get("manifest", {})}
+    if fields:
+        with _manifest_lock:
+            run_manifest.update(**fields)
+        with _print_lock:
+            print(f"↪ {stage.name}: carrying over {fields} from this edition's last run")
+
+
+def memo_restore(stage: Stage, fp: str, meta: Dict) -> None:
+    """Put a stored result back in the working tree and the run manifest."""
+    files = _memo_dir(stage, fp) / "files"
+    for p in meta["outputs"]:
+        _copy(files / p, Path(p))
+    if meta.get("manifest"):
+        with _manifest_lock:
+            run_manifest.update(**meta["manifest"])
+
+
+def memo_store(stage: Stage, fp: str, seconds: float) -> None:
+    """Keep this run's outputs under .cache/<stage>/<hash>/, then prune old results."""
+    final = _memo_dir(stage, fp)
+    tmp = final.with_name(final.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    for p in stage.outputs:
+        _copy(Path(p), tmp / "files" / p)
+    with _manifest_lock:
+        manifest = run_manifest.read()
+    meta = {"stage": stage.name, "fingerprint": fp, "edition": EDITION if stage.edition else None,
+            "stored": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "seconds": seconds,
+            "outputs": list(stage.outputs),
+            "manifest": {k: manifest[k] for k in stage.manifest if k in manifest}}
+    tmp.mkdir(parents=True, exist_ok=True)
+    (tmp / "meta.json").write_text(json.dumps(meta, indent=1), encoding="utf-8")
+    shutil.rmtree(final, ignore_errors=True)
+    tmp.rename(final)
+    stored = sorted((d for d in final.parent.iterdir() if (d / "meta.json").exists()),
+                    key=lambda d: (d / "meta.json").stat().st_mtime, reverse=True)
+    for old in stored[CACHE_KEEP:]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+# ─── Runner ────────────────────────────────────────────────────
+def validate(stages: Sequence[Stage]) -> None:
+    names = {s.name for s in stages}
+    for s in stages:
+        missing = set(s.after) - names
+        if missing:
+            raise ValueError(f"Stage {s.name!r} depends on unknown stage(s) {sorted(missing)}")
+    seen, visiting = set(), set()
+    by_name = {s.name: s for s in stages}
+
+    def visit(name):
+        if name in visiting:
+            raise ValueError(f"Dependency cycle through {name!r}")
+        if name not in seen:
+            visiting.add(name)
+            for dep in by_name[name].after:
+                visit(dep)
+            visiting.discard(name)
+            seen.add(name)
+
+    for s in stages:
+        visit(s.name)
+
+
+def _fallback_marker(stage: Stage) -> Path:
+    return STATE_DIR / f"{stage.name}.fallback"
+
+
+def _run_stage(stage: Stage) -> int:
+    marker = _fallback_marker(stage)
+    marker.unlink(missing_ok=True)
+    env = {**os.environ, **stage.env, "PYTHONUNBUFFERED": "1", run_manifest.FALLBACK_ENV: str(marker)}
+    proc = subprocess.Popen([sys.executable, stage.script, *stage.args], env=env, text=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=1)
+    for line in proc.stdout:
+        with _print_lock:
+            print(f"[{stage.name}] {line}", end="")
+    return proc.wait()
+
+
+def run(stages: Sequence[Stage], workers: int = WORKERS, force: Sequence[str] = (),
+        dry_run: bool = False) -> Dict[str, Dict]:
+    """Execute *stages* in dependency order, up to *workers* at a time; returns per-stage results."""
+    validate(stages)
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    pending = {s.name: s for s in stages}
+    results: Dict[str, Dict] = {}
+    force_all = "all" in force
+    t_run = time.perf_counter()
+
+    by_name = {s.name: s for s in stages}
+
+    def blocked(stage):
+        return any(results[d]["status"] in (FAILED, BLOCKED) and not by_name[d].optional
+                   for d in stage.after)
+
+    def execute(stage: Stage) -> Dict:
+        t0, started = time.perf_counter(), time.time()
+        if not dry_run:
+            carry_over(stage)
+        fp = fingerprint(stage)
+        meta = None if force_all or stage.name in force else memo_lookup(stage, fp)
+        if dry_run:
+            return {"status": "would reuse" if meta else "would run", "seconds": 0.0}
+        if meta:
+            memo_restore(stage, fp, meta)
+            return {"status": REUSED, "seconds": round(time.perf_counter() - t0, 2),
+                    "saved": meta.get("seconds", 0.0)}
+        with _print_lock:
+            print(f"▶ {stage.name}: {stage.script} {' '.join(stage.args)}".rstrip())
+        code = _run_stage(stage)
+        seconds = round(time.perf_counter() - t0, 2)
+        if code != 0:
+            return {"status": FAILED, "seconds": seconds, "exit": code}
+        # Scripts often log and exit 0 on errors – a missing or stale output is a failure
+        stale = [p for p in stage.outputs if _mtime(Path(p)) < started - 1]
+        if stale:
+            return {"status": FAILED, "seconds": seconds, "not_written": stale}
+        # A stand-in result (run_manifest.note_fallback) is passed on but never reused
+        marker = _fallback_marker(stage)
+        if marker.exists():
+            reasons = marker.read_text(encoding="utf-8").split("\n")[0]
+            marker.unlink(missing_ok=True)
+            with _print_lock:
+                print(f"⚠️ {stage.name}: fallback output ({reasons}) – not memoized, a rerun tries again")
+            return {"status": RAN, "seconds": seconds, "fallback": reasons}
+        # Outputs may be inputs of this very stage's next run – key on what it consumed
+        try:
+            memo_store(stage, fp, seconds)
+        except OSError as e:
+            with _print_lock:
+                print(f"⚠️ {stage.name}: result not memoized: {e}")
+        return {"status": RAN, "seconds": seconds}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        running = {}
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if all(d in results for d in stage.after):
+                    del pending[name]
+                    if blocked(stage):
+                        results[name] = {"status": BLOCKED, "seconds": 0.0}
+                        continue
+                    running[pool.submit(execute, stage)] = stage
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                stage = running.pop(fut)
+                try:
+                    results[stage.name] = fut.result()
+                except Exception as e:
+                    results[stage.name] = {"status": FAILED, "seconds": 0.0, "error": str(e)}
+                res = results[stage.name]
+                with _print_lock:
+                    print(f"■ {stage.name}: {res['status']} ({res['seconds']:.1f}s)")
+
+    total = round(time.perf_counter() - t_run, 2)
+    _report(stages, results, total)
+    if not dry_run:
+        with open(RUNS_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                                "seconds": total, "stages": results}) + "\n")
+    return results
+
+
+def _report(stages: Sequence[Stage], results: Dict[str, Dict], total: float) -> None:
+    serial = sum(r["seconds"] for r in results.values())
+    print("\n Stage            Status       Seconds")
+    print(" ───────────────  ───────────  ───────")
+    for s in stages:
+        r = results.get(s.name, {"status": "-", "seconds": 0.0})
+        print(f" {s.name:<15}  {r['status']:<11}  {r['seconds']:7.1f}")
+    print(f" Wall time {total:.1f}s (stages sum to {serial:.1f}s)")
+    saved = sum(r.get("saved", 0.0) for r in results.values())
+    if saved:
+        print(f" Memoized results saved ~{saved:.1f}s of stage time")
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="Run a content pipeline as a DAG")
+    ap.add_argument("pipeline", choices=sorted(PIPELINES))
+    ap.add_argument("--force", nargs="*", default=(), metavar="STAGE",
+                    help="re-run these stages even if a memoized result exists ('all' for every stage)")
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    ap.add_argument("--dry-run", action="store_true", help="only report which stages would run")
+    args = ap.parse_args(argv)
+    results = run(PIPELINES[args.pipeline], args.workers, args.force, args.dry_run)
+    failed = [n for n, r in results.items() if r["status"] in (FAILED, BLOCKED)]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+publish.py  ·  Single-pass WordPress publish
+--------------------------------------------
+Replaces the create-post → upload audio → upload video → fetch post →
+rewrite post sequence with:
+
+  1. poster, audio and video uploaded concurrently (wp_media client)
+  2. ONE post create with the embed block and featured media in place
+
+The blog step (final.py with PUBLISH_MODE=deferred) leaves a draft
+(title, content, poster plan) in the run manifest instead of posting.
+
+If the manifest already holds a post_id (a rerun of the same edition –
+pipeline.py carries it over), that post is updated instead, so a rerun
+never publishes a second copy.
+
+Output
+  • run_manifest.json   post_id, link and media {poster|audio|video: {id, source_url}}
+
+USAGE
+    PUBLISH_MODE=deferred python final.py   # … audio, video steps …
+    python publish.py
+"""
+from __future__ import annotations
+
+import html
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+import run_manifest
+import wp_media
+
+load_dotenv()
+
+# ─── Constants ─────────────────────────────────────────────────
+AUDIO_FILE = "blog_voiceover.mp3"
+VIDEO_FILE = "video_output.mp4"
+
+
+# ─── Embed block ───────────────────────────────────────────────
+def embed_html(title_html: str, video_url: Optional[str] = None, audio_url: Optional[str] = None,
+               youtube_url: Optional[str] = None) -> str:
+    """Video (self-hosted or YouTube iframe) beside the title and optional audio player."""
+    parts = [
+        '<div style="display:flex; align-items:center; justify-content:center; gap:40px; margin-bottom:30px;">',
+        '  <div style="flex:0 0 320px;">',
+    ]
+    if youtube_url:
+        parts += [
+            f'    <iframe width="100%" height="215" src="{youtube_url}" '
+            'frameborder="0" allow="accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture" '
+            'allowfullscreen style="border-radius:12px;"></iframe>',
+        ]
+    elif video_url:
+        parts += [
+            '    <video controls playsinline style="width:100%; height:auto; border-radius:12px;">',
+            f'      <source src="{video_url}" type="video/mp4">',
+            '      Your browser does not support the video tag.',
+            '    </video>',
+        ]
+    parts += [
+        '  </div>',
+        '  <div style="flex:1; max-width:600px;">',
+        f'    <h1 style="margin:0 0 20px; font-size:28px; text-align:center;">{title_html}</h1>',
+    ]
+    if audio_url:
+        parts += [
+            '    <p style="text-align:center;"><strong>Prefer to listen?</strong></p>',
+            '    <audio controls style="width:100%; margin-top:10px;">',
+            f'      <source src="{audio_url}" type="audio/mpeg">',
+            '      Your browser does not support the audio element.',
+            '    </audio>',
+        ]
+    parts += ['  </div>', '</div>']
+    return "\n".join(parts)
+
+
+# ─── Publish ───────────────────────────────────────────────────
+def _upload_file(path: str, mime_type: str) -> Dict:
+    return wp_media.get_client().upload(path, mime_type)
+
+
+def _upload_poster(plan: Dict) -> Dict:
+    import image_utils      # lazy: pulls in image_library (numpy, PIL)
+    return image_utils.upload_blog_poster(plan)
+
+
+def _update_or_create(wp: wp_media.WPClient, post_id: Optional[int], fields: Dict) -> Dict:
+    """Update this edition's post if there is one, else create it (once)."""
+    if post_id:
+        try:
+            post = wp.update_post(post_id, **fields)
+            print(f"♻️ Updated existing post {post_id} instead of publishing a second one")
+            return post
+        except wp_media.WPError as e:
+            if e.status not in (404, 410):
+                raise
+            print(f"[!] Post {post_id} no longer exists; creating a new one")
+    return wp.create_post(**fields)
+
+
+def publish(draft: Optional[Dict] = None, audio: str = AUDIO_FILE, video: str = VIDEO_FILE,
+            youtube_url: Optional[str] = None) -> Optional[int]:
+    """Upload all media in parallel, then create the post once; returns the post ID."""
+    manifest = run_manifest.read()
+    draft = draft or manifest.get("draft")
+    if not draft:
+        print("[!] No draft in the run manifest – run the blog step with PUBLISH_MODE=deferred")
+        return None
+
+    t0 = time.perf_counter()
+    jobs = {}
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        if draft.get("poster"):
+            jobs["poster"] = pool.submit(_upload_poster, draft["poster"])
+        if os.path.exists(audio):
+            jobs["audio"] = pool.submit(_upload_file, audio, "audio/mpeg")
+        if os.path.exists(video):
+            jobs["video"] = pool.submit(_upload_file, video, "video/mp4")
+        media = {}
+        for kind, job in jobs.items():
+            try:
+                info = job.result()
+                media[kind] = {"id": info.get("id", 0), "source_url": info.get("source_url", "")}
+                print(f"✅ {kind}: {media[kind]['source_url']}")
+            except Exception as e:
+                print(f"⚠️ {kind} upload failed, publishing without it: {e}")
+    print(f"Uploaded {len(media)}/{len(jobs)} media in {time.perf_counter() - t0:.1f}s")
+
+    video_url = media.get("video", {}).get("source_url")
+    audio_url = media.get("audio", {}).get("source_url")
+    content = draft["content"]
+    if video_url or audio_url or youtube_url:
+        content = embed_html(html.escape(draft["title"]), video_url, audio_url, youtube_url) + "\n\n" + content
+
+    fields = dict(title=draft["title"], content=content, status="publish",
+                  featured_media=media.get("poster", {}).get("id", 0))
+    post = _update_or_create(wp_media.get_client(), manifest.get("post_id"), fields)
+    run_manifest.update(post_id=post["id"], link=post.get("link", ""), title=draft["title"], media=media)
+    if audio_url:
+        with open("latest_audio_url.txt", "w", encoding="utf-8") as f:
+            f.write(audio_url)
+    print(f"✅ Published post {post['id']} with all media in {time.perf_counter() - t0:.1f}s: {post.get('link')}")
+    return post["id"]
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Upload media in parallel and create the post once")
+    ap.add_argument("--poster-plan", help="JSON from `python image_utils.py` (separate poster stage)")
+    args = ap.parse_args()
+
+    draft = run_manifest.read().get("draft")
+    if draft and args.poster_plan and os.path.exists(args.poster_plan):
+        with open(args.poster_plan, "r", encoding="utf-8") as f:
+            draft["poster"] = json.load(f)
+    youtube_url = os.getenv("YOUTUBE_EMBED_URL") or run_manifest.read().get("youtube_embed_url")
+    sys.exit(0 if publish(draft, youtube_url=youtube_url) else 1)
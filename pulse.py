@@ -14,14 +14,17 @@ import pathlib
 import time
 from typing import Dict, List
 
-import importlib.util
-import pandas as pd
 import requests
-import feedparser
-import yfinance as yf
 import pytz
-from transformers import pipeline, Pipeline
+
+import headline_summariser
+import lazy_imports
 from article_extractor import extract_article_text
+from headline_summariser import summariser   # DistilBART, loaded on first use
+
+# Heavy imports deferred to first use (see lazy_imports.py)
+feedparser = lazy_imports.module("feedparser")
+yf         = lazy_imports.module("yfinance")
 
 # ─── Timing ─────────────────────────────────────────────────────
 T0 = time.time()
@@ -63,25 +66,6 @@ HEADERS = {
     )
 }
 
-# ─── Summarisation model setup ─────────────────────────────────
-if not any(importlib.util.find_spec(x) for x in ("torch", "tensorflow", "jax")):
-    raise RuntimeError(
-        "No deep-learning backend detected.\n"
-        "Install CPU PyTorch:\n"
-        "    pip install torch --index-url https://download.pytorch.org/whl/cpu torch"
-    )
-
-MODEL_NAME = "sshleifer/distilbart-cnn-12-6"
-
-summariser: Pipeline = pipeline(
-    "summarization",
-    model=MODEL_NAME,
-    tokenizer=MODEL_NAME,
-    framework="pt",
-    truncation=True,
-    token=None
-)
-
 # ─── Quote fetching (yfinance) ─────────────────────────────────
 def fetch_quotes(symbol_map: Dict[str, str]) -> Dict[str, Dict]:
     tickers = list(symbol_map.values())
@@ -195,6 +179,7 @@ def append_to_log(blob: Dict) -> None:
 
 # ─── Entrypoint ────────────────────────────────────────────────
 def main():
+    headline_summariser.resolve()     # fail fast without a DL backend
     blob = build_pulse_blob()
 
     append_to_log(blob)
@@ -208,4 +193,7 @@ def main():
     print(f"⏱ Total runtime: {round(time.time() - T0, 2)} seconds")
 
 if __name__ == "__main__":
+    import argparse
+    argparse.ArgumentParser(description="Build the market pulse section (Section 2) "
+                            "and append it to pulse_log.jsonl").parse_args()
     main()
@@ -0,0 +1,149 @@
+"""
+rttm.py  ·  RTTM diarization files as compact NumPy arrays
+----------------------------------------------------------
+Parses an RTTM file in one pass straight into a structured array
+(start, duration, speaker id) plus a sorted list of speaker names, so
+downstream code works on arrays instead of lists of split strings.
+
+  • Rttm.merged()     – join overlapping / adjacent turns per speaker
+  • Rttm.index()      – SpeakerIndex: who is speaking at time t
+                        (per-speaker sorted arrays + binary search)
+  • Rttm.write()      – standard 10-field SPEAKER lines
+
+USAGE
+    from rttm import read_rttm
+    turns = read_rttm("full_dialogue.rttm").merged()
+    turns.index().speakers_at(93.4)      # → ["SPEAKER_01"]
+
+    python rttm.py file.rttm            # summary + parse timing
+"""
+from __future__ import annotations
+
+import warnings
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+SEGMENT_DTYPE = np.dtype([("start", "f8"), ("duration", "f8"), ("speaker", "i4")])
+
+
+class Rttm:
+    """Diarization turns: a SEGMENT_DTYPE array indexing into *speakers*."""
+
+    def __init__(self, segments: np.ndarray, speakers: Sequence[str], uri: str = ""):
+        self.segments = segments.astype(SEGMENT_DTYPE, copy=False)
+        self.speakers = list(speakers)
+        self.uri = uri
+
+    @classmethod
+    def from_turns(cls, turns: Iterable[Tuple[float, float, str]], uri: str = "") -> "Rttm":
+        """Build from (start_s, end_s, label) tuples."""
+        turns = list(turns)
+        speakers = sorted({label for _, _, label in turns})
+        ids = {s: i for i, s in enumerate(speakers)}
+        seg = np.array([(s, e - s, ids[label]) for s, e, label in turns], dtype=SEGMENT_DTYPE)
+        return cls(seg, speakers, uri)
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    @property
+    def start(self) -> np.ndarray:
+        return self.segments["start"]
+
+    @property
+    def end(self) -> np.ndarray:
+        return self.segments["start"] + self.segments["duration"]
+
+    @property
+    def speaker(self) -> np.ndarray:
+        return self.segments["speaker"]
+
+    def merged(self, gap: float = 0.0) -> "Rttm":
+        """
+        Union of each speaker's turns: overlapping turns, and turns separated
+        by at most *gap* seconds, become one. Result is sorted by start time.
+        """
+        if not len(self):
+            return Rttm(self.segments.copy(), self.speakers, self.uri)
+        order = np.lexsort((self.start, self.speaker))
+        spk, start, end = self.speaker[order], self.start[order], self.end[order]
+        # Running max of end within each speaker run (offset keeps groups apart)
+        span = float(end.max() - min(start.min(), 0.0)) + gap + 1.0
+        reach = np.maximum.accumulate(end + spk * span) - spk * span
+        new = np.ones(len(order), dtype=bool)
+        new[1:] = (spk[1:] != spk[:-1]) | (start[1:] > reach[:-1] + gap)
+        first = np.flatnonzero(new)
+        last = np.r_[first[1:], len(order)] - 1
+        out = np.empty(len(first), dtype=SEGMENT_DTYPE)
+        out["start"], out["duration"], out["speaker"] = start[first], reach[last] - start[first], spk[first]
+        return Rttm(out[np.argsort(out["start"], kind="stable")], self.speakers, self.uri)
+
+    def for_speaker(self, speaker: int | str) -> np.ndarray:
+        sid = self.speakers.index(speaker) if isinstance(speaker, str) else speaker
+        return self.segments[self.speaker == sid]
+
+    def index(self) -> "SpeakerIndex":
+        return SpeakerIndex(self)
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as f:
+            for start, duration, sid in self.segments.tolist():
+                f.write(f"SPEAKER {self.uri or '<NA>'} 1 {start:.3f} {duration:.3f} "
+                        f"<NA> <NA> {self.speakers[sid]} <NA> <NA>\n")
+
+
+class SpeakerIndex:
+    """Who is speaking when: per-speaker sorted, non-overlapping intervals."""
+
+    def __init__(self, rttm: Rttm):
+        turns = rttm.merged()
+        self.speakers = turns.speakers
+        self._starts: List[np.ndarray] = []
+        self._ends: List[np.ndarray] = []
+        for sid in range(len(self.speakers)):
+            seg = turns.for_speaker(sid)
+            self._starts.append(seg["start"])
+            self._ends.append(seg["start"] + seg["duration"])
+
+    def active(self, times) -> np.ndarray:
+        """Boolean (len(times), n_speakers) matrix: speaker j talks at times[i]."""
+        t = np.atleast_1d(np.asarray(times, dtype=float))
+        out = np.zeros((len(t), len(self.speakers)), dtype=bool)
+        for sid, (starts, ends) in enumerate(zip(self._starts, self._ends)):
+            i = np.searchsorted(starts, t, side="right") - 1
+            ok = i >= 0
+            out[ok, sid] = ends[i[ok]] > t[ok]
+        return out
+
+    def speakers_at(self, t: float) -> List[str]:
+        return [s for s, on in zip(self.speakers, self.active(t)[0]) if on]
+
+
+def read_rttm(path: str) -> Rttm:
+    """Parse the SPEAKER lines of an RTTM file (fields 4, 5 and 8) in one pass."""
+    fields = np.dtype([("type", "U8"), ("uri", "U128"), ("start", "f8"), ("duration", "f8"), ("label", "U64")])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)          # empty file
+        raw = np.loadtxt(path, dtype=fields, usecols=(0, 1, 3, 4, 7), comments=";;", ndmin=1)
+    raw = raw[raw["type"] == "SPEAKER"]
+    speakers, ids = np.unique(raw["label"], return_inverse=True)
+    seg = np.empty(len(raw), dtype=SEGMENT_DTYPE)
+    seg["start"], seg["duration"], seg["speaker"] = raw["start"], raw["duration"], ids
+    return Rttm(seg, speakers.tolist(), str(raw["uri"][0]) if len(raw) else "")
+
+
+if __name__ == "__main__":
+    import sys, time
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python rttm.py file.rttm")
+    t0 = time.perf_counter()
+    turns = read_rttm(sys.argv[1])
+    t1 = time.perf_counter()
+    merged = turns.merged()
+    t2 = time.perf_counter()
+    print(f"{len(turns):,} turns, {len(turns.speakers)} speaker(s) – parsed in {(t1 - t0) * 1000:.1f} ms, "
+          f"merged to {len(merged):,} in {(t2 - t1) * 1000:.1f} ms")
+    for sid, name in enumerate(merged.speakers):
+        seg = merged.for_speaker(sid)
+        print(f"  {name}: {seg['duration'].sum() / 60:.1f} min in {len(seg):,} turns")
@@ -0,0 +1,101 @@
+"""
+run_manifest.py  ·  What this pipeline run has published so far
+---------------------------------------------------------------
+The blog step records the post it created (ID, link, title); later
+steps in the same job read it, so they update *that* post directly
+instead of guessing it is the newest one on the site.
+
+update() is a locked read-modify-write (run_manifest.json.lock), so
+pipeline stages running in parallel processes never drop each other's
+fields.
+
+A script that writes a stand-in result instead of the real one (silent
+audio, "Content temporarily unavailable.") calls note_fallback(); under
+pipeline.py that keeps the stage's outputs out of the memo cache, so a
+rerun tries again instead of reusing the stand-in.
+
+Output
+  • run_manifest.json   (RUN_MANIFEST; workspace-local, not committed)
+
+USAGE
+    import run_manifest
+    run_manifest.start(post_id=123, link="https://…", title="…")   # new run
+    run_manifest.update(audio_url="https://…/voice.mp3")
+    run_manifest.read().get("post_id")
+    run_manifest.note_fallback("TTS failed, wrote silence")
+"""
+from __future__ import annotations
+
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+try:
+    import fcntl
+except ImportError:          # Windows: no cross-process lock, single-process use only
+    fcntl = None
+
+MANIFEST_FILE = Path(os.getenv("RUN_MANIFEST", "run_manifest.json"))
+FALLBACK_ENV  = "PIPELINE_FALLBACK_MARKER"      # set by pipeline.py for each stage
+
+
+def read(path: Path | str = MANIFEST_FILE) -> Dict[str, Any]:
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        print(f"[!] {path} unreadable – ignoring run manifest")
+        return {}
+
+
+def _write(data: Dict[str, Any], path: Path | str) -> None:
+    path = Path(path)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data, indent=1), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+@contextmanager
+def _locked(path: Path | str) -> Iterator[None]:
+    """Exclusive lock on <manifest>.lock for the duration of a read-modify-write."""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def start(path: Path | str = MANIFEST_FILE, **fields: Any) -> Dict[str, Any]:
+    """Begin a new run's manifest (drops whatever a previous run left behind)."""
+    data = {"started": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), **fields}
+    with _locked(path):
+        _write(data, path)
+    return data
+
+
+def update(path: Path | str = MANIFEST_FILE, **fields: Any) -> Dict[str, Any]:
+    with _locked(path):
+        data = read(path)
+        data.update(fields)
+        _write(data, path)
+    return data
+
+
+def note_fallback(reason: str) -> None:
+    """Flag this run's output as a stand-in; pipeline.py then does not memoize it."""
+    marker = os.getenv(FALLBACK_ENV)
+    if marker:
+        with open(marker, "a", encoding="utf-8") as f:
+            f.write(reason.strip() + "\n")
+
+
+if __name__ == "__main__":
+    print(json.dumps(read(), indent=1) if MANIFEST_FILE.exists() else f"No {MANIFEST_FILE} yet")
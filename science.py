@@ -17,28 +17,32 @@ financial script so downstream orchestration stays identical.
 
 from __future__ import annotations
 
-import json, os, sys
+import json, os, re, sys
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import Set
+from typing import List, Set
 
-import pytz, openai
+import pytz
 from dotenv import load_dotenv
-from openai import OpenAIError
+
+import lazy_imports
 
 # ─── environment ──────────────────────────────────────────────────────
 load_dotenv()
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+openai = lazy_imports.module("openai")
+client = lazy_imports.Lazy(lambda: openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY")))
 
 # Import shared publishing helpers (same as modular_blog.py)
 from final import generate_video_prompt, post_to_wordpress  # noqa: E402
-import image_utils  # poster uploader (optional)
+from topic_index import TopicIndex  # noqa: E402
+image_utils = lazy_imports.module("image_utils")  # poster uploader (optional)
 
 # ─── time & paths ─────────────────────────────────────────────────────
 EST = pytz.timezone("America/New_York")
 TODAY_EST = datetime.now(timezone.utc).astimezone(EST).date()
 
 TOPIC_HISTORY_FILE = Path("topic_history_science.json")  # JSON list
+TOPIC_INDEX_NAME = "science"  # topic_index_science.{npy,json}
 ARCHIVE_ROOT = Path("data")  # mirrors finance script
 
 SECTION_TITLES = [
@@ -46,7 +50,9 @@ SECTION_TITLES = [
     "Key Findings",
     "Broader Implications",
 ]
-MAX_TOPIC_ATTEMPTS = 5
+MAX_TOPIC_ATTEMPTS = 3
+CANDIDATES_PER_CALL = 8  # ranked headlines requested per GPT call
+FALLBACK_TOPIC = "A recent breakthrough in science and technology"
 
 # ─── helpers ──────────────────────────────────────────────────────────
 def ordinal(n: int) -> str:
@@ -75,38 +81,65 @@ def _save_topic_history(hist: Set[str]):
 
 # ––– LLM topic picker --------------------------------------------------
 
-def pick_new_topic(hist: Set[str]) -> str:
-    """Ask GPT-4o for a headline not present in *hist*."""
-    attempts, latest_list = 0, ", ".join(list(hist)[-50:]) or "(none)"
-    topic: str | None = None
-    while attempts < MAX_TOPIC_ATTEMPTS:
-        attempts += 1
+def _norm_topic(topic: str) -> str:
+    """Case/punctuation-insensitive key used for exact-repeat checks."""
+    return " ".join(re.sub(r"[^\w\s]", " ", topic.lower()).split())
+
+
+def _request_candidates(recent_themes: str, rejected: List[str]) -> List[str]:
+    """One structured GPT call returning a ranked list of candidate headlines."""
+    avoid = f"\nThese candidates were already rejected as repeats: {'; '.join(rejected)}." if rejected else ""
+    completion = client.chat.completions.create(
+        model="gpt-4o",
+        temperature=0.3,
+        response_format={"type": "json_object"},
+        messages=[
+            {
+                "role": "system",
+                "content": (
+                    "You are a science & technology news curator.\n"
+                    "Step 1 – Mentally scan today’s front pages or RSS feeds of: Scientific American (News), ScienceDaily (Top Science), Ars Technica – Science, TechCrunch (General).\n"
+                    f"Step 2 – Pick the {CANDIDATES_PER_CALL} most specific, impactful headlines (within last 48 h), ranked best first.\n"
+                    f"Step 3 – Avoid repeats; recently covered themes: {recent_themes}.{avoid}\n"
+                    "Return ONLY JSON like {\"topics\":[\"<headline 1>\",\"<headline 2>\", …]}."
+                ),
+            }
+        ],
+    )
+    topics = json.loads(completion.choices[0].message.content)["topics"]
+    if not isinstance(topics, list):
+        raise TypeError(f"'topics' should be a list, got {type(topics).__name__}")
+    return [t.strip() for t in topics if isinstance(t, str) and t.strip()]
+
+
+def pick_new_topic(hist: Set[str], index: TopicIndex | None = None) -> str:
+    """Ask GPT-4o for ranked candidates and return the best one not already covered."""
+    if index is None:
+        index = TopicIndex(TOPIC_INDEX_NAME)
+        index.sync(hist)
+    seen = {_norm_topic(t) for t in hist}
+    recent_themes = index.recent_themes()
+    rejected: List[str] = []
+    for attempt in range(1, MAX_TOPIC_ATTEMPTS + 1):
         try:
-            completion = client.chat.completions.create(
-                model="gpt-4o",
-                temperature=0.3,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are a science & technology news curator.\n"
-                            "Step 1 – Mentally scan today’s front pages or RSS feeds of: Scientific American (News), ScienceDaily (Top Science), Ars Technica – Science, TechCrunch (General).\n"
-                            "Step 2 – Pick ONE specific, impactful headline (within last 48 h).\n"
-                            f"Step 3 – Avoid repeats; here are USED topics: {latest_list}.\n"
-                            "Return ONLY JSON like {\"topic\":\"<headline>\"}."
-                        ),
-                    }
-                ],
-            )
-            topic = json.loads(completion.choices[0].message.content)["topic"].strip()
-            if topic.lower() not in {t.lower() for t in hist}:
+            candidates = _request_candidates(recent_themes, rejected)
+        except (openai.OpenAIError, KeyError, TypeError, json.JSONDecodeError) as exc:
+            print(f"[!] Topic selection error ({attempt}):", exc)
+            continue
+        fresh = [c for c in candidates if _norm_topic(c) not in seen]
+        for topic, dup in zip(fresh, index.duplicates(fresh)):
+            if not dup:
                 hist.add(topic)
                 _save_topic_history(hist)
+                index.add([topic])
+                index.save()
                 return topic
-            print("[⚠] GPT produced a repeat; retrying …")
-        except (OpenAIError, KeyError, json.JSONDecodeError) as exc:
-            print(f"[!] Topic selection error ({attempts}):", exc)
-    return topic or "A recent breakthrough in science and technology"
+        rejected.extend(candidates)
+        seen.update(_norm_topic(c) for c in candidates)
+        print(f"[⚠] All {len(candidates)} candidates were repeats; requesting more …")
+    # Every candidate was a repeat (or the calls failed) – never publish a rejected one
+    print("[!] No fresh topic found; using the generic fallback")
+    return FALLBACK_TOPIC
 
 # ––– local IO ----------------------------------------------------------
 
@@ -118,7 +151,9 @@ def _write(path: str | Path, text: str):
 def main():
     # 1. Topic selection ------------------------------------------------
     history = _load_topic_history()
-    topic = pick_new_topic(history)
+    index = TopicIndex(TOPIC_INDEX_NAME)
+    index.sync(history)
+    topic = pick_new_topic(history, index)
     print("Chosen topic →", topic)
 
     # 2. Section generation -------------------------------------------
@@ -140,7 +175,7 @@ def main():
                 ],
             )
             sections_out.append(resp.choices[0].message.content.strip())
-        except OpenAIError as exc:
+        except openai.OpenAIError as exc:
             print(f"[!] Section '{title}' failed:", exc)
             sections_out.append("Content temporarily unavailable.")
 
@@ -196,6 +231,9 @@ def main():
 
 
 if __name__ == "__main__":
+    import argparse
+    argparse.ArgumentParser(description="Pick a fresh science/tech topic, write the blog "
+                            "and publish it").parse_args()
     try:
         main()
     except KeyboardInterrupt:
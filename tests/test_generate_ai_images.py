@@ -0,0 +1,133 @@
+"""generate_ai_images with a stub images client and a local download server."""
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+os.environ.setdefault("OPENAI_API_KEY", "test")    # the module builds its client at import
+import generate_ai_images as gen  # noqa: E402
+
+PNG = b"\x89PNG\r\n\x1a\n" + os.urandom(200_000)
+
+
+class StubImages:
+    """client.images.generate(...) → .data[0].url; *errors* maps prompt → exceptions to raise first."""
+
+    def __init__(self, base, delay=0.0, errors=None):
+        self.base, self.delay, self.errors = base, delay, errors or {}
+        self.calls, self.started = [], []
+        self.lock = threading.Lock()
+
+    def generate(self, model, prompt, n, size):
+        with self.lock:
+            self.calls.append(prompt)
+            self.started.append(time.monotonic())
+            pending = self.errors.get(prompt)
+            error = pending.pop(0) if pending else None
+        if error:
+            raise error
+        time.sleep(self.delay)
+        item = type("Image", (), {"url": f"{self.base}/{len(self.calls)}.png"})()
+        return type("Response", (), {"data": [item]})()
+
+
+class StubLibrary:
+    def __init__(self, hit=None):
+        self.hit, self.added = hit, []
+
+    def lookup(self, prompt, kind):
+        return self.hit
+
+    def add(self, prompt, kind, path):
+        self.added.append(prompt)
+
+    def export(self, entry, output_path):
+        with open(output_path, "wb") as f:
+            f.write(b"library image")
+        return output_path
+
+
+@pytest.fixture
+def server():
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(PNG)))
+            self.end_headers()
+            self.wfile.write(PNG)
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_port}"
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def stub(monkeypatch, server, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    library = StubLibrary()
+    images = StubImages(server, delay=0.2)
+    monkeypatch.setattr(gen, "client", type("Client", (), {"images": images})())
+    monkeypatch.setattr(gen.image_library, "get_library", lambda: library)
+    monkeypatch.setattr(gen, "BACKOFF", 0.01)
+    monkeypatch.setattr(gen, "limiter", gen.RateLimiter(0))
+    return images, library, tmp_path
+
+
+def _jobs(tmp_path, prompts):
+    return [(p, str(tmp_path / f"scene_{i}.png")) for i, p in enumerate(prompts, start=1)]
+
+
+def test_scenes_are_generated_concurrently(stub):
+    images, library, tmp_path = stub
+    jobs = _jobs(tmp_path, [f"scene {i}" for i in range(6)])
+    t0 = time.perf_counter()
+    results = gen.generate_all(jobs, workers=6)
+    assert time.perf_counter() - t0 < 6 * 0.2 * 0.6          # well under the serial time
+    assert all(results.values())
+    assert all(open(path, "rb").read() == PNG and not os.path.exists(path + ".part") for _, path in jobs)
+    assert sorted(library.added) == sorted(p for p, _ in jobs)
+
+
+def test_transient_failure_is_retried(stub):
+    images, _, tmp_path = stub
+    images.errors = {"flaky": [requests.ConnectionError("reset")]}
+    (prompt, path), = _jobs(tmp_path, ["flaky"])
+    assert gen.generate_image(prompt, path) is True
+    assert images.calls.count("flaky") == 2
+
+
+def test_permanent_failure_is_not_retried(stub):
+    images, _, tmp_path = stub
+    images.errors = {"bad": [ValueError("content policy")] * gen.RETRIES}
+    (prompt, path), = _jobs(tmp_path, ["bad"])
+    assert gen.generate_image(prompt, path) is False
+    assert images.calls.count("bad") == 1 and not os.path.exists(path)
+
+
+def test_library_hit_skips_generation(stub, monkeypatch):
+    images, _, tmp_path = stub
+    monkeypatch.setattr(gen.image_library, "get_library", lambda: StubLibrary(hit=object()))
+    (prompt, path), = _jobs(tmp_path, ["seen before"])
+    assert gen.generate_image(prompt, path) is True
+    assert images.calls == [] and open(path, "rb").read() == b"library image"
+
+
+def test_rate_limiter_spaces_request_starts():
+    limiter = gen.RateLimiter(per_minute=600)                 # one start every 0.1 s
+    starts = []
+    threads = [threading.Thread(target=lambda: (limiter.wait(), starts.append(time.monotonic())))
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    starts.sort()
+    assert all(b - a >= 0.09 for a, b in zip(starts, starts[1:]))
@@ -0,0 +1,173 @@
+"""generate_video_heygen against a local mock HeyGen API (no network, no key)."""
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+import generate_video_heygen as heygen
+
+VIDEO_BYTES = os.urandom(3_000_000)
+
+
+class MockHeyGen:
+    """POST /v2/video/generate, GET /v1/video_status.get, GET /file.mp4.
+
+    The voice text of a render picks its behaviour: "ok" completes on the
+    third poll, "flaky" answers 500 once, "fail" fails, "never" stays in
+    processing, "404" / "401" / "429" answer with that status (429 once).
+    """
+
+    def __init__(self):
+        self.jobs, self.polls, self.submits = {}, [], 0
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _json(self, code, obj):
+                body = json.dumps(obj).encode()
+                self.send_response(code)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                mock.submits += 1
+                video_id = f"v{len(mock.jobs)}"
+                mock.jobs[video_id] = {"polls": 0, "spec": payload["video_inputs"][0]["voice"]["input_text"]}
+                self._json(200, {"data": {"video_id": video_id}})
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/file.mp4":
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(VIDEO_BYTES)))
+                    self.end_headers()
+                    self.wfile.write(VIDEO_BYTES)
+                    return
+                video_id = parse_qs(url.query)["video_id"][0]
+                job = mock.jobs[video_id]
+                job["polls"] += 1
+                mock.polls.append((video_id, time.monotonic()))
+                spec = job["spec"]
+                if spec in ("404", "401") or (spec == "429" and job["polls"] == 1):
+                    return self._json(int(spec), {})
+                if spec == "flaky" and job["polls"] == 1:
+                    return self._json(500, {})
+                if spec == "fail":
+                    return self._json(200, {"data": {"status": "failed", "error": "bad avatar"}})
+                if spec == "never" or job["polls"] < 3 and spec == "ok":
+                    return self._json(200, {"data": {"status": "processing"}})
+                self._json(200, {"data": {"status": "completed", "video_url": f"{mock.base}/file.mp4"}})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def poll_count(self, video_id):
+        return sum(1 for v, _ in self.polls if v == video_id)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def mock_heygen(monkeypatch, tmp_path):
+    mock = MockHeyGen()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(heygen, "HEYGEN_API_BASE", mock.base)
+    monkeypatch.setattr(heygen, "HEYGEN_API_KEY", "test-key")
+    monkeypatch.setattr(heygen, "POLL_INITIAL", 0.05)
+    monkeypatch.setattr(heygen, "POLL_MAX", 0.4)
+    monkeypatch.setattr(heygen, "POLL_FACTOR", 2)
+    yield mock
+    mock.close()
+
+
+def test_render_is_polled_with_backoff_and_streamed_to_disk(mock_heygen):
+    video_id = heygen.submit_render("ok", "avatar", "voice")
+    path = heygen.RenderJob(video_id, "avatar_video.mp4").run()
+    assert open(path, "rb").read() == VIDEO_BYTES
+    assert not os.path.exists(path + ".part")
+    times = [t for v, t in mock_heygen.polls if v == video_id]
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    assert len(gaps) == 2 and gaps[1] > gaps[0] * 1.5
+
+
+def test_transient_server_error_is_retried(mock_heygen):
+    video_id = heygen.submit_render("flaky", "avatar", "voice")
+    assert heygen.RenderJob(video_id).wait_until_ready().endswith("/file.mp4")
+
+
+def test_failed_render_raises(mock_heygen):
+    with pytest.raises(heygen.RenderFailed, match="bad avatar"):
+        heygen.RenderJob(heygen.submit_render("fail", "avatar", "voice")).wait_until_ready()
+
+
+def test_deadline_raises_timeout(mock_heygen):
+    t0 = time.monotonic()
+    with pytest.raises(heygen.RenderTimeout):
+        heygen.RenderJob(heygen.submit_render("never", "avatar", "voice"), deadline=0.5).wait_until_ready()
+    assert time.monotonic() - t0 < 2
+
+
+@pytest.mark.parametrize("spec", ["404", "401"])
+def test_client_error_stops_polling(mock_heygen, spec):
+    video_id = heygen.submit_render(spec, "avatar", "voice")
+    with pytest.raises(requests.HTTPError):
+        heygen.RenderJob(video_id, deadline=30).wait_until_ready()
+    assert mock_heygen.poll_count(video_id) == 1
+
+
+def test_rate_limit_is_retried(mock_heygen):
+    video_id = heygen.submit_render("429", "avatar", "voice")
+    assert heygen.RenderJob(video_id, deadline=5).wait_until_ready()
+    assert mock_heygen.poll_count(video_id) == 2
+
+
+def test_success_callback_short_circuits_polling(mock_heygen, monkeypatch):
+    monkeypatch.setattr(heygen, "POLL_INITIAL", 30)
+    receiver = heygen.CallbackReceiver(0)
+    try:
+        video_id = heygen.submit_render("never", "avatar", "voice")
+        event = {"event_type": "avatar_video.success", "event_data": {"video_id": video_id, "url": "http://x/cb.mp4"}}
+        threading.Timer(0.2, lambda: requests.post(f"http://127.0.0.1:{receiver.port}/", json=event)).start()
+        t0 = time.monotonic()
+        assert heygen.RenderJob(video_id, receiver=receiver).wait_until_ready() == "http://x/cb.mp4"
+        assert time.monotonic() - t0 < 2
+    finally:
+        receiver.close()
+
+
+def test_success_callback_without_url_triggers_one_poll(mock_heygen, monkeypatch):
+    monkeypatch.setattr(heygen, "POLL_INITIAL", 0.3)
+    monkeypatch.setattr(heygen, "POLL_MAX", 0.3)
+    receiver = heygen.CallbackReceiver(0)
+    try:
+        video_id = heygen.submit_render("never", "avatar", "voice")
+        event = {"event_type": "avatar_video.success", "event_data": {"video_id": video_id}}
+        threading.Timer(0.1, lambda: requests.post(f"http://127.0.0.1:{receiver.port}/", json=event)).start()
+        with pytest.raises(heygen.RenderTimeout):
+            heygen.RenderJob(video_id, deadline=1.5, receiver=receiver).wait_until_ready()
+        # ~5 scheduled polls plus the one the callback triggered – not a busy loop
+        assert mock_heygen.poll_count(video_id) <= 8
+    finally:
+        receiver.close()
+
+
+def test_wait_without_submitted_render_never_submits(mock_heygen):
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "generate_video_heygen.py")
+    env = {**os.environ, "HEYGEN_API_KEY": "test-key", "HEYGEN_API_BASE": mock_heygen.base}
+    proc = subprocess.run([sys.executable, script, "--wait"], capture_output=True, text=True, env=env)
+    assert proc.returncode != 0 and "--submit first" in proc.stderr
+    assert mock_heygen.submits == 0
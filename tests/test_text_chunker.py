@@ -0,0 +1,50 @@
+"""text_chunker: byte-bounded chunks that always reassemble the input."""
+import random
+
+import pytest
+
+from text_chunker import MAX_BYTES, iter_chunks, iter_ssml_chunks, to_ssml
+
+ALPHABET = list("ab cd. Ef! g? \n&<>é€😀 U.S. Mr. ") + ["\n\n"]
+
+
+def test_random_texts_round_trip_within_the_byte_limit():
+    rng = random.Random(1234)
+    for _ in range(2000):
+        sample = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 500)))
+        limit = rng.randint(4, 80)
+        parts = list(iter_chunks(sample, limit))
+        assert "".join(parts) == sample, (sample, limit)
+        assert all(len(p.encode("utf-8")) <= limit for p in parts), (sample, limit)
+        ssml_limit = max(limit, 32)
+        assert all(len(s.encode("utf-8")) <= ssml_limit for s in iter_ssml_chunks(sample, ssml_limit))
+
+
+def test_cuts_prefer_paragraph_then_sentence_boundaries():
+    para = "First paragraph sentence one. Sentence two.\n\n"
+    parts = list(iter_chunks(para + "Second paragraph that is long enough to need a cut.", len(para) + 5))
+    assert parts[0] == para
+    parts = list(iter_chunks("One sentence here. Another one follows it now.", 30))
+    assert parts[0] == "One sentence here. "
+
+
+def test_abbreviations_do_not_end_a_sentence():
+    parts = list(iter_chunks("Mr. Powell spoke at 2 p.m. today. Stocks rallied.", 40))
+    assert parts[0] == "Mr. Powell spoke at 2 p.m. today. "
+
+
+def test_ssml_is_escaped_and_fits_the_default_limit():
+    text = ("Profit & loss <rose> sharply. " * 400).strip()
+    docs = list(iter_ssml_chunks(text))
+    assert len(docs) > 1
+    assert all(len(d.encode("utf-8")) <= MAX_BYTES for d in docs)
+    assert all(d.startswith("<speak>") and d.endswith("</speak>") and "&amp;" in d for d in docs)
+
+
+@pytest.mark.parametrize("text", ["", "   \n\n  "])
+def test_blank_text_yields_no_ssml(text):
+    assert list(iter_ssml_chunks(text)) == []
+
+
+def test_paragraph_breaks_become_ssml_pauses():
+    assert to_ssml("A.\n\nB.", paragraph_break_ms=600) == '<speak>A.<break time="600ms"/>B.</speak>'
@@ -0,0 +1,133 @@
+"""tts_engine with a fake TTS client (no Google credentials, no network)."""
+import io
+import random
+import threading
+
+import pytest
+
+import tts_engine
+
+VOICE, CONFIG = "en-US-Wavenet-D", "MP3"
+pause = threading.Event().wait       # time.sleep is patched out (no backoff) in every test
+
+
+class FakeAPIError(Exception):
+    """Shaped like google.api_core.exceptions: an HTTP status in .code."""
+
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class FakeClient:
+    """synthesize_speech returns the input text as bytes; *script* injects errors per text."""
+
+    def __init__(self, script=None, delay=0.0, gate=None):
+        self.script = script or {}
+        self.delay = delay
+        self.gate = gate                  # (text, Event): that text blocks until the event is set
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def synthesize_speech(self, input, voice, audio_config):
+        with self.lock:
+            self.calls.append(input)
+            errors = self.script.get(input)
+            error = errors.pop(0) if errors else None
+        if error:
+            raise error
+        if self.gate and input == self.gate[0]:
+            self.gate[1].wait(5)
+        pause(random.uniform(0, self.delay))
+        return type("Response", (), {"audio_content": input.encode()})()
+
+
+def _stream(client, chunks, **kw):
+    out = io.BytesIO()
+    n = tts_engine.synthesize_to_stream(client, chunks, out, VOICE, CONFIG, make_input=lambda t: t, **kw)
+    return n, out.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(tts_engine.time, "sleep", lambda s: None)
+
+
+def test_segments_are_written_in_order():
+    chunks = [f"<{i}>" for i in range(40)]
+    n, audio = _stream(FakeClient(delay=0.005), chunks, max_workers=4)
+    assert n == 40 and audio == "".join(chunks).encode()
+
+
+@pytest.mark.parametrize("error", [FakeAPIError(503), FakeAPIError(429), TimeoutError("deadline")])
+def test_transient_errors_are_retried(error):
+    client = FakeClient({"b": [error]})
+    n, audio = _stream(client, ["a", "b", "c"], max_workers=2)
+    assert audio == b"abc" and client.calls.count("b") == 2
+
+
+@pytest.mark.parametrize("code", [400, 401, 403])
+def test_permanent_errors_fail_without_retry(code):
+    client = FakeClient({"b": [FakeAPIError(code)] * 3})
+    with pytest.raises(FakeAPIError):
+        _stream(client, ["a", "b", "c"], max_workers=1)
+    assert client.calls.count("b") == 1
+
+
+def test_transient_errors_give_up_after_retries():
+    client = FakeClient({"a": [FakeAPIError(500)] * tts_engine.RETRIES})
+    with pytest.raises(FakeAPIError):
+        _stream(client, ["a"])
+    assert client.calls.count("a") == tts_engine.RETRIES
+
+
+def test_cache_hits_skip_the_api(tmp_path):
+    cache = tts_engine.ChunkCache(tmp_path)
+    chunks = [f"chunk {i}" for i in range(10)]
+    _stream(FakeClient(), chunks, cache=cache)
+    client = FakeClient()
+    n, audio = _stream(client, chunks, cache=cache)
+    assert audio == "".join(chunks).encode() and client.calls == [] and cache.hits == 10
+
+
+def test_cache_hits_respect_the_window(tmp_path):
+    """A slow first chunk must not let the rest of a cached run pile up in memory."""
+    cache = tts_engine.ChunkCache(tmp_path)
+    chunks = ["slow"] + [f"cached {i}" for i in range(200)]
+    for c in chunks[1:]:
+        cache.put(cache.key(c, VOICE, CONFIG), c.encode())
+    pulled = []
+
+    def source():
+        for c in chunks:
+            pulled.append(c)
+            yield c
+
+    release = threading.Event()
+    client = FakeClient(gate=("slow", release))
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(out=_stream(client, source(), max_workers=2, cache=cache)))
+    worker.start()
+    pause(0.3)
+    window = 2 * 2
+    assert len(pulled) <= window + 1
+    release.set()
+    worker.join(5)
+    assert result["out"] == (201, "".join(chunks).encode())
+
+
+def test_is_transient_reads_grpc_status_codes():
+    class StatusCode:
+        def __init__(self, name):
+            self.name = name
+
+    class RpcError(Exception):
+        def __init__(self, name):
+            self._name = name
+
+        def code(self):
+            return StatusCode(self._name)
+
+    assert tts_engine.is_transient(RpcError("UNAVAILABLE"))
+    assert not tts_engine.is_transient(RpcError("INVALID_ARGUMENT"))
+    assert not tts_engine.is_transient(ValueError("bad SSML"))
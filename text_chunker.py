@@ -0,0 +1,136 @@
+"""
+text_chunker.py  ·  Sentence-aware chunking for text-to-speech
+---------------------------------------------------------------
+Google TTS rejects requests over 5,000 *bytes* of input, so chunks are
+measured in UTF-8 bytes, not characters.
+
+Boundaries are found in one regex pass over the text and chunks are cut
+as offsets into the original string (no re-slicing of the remainder), so
+chunking is linear in the text length. Preference order for a cut:
+paragraph break → sentence end (skipping common abbreviations) → any
+whitespace → hard cut.
+
+`iter_chunks` yields exact slices: "".join(iter_chunks(t)) == t.
+`iter_ssml_chunks` wraps each chunk in <speak> with paragraph/sentence
+breaks and guarantees the rendered SSML stays under the byte limit.
+
+USAGE
+    from text_chunker import iter_chunks, iter_ssml_chunks
+    for chunk in iter_ssml_chunks(blog_text): ...
+"""
+from __future__ import annotations
+
+import re
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Iterator, List
+
+MAX_BYTES = 4800                # Google's hard limit is 5,000 bytes per request
+PARAGRAPH_BREAK_MS = 600
+SENTENCE_BREAK_MS  = 0          # 0 → let the voice pace sentences itself
+
+ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "inc", "ltd",
+    "co", "corp", "no", "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep",
+    "sept", "oct", "nov", "dec", "u.s", "u.k", "e.g", "i.e", "a.m", "p.m", "approx",
+}
+
+_PARA_RE = re.compile(r"\n[ \t]*\n\s*")
+_SENT_RE = re.compile(r"[.!?…]+[\"'”’)\]]*\s+")
+_WORD_RE = re.compile(r"\s+")
+_ABBR_RE = re.compile(r"([A-Za-z][A-Za-z.]*)\.$")
+
+
+def _byte_offsets(text: str) -> List[int]:
+    """byte_at[i] = UTF-8 length of text[:i] (len(text) + 1 entries)."""
+    if text.isascii():
+        return range(len(text) + 1)
+    return [0, *accumulate(len(c.encode("utf-8")) for c in text)]
+
+
+def _is_abbreviation(text: str, end: int) -> bool:
+    m = _ABBR_RE.search(text, max(0, end - 12), end)
+    if not m:
+        return False
+    word = m.group(1).lower()
+    return word in ABBREVIATIONS or len(word) == 1      # initials: "J. Powell"
+
+
+def _boundaries(text: str):
+    paras = [m.end() for m in _PARA_RE.finditer(text)]
+    sents = [m.end() for m in _SENT_RE.finditer(text)
+             if not _is_abbreviation(text, m.start() + 1)]
+    words = [m.end() for m in _WORD_RE.finditer(text)]
+    return paras, sents, words
+
+
+def iter_chunks(text: str, max_bytes: int = MAX_BYTES) -> Iterator[str]:
+    """Yield consecutive slices of *text*, each at most *max_bytes* UTF-8 bytes."""
+    if not text:
+        return
+    byte_at = _byte_offsets(text)
+    paras, sents, words = _boundaries(text)
+    n, start = len(text), 0
+    while start < n:
+        if byte_at[n] - byte_at[start] <= max_bytes:
+            yield text[start:]
+            return
+        # Furthest character offset that keeps the chunk within budget
+        limit = bisect_right(byte_at, byte_at[start] + max_bytes, lo=start) - 1
+        cut = 0
+        for cands, min_fill in ((paras, 0.5), (sents, 0.3), (words, 0.0)):
+            i = bisect_right(cands, limit) - 1
+            if i >= 0 and cands[i] > start + (limit - start) * min_fill:
+                cut = cands[i]
+                break
+        if cut <= start:
+            cut = max(limit, start + 1)              # single huge token → hard cut
+        yield text[start:cut]
+        start = cut
+
+
+# ─── SSML ──────────────────────────────────────────────────────
+def _escape(s: str) -> str:
+    return s.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def to_ssml(chunk: str, paragraph_break_ms: int = PARAGRAPH_BREAK_MS,
+            sentence_break_ms: int = SENTENCE_BREAK_MS) -> str:
+    """Render a plain-text chunk as <speak> SSML with explicit pauses."""
+    paras = [p.strip() for p in _PARA_RE.split(chunk) if p.strip()]
+    sep = f'<break time="{paragraph_break_ms}ms"/>' if paragraph_break_ms else " "
+    body = []
+    for p in paras:
+        p = _escape(p)
+        if sentence_break_ms:
+            brk = f'<break time="{sentence_break_ms}ms"/> '
+            p = _SENT_RE.sub(
+                lambda m, p=p: m.group(0) if _is_abbreviation(p, m.start() + 1) else m.group(0).rstrip() + brk,
+                p,
+            )
+        body.append(p)
+    return "<speak>" + sep.join(body) + "</speak>"
+
+
+def iter_ssml_chunks(text: str, max_bytes: int = MAX_BYTES, _budget: int | None = None,
+                     **ssml_kw) -> Iterator[str]:
+    """Like iter_chunks, but yields SSML documents that each fit in *max_bytes*."""
+    budget = int(max_bytes * 0.9) if _budget is None else _budget    # headroom for tags
+    for chunk in iter_chunks(text, budget):
+        if not chunk.strip():
+            continue
+        ssml = to_ssml(chunk, **ssml_kw)
+        if len(ssml.encode("utf-8")) <= max_bytes or len(chunk) == 1:
+            yield ssml
+        else:
+            # Markup-heavy chunk (many escapes / breaks) – split it finer
+            yield from iter_ssml_chunks(chunk, max_bytes, budget // 2, **ssml_kw)
+
+
+if __name__ == "__main__":          # property tests: tests/test_text_chunker.py
+    import sys
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python text_chunker.py FILE   # show how FILE would be chunked")
+    text = open(sys.argv[1], encoding="utf-8").read()
+    for i, chunk in enumerate(iter_ssml_chunks(text), start=1):
+        print(f"[{i}] {len(chunk.encode('utf-8')):,} bytes")
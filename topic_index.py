@@ -0,0 +1,185 @@
+"""
+topic_index.py  ·  Semantic topic dedup index
+------------------------------------------------
+Keeps every previously used headline as a row of an L2-normalised
+embedding matrix so a candidate topic can be rejected locally with a
+single matrix-vector product instead of another GPT round-trip.
+
+Embeddings come from a small CPU sentence-transformer when it is
+installed; otherwise a hashed word/bigram vector is used so the index
+still works (with a looser threshold) on a bare runner.
+
+Files (per index name)
+  • topic_index_<name>.npy   (float32 matrix, one row per topic)
+  • topic_index_<name>.json  (topic list aligned with the rows + model id)
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+import lazy_imports
+
+# ─── Optional sentence-embedding model ─────────────────────────
+# Checked without importing: sentence_transformers pulls in torch (seconds)
+HAVE_SENTENCE_MODEL = lazy_imports.available("sentence_transformers")
+
+MODEL_NAME      = "sentence-transformers/all-MiniLM-L6-v2"
+HASH_MODEL_NAME = "hashed-ngrams-512"
+HASH_DIM        = 512
+
+# Cosine similarity above which a candidate counts as a repeat
+MODEL_THRESHOLD = 0.82
+HASH_THRESHOLD  = 0.60
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has",
+    "have", "in", "into", "is", "it", "its", "new", "of", "on", "or", "over",
+    "says", "than", "that", "the", "their", "this", "to", "up", "with", "how",
+    "after", "amid", "could", "may", "more", "now", "will", "why", "what",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_model = None
+
+
+# ─── Embedding backends ───────────────────────────────────────
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _hash_embed(texts: List[str]) -> np.ndarray:
+    """Bag of hashed unigrams + bigrams, L2-normalised."""
+    out = np.zeros((len(texts), HASH_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        toks = [t for t in _tokens(text) if t not in STOPWORDS]
+        grams = toks + [f"{a} {b}" for a, b in zip(toks, toks[1:])]
+        for g in grams:
+            h = int.from_bytes(hashlib.blake2b(g.encode(), digest_size=8).digest(), "little")
+            out[row, h % HASH_DIM] += 1.0 if (h >> 63) == 0 else -1.0
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return out / norms
+
+
+def _get_model():
+    global _model
+    if _model is None:
+        from sentence_transformers import SentenceTransformer
+        _model = SentenceTransformer(MODEL_NAME, device="cpu")
+    return _model
+
+
+def embed(texts: List[str]) -> Tuple[np.ndarray, str]:
+    """Return (matrix, model_id) for *texts* using the best available backend."""
+    if HAVE_SENTENCE_MODEL:
+        try:
+            vecs = _get_model().encode(
+                texts, batch_size=64, normalize_embeddings=True, show_progress_bar=False
+            )
+            return np.asarray(vecs, dtype=np.float32), MODEL_NAME
+        except Exception as exc:
+            print(f"[!] Sentence model unavailable, using hashed vectors – {exc}")
+    return _hash_embed(texts), HASH_MODEL_NAME
+
+
+# ─── Index ────────────────────────────────────────────────────
+class TopicIndex:
+    """Embedding matrix of past topics with cosine-similarity lookup."""
+
+    def __init__(self, name: str, root: Path | str = "."):
+        root = Path(root)
+        self.matrix_path = root / f"topic_index_{name}.npy"
+        self.meta_path   = root / f"topic_index_{name}.json"
+        self.topics: List[str] = []
+        self.model_id: str | None = None
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self._load()
+
+    # -- persistence ------------------------------------------------
+    def _load(self) -> None:
+        if not (self.matrix_path.exists() and self.meta_path.exists()):
+            return
+        try:
+            meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+            matrix = np.load(self.matrix_path)
+        except (OSError, ValueError, json.JSONDecodeError) as exc:
+            print(f"[!] Topic index unreadable, rebuilding – {exc}")
+            return
+        if len(meta.get("topics", [])) != len(matrix):
+            print("[!] Topic index out of sync, rebuilding")
+            return
+        self.topics, self.model_id, self.matrix = meta["topics"], meta.get("model"), matrix
+
+    def save(self) -> None:
+        np.save(self.matrix_path, self.matrix)
+        self.meta_path.write_text(
+            json.dumps({"model": self.model_id, "topics": self.topics}, indent=2),
+            encoding="utf-8",
+        )
+
+    # -- mutation ---------------------------------------------------
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        vecs, model_id = embed(texts)
+        if self.model_id and model_id != self.model_id and self.topics:
+            # Backend changed since the matrix was built – re-embed everything
+            print(f"[i] Re-embedding topic index with {model_id}")
+            self.matrix, _ = embed(self.topics)
+        self.model_id = model_id
+        return vecs
+
+    def add(self, topics: Iterable[str]) -> None:
+        known = set(self.topics)
+        new = [t for t in dict.fromkeys(topics) if t not in known]
+        if not new:
+            return
+        vecs = self._embed(new)
+        self.matrix = vecs if not len(self.matrix) else np.vstack([self.matrix, vecs])
+        self.topics.extend(new)
+
+    def sync(self, history: Iterable[str]) -> None:
+        """Embed any topics present in *history* but missing from the index, in history order."""
+        self.add(history)       # add() drops known topics and duplicates, keeping order
+
+    # -- lookup -----------------------------------------------------
+    @property
+    def threshold(self) -> float:
+        return HASH_THRESHOLD if self.model_id == HASH_MODEL_NAME else MODEL_THRESHOLD
+
+    def nearest_many(self, topics: List[str]) -> List[Tuple[float, str | None]]:
+        """Return (cosine similarity, closest past topic) for each of *topics*."""
+        if not self.topics or not topics:
+            return [(0.0, None)] * len(topics)
+        sims = self._embed(topics) @ self.matrix.T
+        best = np.argmax(sims, axis=1)
+        return [(float(sims[r, i]), self.topics[i]) for r, i in enumerate(best)]
+
+    def nearest(self, topic: str) -> Tuple[float, str | None]:
+        return self.nearest_many([topic])[0]
+
+    def duplicates(self, topics: List[str]) -> List[bool]:
+        """Flag every candidate in *topics* that is too close to a past topic."""
+        flags = []
+        for topic, (score, match) in zip(topics, self.nearest_many(topics)):
+            dup = score >= self.threshold
+            if dup:
+                print(f"[⚠] '{topic}' ≈ '{match}' (cos={score:.2f})")
+            flags.append(dup)
+        return flags
+
+    def is_duplicate(self, topic: str) -> bool:
+        return self.duplicates([topic])[0]
+
+    def recent_themes(self, window: int = 30, top_k: int = 12) -> str:
+        """Compact keyword summary of the last *window* topics for prompts."""
+        counts = Counter(
+            t for topic in self.topics[-window:] for t in _tokens(topic)
+            if t not in STOPWORDS and len(t) > 2
+        )
+        return ", ".join(w for w, _ in counts.most_common(top_k)) or "(none)"
@@ -0,0 +1,219 @@
+"""
+tts_engine.py  ·  Concurrent text-to-speech synthesis
+------------------------------------------------------
+Shared by generate_audio_from_blog.py and audio_for_file.py.
+
+Chunks are submitted to a bounded thread pool; each chunk is retried on
+its own with exponential backoff when the failure is transient (429,
+5xx, deadline, connection), while permanent errors (bad SSML, auth)
+fail at once. Finished segments – synthesized or cached – are streamed
+to the output file strictly in order as soon as every earlier chunk is
+done, so only a handful of segments are ever held in memory.
+
+Works with anything exposing Google's call shape
+    client.synthesize_speech(input=..., voice=..., audio_config=...)
+        → object with .audio_content (bytes)
+which makes it easy to drive with a local stub client.
+
+synthesize_to_file hands the segments to audio_assembly, which joins
+them into a single MP3 with one correct duration header.
+
+Segments are cached on disk under .tts_cache/, keyed by a hash of the
+chunk text, voice and audio config, so reruns and repeated boilerplate
+only pay for the chunks that actually changed.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from pathlib import Path
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Optional, Set
+
+from audio_assembly import open_assembler
+
+MAX_WORKERS = int(os.getenv("TTS_WORKERS", "4"))
+RETRIES     = 3
+BACKOFF     = 2.0        # seconds, doubled after every failed attempt
+CACHE_DIR   = Path(os.getenv("TTS_CACHE_DIR", ".tts_cache"))
+CACHE_MAX_AGE_DAYS = 30
+
+TRANSIENT_HTTP = {408, 429, 500, 502, 503, 504}
+TRANSIENT_GRPC = {"UNAVAILABLE", "DEADLINE_EXCEEDED", "RESOURCE_EXHAUSTED", "INTERNAL", "ABORTED"}
+
+
+# ─── Per-chunk audio cache ─────────────────────────────────────
+def _describe(obj) -> str:
+    """Stable text form of a voice / audio-config message (proto-plus or plain)."""
+    to_json = getattr(type(obj), "to_json", None)
+    if callable(to_json):
+        try:
+            return to_json(obj, sort_keys=True)
+        except TypeError:
+            return to_json(obj)
+    return repr(obj)
+
+
+class ChunkCache:
+    """Content-addressed store of synthesized segments: <CACHE_DIR>/<sha256>.bin"""
+
+    def __init__(self, root: Path | str = CACHE_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def key(text: str, voice, audio_config) -> str:
+        h = hashlib.sha256()
+        for part in (text, _describe(voice), _describe(audio_config)):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.root / f"{key}.bin"
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        os.utime(path)                     # keep recently used entries from pruning
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        tmp = self.root / f"{key}.{os.getpid()}.tmp"
+        tmp.write_bytes(data)
+        os.replace(tmp, self.root / f"{key}.bin")
+
+    def prune(self, max_age_days: int = CACHE_MAX_AGE_DAYS) -> int:
+        cutoff, removed = time.time() - max_age_days * 86400, 0
+        for path in self.root.glob("*.bin"):
+            if path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+def _default_input(text: str):
+    from google.cloud import texttospeech
+    return texttospeech.SynthesisInput(text=text)
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Worth retrying? google.api_core errors carry an HTTP .code, raw gRPC errors a .code()."""
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    code = getattr(exc, "code", None)
+    if callable(code):
+        try:
+            code = code()
+        except Exception:
+            return False
+    if isinstance(code, int):
+        return code in TRANSIENT_HTTP
+    return getattr(code, "name", None) in TRANSIENT_GRPC
+
+
+def synthesize_chunk(client, text: str, voice, audio_config,
+                     make_input: Callable[[str], Any] = _default_input,
+                     retries: int = RETRIES, backoff: float = BACKOFF) -> bytes:
+    """Synthesize one chunk, retrying transient failures with backoff."""
+    for attempt in range(1, retries + 1):
+        try:
+            response = client.synthesize_speech(
+                input=make_input(text),
+                voice=voice,
+                audio_config=audio_config
+            )
+            return response.audio_content
+        except Exception as e:
+            if attempt == retries or not is_transient(e):
+                raise
+            delay = backoff * 2 ** (attempt - 1)
+            print(f"⚠️ TTS chunk failed ({e}); retry {attempt}/{retries - 1} in {delay:.0f}s")
+            time.sleep(delay)
+
+
+def _synthesize_and_store(client, text, voice, audio_config, make_input, cache, key) -> bytes:
+    audio = synthesize_chunk(client, text, voice, audio_config, make_input)
+    if cache:
+        cache.put(key, audio)
+    return audio
+
+
+def synthesize_to_stream(client, chunks: Iterable[str], out: BinaryIO, voice, audio_config,
+                         make_input: Callable[[str], Any] = _default_input,
+                         max_workers: int = MAX_WORKERS,
+                         on_segment: Optional[Callable[[int, bytes], None]] = None,
+                         cache: Optional[ChunkCache] = None) -> int:
+    """
+    Synthesize *chunks* concurrently and write the audio to *out* in order.
+    Returns the number of chunks written. At most 2 × max_workers chunks are
+    in flight or buffered at any time. With a *cache*, hits are spliced in
+    without an API call and misses are stored after synthesis.
+    """
+    window = max(1, max_workers) * 2
+    inflight: Set[Future] = set()
+    done: Dict[int, bytes] = {}
+    index_of: Dict[Future, int] = {}
+    next_to_write = 0
+    total = 0
+
+    def drain() -> None:
+        nonlocal inflight
+        finished, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+        for fut in finished:
+            done[index_of.pop(fut)] = fut.result()   # re-raises a chunk's final failure
+        flush()
+
+    def flush() -> None:
+        nonlocal next_to_write
+        while next_to_write in done:
+            segment = done.pop(next_to_write)
+            out.write(segment)
+            if on_segment:
+                on_segment(next_to_write, segment)
+            print(f"[{next_to_write + 1}] wrote {len(segment):,} bytes")
+            next_to_write += 1
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for i, chunk in enumerate(chunks):
+            key = cache.key(chunk, voice, audio_config) if cache else None
+            cached = cache.get(key) if cache else None
+            if cached is not None:
+                print(f"[{i + 1}] Cache hit for {len(chunk)} characters")
+                done[i] = cached
+                flush()
+            else:
+                print(f"[{i + 1}] Synthesizing {len(chunk)} characters...")
+                fut = pool.submit(_synthesize_and_store, client, chunk, voice, audio_config, make_input, cache, key)
+                index_of[fut] = i
+                inflight.add(fut)
+            total += 1
+            # Cache hits waiting behind a slow chunk count against the window too
+            while inflight and len(inflight) + len(done) >= window:
+                drain()
+        while inflight:
+            drain()
+    return total
+
+
+def synthesize_to_file(client, chunks: Iterable[str], out_path: str, voice, audio_config,
+                       make_input: Callable[[str], Any] = _default_input,
+                       max_workers: int = MAX_WORKERS,
+                       cache: Optional[ChunkCache] = None,
+                       pcm: bool = False) -> int:
+    """
+    Synthesize *chunks* into one MP3 at *out_path*. With pcm=True the
+    audio_config must request LINEAR16: chunks are loudness-levelled and
+    encoded once by ffmpeg; otherwise MP3 chunks are joined frame by frame.
+    """
+    with open_assembler(out_path, pcm=pcm) as out:
+        n = synthesize_to_stream(client, chunks, out, voice, audio_config,
+                                 make_input=make_input, max_workers=max_workers, cache=cache)
+    print(f"🎚️ Assembled {n} chunk(s) into {out_path} ({out.duration:.0f}s)")
+    if cache:
+        print(f"🗃️ TTS cache: {cache.hits} hit(s), {cache.misses} miss(es)")
+    return n
@@ -1,16 +1,14 @@
 # upload_audio_and_embed.py
 
 import os
-import requests
 from dotenv import load_dotenv
 
+import wp_media
+
 # -------------------------
-# Load WordPress credentials from environment
+# Load WordPress credentials from environment (used by wp_media)
 # -------------------------
 load_dotenv()
-WP_USERNAME     = os.getenv("WP_USERNAME")
-WP_APP_PASSWORD = os.getenv("WP_APP_PASSWORD")
-WP_SITE_URL     = os.getenv("WP_SITE_URL")
 
 # -------------------------
 # Upload audio file to WordPress Media Library
@@ -21,23 +19,8 @@ def upload_audio_to_wp(file_path):
         return None
 
     try:
-        media_url = f"{WP_SITE_URL}/wp-json/wp/v2/media"
-        filename = os.path.basename(file_path)
-        headers = {
-            "Content-Disposition": f"attachment; filename={filename}",
-            "Content-Type": "audio/mpeg"
-        }
-
-        with open(file_path, "rb") as f:
-            response = requests.post(
-                media_url,
-                headers=headers,
-                data=f,
-                auth=(WP_USERNAME, WP_APP_PASSWORD)
-            )
-
-        response.raise_for_status()
-        audio_url = response.json()["source_url"]
+        media = wp_media.get_client().upload(file_path, "audio/mpeg", on_progress=wp_media.print_progress)
+        audio_url = media["source_url"]
         print("Uploaded to media:", audio_url)
 
         # Save audio URL to file for later use
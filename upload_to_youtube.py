@@ -1,14 +1,22 @@
+import hashlib
 import os
 import json
+import random
+import time
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
+import httplib2
+
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
 
+import run_manifest
+
 # Configuration
 VIDEO_FILE = "video_output.mp4"
 DESCRIPTION = "Market Update. #Shorts"
@@ -18,7 +26,25 @@ SCOPES = ["https://www.googleapis.com/auth/youtube.upload"]
 CREDENTIALS_FILE = "credentials.json"
 TOKEN_FILE = "token.json"
 
+# Resumable upload: chunked, session URI persisted so a restarted job resumes.
+# Kept under .cache/, which the workflows restore on a re-run (fresh runner)
+CHUNK_MB = int(os.getenv("YOUTUBE_CHUNK_MB", "8"))      # rounded to a multiple of 256 KiB
+SESSION_FILE = os.getenv("YOUTUBE_SESSION_FILE", os.path.join(".cache", "youtube_upload_session.json"))
+SESSION_MAX_AGE = 6 * 24 * 3600                          # YouTube keeps sessions ~1 week
+MAX_RETRIES = 8
+RETRY_STATUSES = (500, 502, 503, 504)
+RETRY_EXCEPTIONS = (httplib2.HttpLib2Error, IOError, ConnectionError, TimeoutError)
+
+_service = None
+
 def get_authenticated_service():
+    """Build the API client once per process (token refresh included)."""
+    global _service
+    if _service is None:
+        _service = _build_service()
+    return _service
+
+def _build_service():
     creds = None
 
     # Load existing token if available
@@ -47,13 +73,97 @@ def get_authenticated_service():
 
     return build("youtube", "v3", credentials=creds)
 
+def _chunksize():
+    quantum = 256 * 1024
+    return max(1, (CHUNK_MB * 1024 * 1024) // quantum) * quantum
+
+def _file_key(path):
+    """Identify the video by content – a restarted job restores or rebuilds it with a new mtime."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return {"size": os.path.getsize(path), "sha256": h.hexdigest()}
+
+def load_session(path=VIDEO_FILE):
+    """Resumable session URI left by an interrupted upload of this exact file, if still fresh."""
+    try:
+        with open(SESSION_FILE, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if {k: saved.get(k) for k in ("size", "sha256")} != _file_key(path):
+        return None
+    if time.time() - saved.get("created", 0) > SESSION_MAX_AGE:
+        return None
+    return saved.get("uri")
+
+def save_session(uri, path=VIDEO_FILE):
+    os.makedirs(os.path.dirname(SESSION_FILE) or ".", exist_ok=True)
+    with open(SESSION_FILE, "w", encoding="utf-8") as f:
+        json.dump({"uri": uri, "created": time.time(), **_file_key(path)}, f)
+
+def clear_session():
+    if os.path.exists(SESSION_FILE):
+        os.remove(SESSION_FILE)
+
+def resumable_upload(request, path=VIDEO_FILE):
+    """Drive next_chunk() to completion with progress, throughput and 5xx/network retries."""
+    resume_uri = load_session(path)
+    if resume_uri:
+        # Ask the server how far the previous process got, then continue from there
+        request.resumable_uri = resume_uri
+        request._in_error_state = True
+        print("[INFO] Resuming interrupted upload session")
+
+    total = os.path.getsize(path)
+    t0, sent_at_start = time.monotonic(), None
+    response, retries = None, 0
+    while response is None:
+        try:
+            status, response = request.next_chunk()
+            if request.resumable_uri and not resume_uri:
+                resume_uri = request.resumable_uri
+                save_session(resume_uri, path)
+            if status:
+                sent = status.resumable_progress
+                if sent_at_start is None:
+                    sent_at_start = sent - min(sent, _chunksize())
+                rate = (sent - sent_at_start) / max(1e-6, time.monotonic() - t0) / 1e6
+                print(f"[INFO] Uploaded {sent / 1e6:.1f} / {total / 1e6:.1f} MB "
+                      f"({status.progress():.0%}, {rate:.2f} MB/s)")
+            retries = 0
+        except HttpError as e:
+            if e.resp.status not in RETRY_STATUSES:
+                if e.resp.status == 404:
+                    clear_session()      # session expired – the next run starts over
+                raise
+            error = f"HTTP {e.resp.status}"
+        except RETRY_EXCEPTIONS as e:
+            error = f"{type(e).__name__}: {e}"
+        else:
+            continue
+        retries += 1
+        if retries > MAX_RETRIES:
+            raise RuntimeError(f"YouTube upload failed after {MAX_RETRIES} retries: {error}")
+        delay = min(64, 2 ** retries) + random.random()
+        print(f"[WARN] {error}; retry {retries}/{MAX_RETRIES} in {delay:.1f}s")
+        time.sleep(delay)
+        request._in_error_state = True  # next_chunk() re-syncs the byte offset with the server
+
+    clear_session()
+    elapsed = time.monotonic() - t0
+    sent = total - (sent_at_start or 0)
+    print(f"[INFO] Upload finished: {sent / 1e6:.1f} MB in {elapsed:.1f}s ({sent / 1e6 / max(elapsed, 1e-6):.2f} MB/s)")
+    return response
+
 def upload_video():
     now_et = datetime.now(ZoneInfo("America/New_York"))
     formatted_date = now_et.strftime("%A, %B %d, %Y")
     title = f"Market Update for {formatted_date} #Shorts"
 
     youtube = get_authenticated_service()
-    media = MediaFileUpload(VIDEO_FILE, mimetype="video/mp4", resumable=True)
+    media = MediaFileUpload(VIDEO_FILE, mimetype="video/mp4", chunksize=_chunksize(), resumable=True)
 
     request = youtube.videos().insert(
         part="snippet,status",
@@ -72,9 +182,12 @@ def upload_video():
         media_body=media,
     )
 
-    print(f"[INFO] Uploading to YouTube with title: {title}")
-    response = request.execute()
+    print(f"[INFO] Uploading to YouTube with title: {title} ({CHUNK_MB} MB chunks)")
+    response = resumable_upload(request, VIDEO_FILE)
     print("[SUCCESS] Uploaded: https://youtube.com/watch?v=" + response["id"])
+    run_manifest.update(youtube_id=response["id"],
+                        youtube_embed_url="https://www.youtube.com/embed/" + response["id"])
+    return response["id"]
 
 if __name__ == "__main__":
     upload_video()
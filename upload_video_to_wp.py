@@ -1,17 +1,15 @@
 # upload_video_to_wp.py
 
 import os
-import requests
-import base64
 from dotenv import load_dotenv
 
+import publish
+import wp_media
+
 # -------------------------
-# Load WordPress credentials
+# Load WordPress credentials (used by wp_media)
 # -------------------------
 load_dotenv()
-WP_USERNAME     = os.getenv("WP_USERNAME")
-WP_APP_PASSWORD = os.getenv("WP_APP_PASSWORD")
-WP_SITE_URL     = os.getenv("WP_SITE_URL")
 
 # -------------------------
 # Load latest audio URL from file (if available)
@@ -28,20 +26,10 @@ else:
 # -------------------------
 # Upload local video to WordPress Media Library
 # -------------------------
-def upload_video():
-    media_endpoint = f"{WP_SITE_URL}/wp-json/wp/v2/media"
-    auth_header = base64.b64encode(f"{WP_USERNAME}:{WP_APP_PASSWORD}".encode()).decode()
-    headers = {
-        "Authorization": f"Basic {auth_header}",
-        "Content-Disposition": 'attachment; filename="video_output.mp4"',
-        "Content-Type": "video/mp4"
-    }
-
+def upload_video(path="video_output.mp4"):
     try:
-        with open("video_output.mp4", "rb") as f:
-            resp = requests.post(media_endpoint, headers=headers, data=f)
-        resp.raise_for_status()
-        video_url = resp.json().get("source_url")
+        media = wp_media.get_client().upload(path, "video/mp4", on_progress=wp_media.print_progress)
+        video_url = media.get("source_url")
         print(f"Uploaded video: {video_url}")
         return video_url
     except Exception as e:
@@ -49,70 +37,31 @@ def upload_video():
         return None
 
 # -------------------------
-# Embed video, title, and optional audio into latest post
+# Embed video, title, and optional audio into this run's post
 # -------------------------
 def embed_video(video_url, audio_url=None):
     if not video_url:
         print("No video URL provided, cannot embed.")
         return False
 
-    auth_header = base64.b64encode(f"{WP_USERNAME}:{WP_APP_PASSWORD}".encode()).decode()
-    headers = {
-        "Authorization": f"Basic {auth_header}",
-        "Content-Type": "application/json"
-    }
-
     try:
-        # Get latest post
-        resp = requests.get(f"{WP_SITE_URL}/wp-json/wp/v2/posts", headers=headers)
-        resp.raise_for_status()
-        posts = resp.json()
-        if not posts:
+        # Only the post this run published, and only the fields the embed needs
+        wp = wp_media.get_client()
+        post_id = wp.run_post_id()
+        if not post_id:
             print("No posts found.")
             return False
 
-        latest = posts[0]
-        post_id      = latest["id"]
-        title_html   = latest["title"]["rendered"]
-        content_html = latest["content"]["rendered"]
-
-        # Build embed layout with video and optional audio
-        embed_parts = [
-            '<div style="display:flex; align-items:center; justify-content:center; gap:40px; margin-bottom:30px;">',
-            '  <div style="flex:0 0 320px;">',
-            f'    <video controls playsinline style="width:100%; height:auto; border-radius:12px;">',
-            f'      <source src="{video_url}" type="video/mp4">',
-            '      Your browser does not support the video tag.',
-            '    </video>',
-            '  </div>',
-            '  <div style="flex:1; max-width:600px;">',
-            f'    <h1 style="margin:0 0 20px; font-size:28px; text-align:center;">{title_html}</h1>',
-        ]
-
-        if audio_url:
-            embed_parts += [
-                '    <p style="text-align:center;"><strong>Prefer to listen?</strong></p>',
-                '    <audio controls style="width:100%; margin-top:10px;">',
-                f'      <source src="{audio_url}" type="audio/mpeg">',
-                '      Your browser does not support the audio element.',
-                '    </audio>',
-            ]
-
-        embed_parts += [
-            '  </div>',
-            '</div>'
-        ]
+        post         = wp.get_post(post_id)
+        title_html   = post["title"]["rendered"]
+        content_html = post["content"]["raw"]
 
-        embed_html = "\n".join(embed_parts)
+        # Build embed layout (shared with publish.py)
+        embed_html = publish.embed_html(title_html, video_url=video_url, audio_url=audio_url)
         new_content = embed_html + "\n\n" + content_html
 
         # Update post with embedded media
-        update_resp = requests.post(
-            f"{WP_SITE_URL}/wp-json/wp/v2/posts/{post_id}",
-            headers=headers,
-            json={"content": new_content}
-        )
-        update_resp.raise_for_status()
+        wp.update_post(post_id, content=new_content)
         print("Embedded video, title, and audio successfully.")
         return True
 
@@ -8,20 +8,25 @@ Outputs:
   • watchlist_log.jsonl
   • watchlist_latest.json
 """
+from __future__ import annotations
+
 import datetime as dt
 import json
 import pathlib
 import time
 from typing import Dict, List, Optional
 
-import pandas as pd
 import requests
-import yfinance as yf
-import feedparser
 import pytz
-from transformers import logging as tf_logging, pipeline, Pipeline
 
+import headline_summariser
+import lazy_imports
 from article_extractor import extract_article_text
+from headline_summariser import summariser   # DistilBART, loaded on first use
+
+# Heavy imports deferred to first use (see lazy_imports.py)
+feedparser = lazy_imports.module("feedparser")
+yf         = lazy_imports.module("yfinance")
 
 try:
     from rag_layer.ingest import ingest_section
@@ -44,18 +49,6 @@ HEADERS = {
 EARN_URL = "https://api.nasdaq.com/api/calendar/earnings?date={d}"
 DIV_URL = "https://api.nasdaq.com/api/calendar/dividends?date={d}"
 
-MODEL_NAME = "sshleifer/distilbart-cnn-12-6"
-tf_logging.set_verbosity_error()
-
-summariser: Pipeline = pipeline(
-    "summarization",
-    model=MODEL_NAME,
-    tokenizer=MODEL_NAME,
-    framework="pt",
-    truncation=True,
-    token=None
-)
-
 LOG_FILE    = pathlib.Path("watchlist_log.jsonl")
 LATEST_FILE = pathlib.Path("watchlist_latest.json")
 
@@ -209,6 +202,7 @@ def save_to_log(blob: Dict):
     print("✔ Saved to watchlist_log.jsonl and watchlist_latest.json")
 
 def main():
+    headline_summariser.resolve()
     blob = build_watchlist_blob()
     save_to_log(blob)
 
@@ -220,4 +214,7 @@ def main():
 
 
 if __name__ == "__main__":
+    import argparse
+    argparse.ArgumentParser(description="Build the earnings/dividends watchlist (Section 4) "
+                            "and append it to watchlist_log.jsonl").parse_args()
     main()
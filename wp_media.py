@@ -0,0 +1,299 @@
+"""
+wp_media.py  ·  One WordPress REST client for every upload script
+-----------------------------------------------------------------
+Shared by image_utils, upload_audio_and_embed, upload_video_to_wp and
+upload_to_wp.
+
+  • pooled requests.Session with auth, timeouts and keep-alive
+  • retries with exponential backoff on 429 / 5xx / connection errors
+  • uploads stream from disk with a progress callback (no full read)
+  • content-hash dedup: every upload is recorded in wp_media_ledger.json
+    by SHA-256, so re-uploading an identical file returns the existing
+    media item instead of a copy
+  • posts: _fields-limited reads and direct updates of the post this run
+    created (run_manifest.json), never "whatever is newest"
+  • no duplicate after a lost response: upload names carry a short hash
+    (video_output-1a2b3c4d.mp4), and before re-sending the client checks
+    whether the previous attempt landed anyway
+
+The media endpoint has no resumable-upload protocol, so a failed
+transfer restarts from byte zero. The ledger and the lookup before each
+retry make sure it is never stored twice.
+
+Config
+  • WP_SITE_URL, WP_USERNAME, WP_APP_PASSWORD  (or WP_AUTH_HEADER)
+
+USAGE
+    import wp_media
+    media = wp_media.get_client().upload("video_output.mp4", on_progress=wp_media.print_progress)
+    media["id"], media["source_url"]
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import run_manifest
+
+# ─── Constants ─────────────────────────────────────────────────
+LEDGER_FILE  = Path("wp_media_ledger.json")
+RETRIES      = 4
+BACKOFF      = 2.0            # seconds, doubled after every failed attempt
+TIMEOUT      = (10, 300)      # connect, read – large videos take a while to process
+READ_CHUNK   = 1 << 20
+MEDIA_FIELDS = "id,source_url,mime_type,media_details"
+
+mimetypes.add_type("image/webp", ".webp")
+mimetypes.add_type("image/avif", ".avif")
+
+ProgressCallback = Callable[[int, int], None]
+
+
+class WPError(Exception):
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status          # HTTP status when the API answered
+
+
+def _retry_after(resp: requests.Response) -> float:
+    try:
+        return float(resp.headers.get("Retry-After") or 0)
+    except ValueError:
+        return 0.0
+
+
+def file_sha256(path: str | Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_CHUNK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def print_progress(sent: int, total: int) -> None:
+    """Default progress callback (called once per 10% of each upload)."""
+    print(f"  ↑ {sent / 1e6:.1f} / {total / 1e6:.1f} MB ({sent * 100 // max(1, total)}%)")
+
+
+class _ProgressReader:
+    """File wrapper that reports bytes handed to requests; len() gives Content-Length.
+
+    Progress is reported once per 10% step. The step is kept per reader, so
+    uploads running in parallel threads don't suppress each other's lines.
+    """
+
+    def __init__(self, path: Path, on_progress: Optional[ProgressCallback]):
+        self.f = open(path, "rb")
+        self.total = os.fstat(self.f.fileno()).st_size
+        self.sent = 0
+        self.step = -1
+        self.on_progress = on_progress
+
+    def __len__(self) -> int:
+        return self.total
+
+    def read(self, size: int = -1) -> bytes:
+        block = self.f.read(READ_CHUNK if size is None or size < 0 else size)
+        self.sent += len(block)
+        step = self.sent * 10 // max(1, self.total)
+        if self.on_progress and block and step != self.step:
+            self.step = step
+            self.on_progress(self.sent, self.total)
+        return block
+
+    def close(self) -> None:
+        self.f.close()
+
+
+# ─── Client ────────────────────────────────────────────────────
+class WPClient:
+    def __init__(self, site_url: str | None = None, username: str | None = None,
+                 app_password: str | None = None, ledger_path: Path | str = LEDGER_FILE):
+        self.site_url = (site_url or os.getenv("WP_SITE_URL") or "").rstrip("/")
+        if not self.site_url:
+            raise WPError("WP_SITE_URL is not set")
+        self.api = f"{self.site_url}/wp-json/wp/v2"
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        env_token = os.getenv("WP_AUTH_HEADER")
+        if env_token:
+            self.session.headers["Authorization"] = "Basic " + env_token
+        else:
+            self.session.auth = (username or os.getenv("WP_USERNAME"), app_password or os.getenv("WP_APP_PASSWORD"))
+        self.ledger_path = Path(ledger_path)
+        self.ledger: Dict[str, Dict] = {}
+        self._ledger_lock = threading.Lock()      # publish.py uploads from several threads
+        if self.ledger_path.exists():
+            try:
+                self.ledger = json.loads(self.ledger_path.read_text(encoding="utf-8"))
+            except ValueError:
+                print(f"[!] {self.ledger_path} unreadable, starting a new media ledger")
+
+    # -- plumbing ---------------------------------------------------
+    def request(self, method: str, path: str, **kw) -> requests.Response:
+        """Call the REST API with backoff on 429 / 5xx / network errors."""
+        url = path if path.startswith("http") else f"{self.api}/{path.lstrip('/')}"
+        kw.setdefault("timeout", TIMEOUT)
+        for attempt in range(1, RETRIES + 1):
+            try:
+                resp = self.session.request(method, url, **kw)
+                if resp.status_code < 500 and resp.status_code != 429:
+                    return resp
+                error = f"HTTP {resp.status_code}"
+                delay = _retry_after(resp)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error, delay = str(e), 0.0
+            if attempt == RETRIES:
+                raise WPError(f"{method} {url} failed after {RETRIES} attempts: {error}")
+            delay = max(delay, BACKOFF * 2 ** (attempt - 1))
+            print(f"⚠️ {method} {url}: {error}; retry {attempt}/{RETRIES - 1} in {delay:.0f}s")
+            time.sleep(delay)
+        raise AssertionError("unreachable")
+
+    def get_json(self, path: str, **params):
+        resp = self.request("GET", path, params=params)
+        if not resp.ok:
+            raise WPError(f"GET {path}: {resp.status_code} {resp.text[:200]}")
+        return resp.json()
+
+    # -- posts ------------------------------------------------------
+    def get_post(self, post_id: int, fields: str = "id,title.rendered,content.raw") -> Dict:
+        """One post, only *fields* (edit context so content.raw is the stored markup)."""
+        return self.get_json(f"posts/{post_id}", context="edit", _fields=fields)
+
+    def create_post(self, **fields) -> Dict:
+        """Create a post – one attempt only, a blind retry could publish it twice."""
+        resp = self.session.post(f"{self.api}/posts", params={"_fields": "id,link"}, json=fields, timeout=TIMEOUT)
+        if not resp.ok:
+            raise WPError(f"Creating post: {resp.status_code} {resp.text[:200]}")
+        return resp.json()
+
+    def update_post(self, post_id: int, **fields) -> Dict:
+        resp = self.request("POST", f"posts/{post_id}", params={"_fields": "id,link"}, json=fields)
+        if not resp.ok:
+            raise WPError(f"Updating post {post_id}: {resp.status_code} {resp.text[:200]}", resp.status_code)
+        return resp.json()
+
+    def run_post_id(self) -> Optional[int]:
+        """The post this run created (run manifest), else the newest post on the site."""
+        post_id = run_manifest.read().get("post_id")
+        if post_id:
+            return post_id
+        print("[!] No post ID in the run manifest – falling back to the newest post")
+        found = self.get_json("posts", per_page=1, orderby="date", order="desc", _fields="id")
+        return found[0]["id"] if found else None
+
+    def _save_ledger(self) -> None:
+        """Write the ledger atomically; call with _ledger_lock held."""
+        tmp = self.ledger_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.ledger, indent=1), encoding="utf-8")
+        os.replace(tmp, self.ledger_path)
+
+    # -- media ------------------------------------------------------
+    def find_media(self, slug: str) -> Optional[Dict]:
+        try:
+            found = self.get_json("media", slug=slug, _fields=MEDIA_FIELDS)
+        except WPError:
+            return None
+        return found[0] if found else None
+
+    def _known(self, digest: str) -> Optional[Dict]:
+        """Ledger entry for *digest*, if the media item still exists."""
+        with self._ledger_lock:
+            entry = self.ledger.get(digest)
+        if not entry:
+            return None
+        resp = self.request("GET", f"media/{entry['id']}", params={"_fields": MEDIA_FIELDS})
+        if resp.ok:
+            return resp.json()
+        if resp.status_code in (404, 410):
+            print(f"[!] Media {entry['id']} was deleted on the site; uploading again")
+            with self._ledger_lock:
+                self.ledger.pop(digest, None)
+                self._save_ledger()
+            return None
+        return entry           # can't verify (e.g. 401 on read) – trust the ledger
+
+    def upload(self, path: str | Path, mime_type: str | None = None,
+               on_progress: Optional[ProgressCallback] = None, dedup: bool = True) -> Dict:
+        """Upload *path* to the media library; returns the media JSON (id, source_url, …)."""
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"Media file not found: {path}")
+        digest = file_sha256(path)
+        if dedup:
+            known = self._known(digest)
+            if known:
+                print(f"♻️ {path.name} already uploaded as media {known['id']}")
+                return known
+
+        name = f"{path.stem}-{digest[:8]}{path.suffix}"
+        slug = name.rsplit(".", 1)[0].lower()
+        headers = {
+            "Content-Disposition": f'attachment; filename="{name}"',
+            "Content-Type": mime_type or mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+        }
+
+        result = self._post_media(path, name, slug, headers, on_progress)
+        with self._ledger_lock:
+            self.ledger[digest] = {"id": result["id"], "source_url": result.get("source_url", ""),
+                                   "file": path.name, "uploaded": time.strftime("%Y-%m-%d %H:%M:%S")}
+            self._save_ledger()
+        return result
+
+    def _post_media(self, path: Path, name: str, slug: str, headers: Dict,
+                    on_progress: Optional[ProgressCallback]) -> Dict:
+        for attempt in range(1, RETRIES + 1):
+            reader = _ProgressReader(path, on_progress)      # fresh stream per attempt
+            delay = 0.0
+            try:
+                resp = self.session.post(f"{self.api}/media", headers=headers, data=reader, timeout=TIMEOUT)
+                if resp.ok:
+                    return resp.json()
+                if resp.status_code < 500 and resp.status_code != 429:
+                    raise WPError(f"Upload failed: {resp.status_code} - {resp.text[:300]}")
+                error, delay = f"HTTP {resp.status_code}", _retry_after(resp)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = str(e)
+            finally:
+                reader.close()
+            if attempt == RETRIES:
+                raise WPError(f"Upload of {path.name} failed after {RETRIES} attempts: {error}")
+            delay = max(delay, BACKOFF * 2 ** (attempt - 1))
+            print(f"⚠️ Upload of {path.name}: {error}; retry {attempt}/{RETRIES - 1} in {delay:.0f}s")
+            time.sleep(delay)
+            # A timed-out or 5xx upload may still have been stored – don't store it twice
+            existing = self.find_media(slug)
+            if existing:
+                print(f"♻️ Previous attempt stored {name} as media {existing['id']}")
+                return existing
+        raise AssertionError("unreachable")
+
+
+_client: WPClient | None = None
+
+def get_client() -> WPClient:
+    global _client
+    if _client is None:
+        _client = WPClient()
+    return _client
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python wp_media.py FILE [FILE …]   # upload with progress + dedup")
+    for f in sys.argv[1:]:
+        media = get_client().upload(f, on_progress=print_progress)
+        print(f"{f} → media {media['id']}: {media.get('source_url')}")